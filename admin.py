@@ -0,0 +1,25 @@
+"""
+Admin module for Library Management System
+Access check shared by the /admin endpoints (profiles, traces). Requests must
+carry the configured ADMIN_TOKEN in the X-Admin-Token header; with no token
+configured every admin endpoint answers 403.
+"""
+
+import hmac
+
+from flask import abort, current_app, request
+
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+
+def has_admin_token() -> bool:
+    """True if ADMIN_TOKEN is configured and the request carries it in X-Admin-Token."""
+    token = current_app.config.get('ADMIN_TOKEN')
+    supplied = request.headers.get(ADMIN_TOKEN_HEADER)
+    return bool(token) and supplied is not None and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def require_admin_token():
+    """Abort with 403 unless has_admin_token()."""
+    if not has_admin_token():
+        abort(403)
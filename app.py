@@ -6,8 +6,15 @@ Routes are organized in separate blueprint modules in the routes package.
 """
 
 from flask import Flask
-from database import init_database, add_sample_data
+from database import init_database, add_sample_data, init_app as init_db
 from routes import register_blueprints
+from metrics import init_app as init_metrics
+from query_stats import init_app as init_query_stats
+from profiling import init_app as init_profiling
+from tracing import init_app as init_tracing
+from http_cache import init_app as init_http_cache
+from services.payment_queue import init_app as init_payments
+from services.suggest import build_suggest_index
 
 
 def create_app():
@@ -20,12 +27,36 @@ def create_app():
     app = Flask(__name__)
     app.secret_key = "super secret key"
     
+    # Set up the connection pool and per-request connection reuse
+    init_db(app)
+    
+    # Per-endpoint latency, status and in-flight metrics on /metrics
+    init_metrics(app)
+    
+    # Opt-in per-request SQL statement counts, slow-query log and N+1 warnings (SQL_INSTRUMENTATION)
+    init_query_stats(app)
+    
+    # Opt-in cProfile/tracemalloc captures (PROFILING_ENABLED) listed on /admin/profiles (needs ADMIN_TOKEN)
+    init_profiling(app)
+    
+    # Nested request/service/database/gateway spans (TRACING_ENABLED) on /admin/traces
+    init_tracing(app)
+    
+    # ETag/304 handling for catalog and search pages, salted by the templates
+    init_http_cache(app)
+    
+    # Worker pool for asynchronous fee payments
+    init_payments(app)
+    
     # Initialize the database
     init_database()
     
     # Add sample data for testing and demonstration
     add_sample_data()
     
+    # Typeahead prefix index, kept current as books are added
+    build_suggest_index()
+    
     # Register all route blueprints
     register_blueprints(app)
     
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package - Performance measurements for the Library Management System
+Run individual benchmarks as modules, e.g. `python -m benchmarks.bench_late_fees`.
+"""
@@ -0,0 +1,114 @@
+"""
+Fuzzy search benchmark: typo-tolerant title/author search over the
+books_trigram index (schema v7) at growing catalog sizes.
+
+For each size, generates a catalog, then searches for randomly chosen titles
+and authors with one typo introduced (a character dropped, replaced or
+swapped with its neighbour). Reports on-disk size of the trigram index,
+latency percentiles and recall (the share of searches that return a book
+with the title or author that was misspelt), so latency can be compared
+across sizes.
+
+Usage:
+    python -m benchmarks.bench_fuzzy [--books 10000 100000] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List
+
+import database
+from benchmarks.generate_dataset import generate_dataset
+from services.library_service import search_books_fuzzy
+
+
+def misspell(rng: random.Random, text: str) -> str:
+    """Introduce one typo into the longest word of a text."""
+    words = text.split()
+    index = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[index]
+    if len(word) < 4:
+        return text
+    position = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(('drop', 'replace', 'swap'))
+    if edit == 'drop':
+        word = word[:position] + word[position + 1:]
+    elif edit == 'replace':
+        word = word[:position] + rng.choice('aeioustrn') + word[position + 1:]
+    else:
+        word = word[:position - 1] + word[position] + word[position - 1] + word[position + 1:]
+    words[index] = word
+    return ' '.join(words)
+
+
+def trigram_index_bytes(path: str) -> int:
+    conn = sqlite3.connect(path)
+    size = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE 'books_trigram%'").fetchone()[0]
+    conn.close()
+    return size or 0
+
+
+def measure(path: str, queries: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    books = conn.execute('SELECT title, author FROM books').fetchall()
+    conn.close()
+
+    previous_database = database.DATABASE
+    database.DATABASE = path
+    try:
+        timings, found = [], 0
+        for _ in range(queries):
+            field = rng.randrange(2)
+            text = rng.choice(books)[field]
+            term = misspell(rng, text)
+            started = time.perf_counter()
+            results = search_books_fuzzy(term)
+            timings.append(time.perf_counter() - started)
+            found += any((book.title, book.author)[field] == text for book in results)
+    finally:
+        database.configure_pool()
+        database.DATABASE = previous_database
+
+    timings.sort()
+    return {
+        'books': len(books),
+        'index_bytes': trigram_index_bytes(path),
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[int(len(timings) * 0.99)] * 1000,
+        'recall': found / queries,
+    }
+
+
+def run(sizes: List[int], queries: int, seed: int = 5) -> List[Dict]:
+    workdir = tempfile.mkdtemp(prefix='bench-fuzzy-')
+    try:
+        results = []
+        for books in sizes:
+            path = os.path.join(workdir, f'books-{books}.db')
+            generate_dataset(path, books=books, patrons=100, loans=100)
+            results.append(measure(path, queries, seed))
+        return results
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"{'books':>10}{'index MiB':>11}{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}")
+    for result in run(args.books, args.queries):
+        print(f"{result['books']:>10,}{result['index_bytes'] / 2**20:>11.1f}{result['p50_ms']:>9.2f}"
+              f"{result['p99_ms']:>9.2f}{result['recall']:>8.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Late fee benchmark: scalar compute_late_fee() loop vs the vectorized batch engine.
+
+Usage:
+    python -m benchmarks.bench_late_fees [--loans N] [--repeat R]
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import from_db_timestamp, to_db_timestamp
+from services.library_service import compute_late_fee
+from services.late_fee_engine import compute_late_fees
+
+
+def make_due_dates(count: int, seed: int = 327):
+    """Due dates spread from 40 days overdue to 14 days ahead, as stored (epoch seconds)."""
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [to_db_timestamp(now + timedelta(seconds=rng.randint(-40 * 86400, 14 * 86400))) for _ in range(count)]
+
+
+def best_of(repeat: int, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def run(loans: int, repeat: int) -> dict:
+    due_dates = make_due_dates(loans)
+    now = datetime.now()
+
+    scalar_time, scalar = best_of(repeat, lambda: [
+        compute_late_fee(from_db_timestamp(due), now) for due in due_dates
+    ])
+    vector_time, (fees, days) = best_of(repeat, lambda: compute_late_fees(due_dates, now))
+
+    mismatches = sum(
+        1 for (fee, day), vfee, vday in zip(scalar, fees.tolist(), days.tolist()) if fee != vfee or day != vday
+    )
+    return {
+        'loans': loans,
+        'scalar_loans_per_sec': loans / scalar_time,
+        'vector_loans_per_sec': loans / vector_time,
+        'speedup': scalar_time / vector_time,
+        'mismatches': mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    result = run(args.loans, args.repeat)
+    print(f"loans:            {result['loans']:,}")
+    print(f"scalar loans/sec: {result['scalar_loans_per_sec']:,.0f}")
+    print(f"vector loans/sec: {result['vector_loans_per_sec']:,.0f}")
+    print(f"speedup:          {result['speedup']:.1f}x")
+    print(f"mismatches:       {result['mismatches']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Row materialization benchmark: sqlite3.Row copied into a dict per row (the
+old helpers) vs slotted Book records built by a row factory.
+
+For every strategy, fetches N books from an in-memory database and reports
+the memory still held by the result list, the peak while building it, the
+number of live allocated blocks, and rows per second.
+
+Usage:
+    python -m benchmarks.bench_records [--rows 100000] [--repeat R]
+"""
+
+import argparse
+import sqlite3
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from records import Book, fetch_records
+
+SELECT_BOOKS = 'SELECT * FROM books ORDER BY id'
+
+
+def make_database(rows: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''
+        CREATE TABLE books (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            isbn TEXT UNIQUE NOT NULL,
+            total_copies INTEGER NOT NULL,
+            available_copies INTEGER NOT NULL
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, ?, ?)',
+        ((f'Title {i}', f'Author {i % 5000}', f'978{i:010d}', 3, 2) for i in range(rows)),
+    )
+    conn.commit()
+    return conn
+
+
+def as_dicts(conn: sqlite3.Connection):
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(book) for book in conn.execute(SELECT_BOOKS).fetchall()]
+    finally:
+        conn.row_factory = None
+
+
+def as_records(conn: sqlite3.Connection):
+    return fetch_records(conn.execute(SELECT_BOOKS), Book)
+
+
+STRATEGIES: Dict[str, Callable] = {'dict': as_dicts, 'record': as_records}
+
+
+def measure(conn: sqlite3.Connection, fetch: Callable, repeat: int) -> Dict:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    result = fetch(conn)
+    retained, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    rows = len(result)
+    del result
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetch(conn)
+        timings.append(time.perf_counter() - started)
+    return {
+        'rows': rows,
+        'retained_bytes': retained,
+        'peak_bytes': peak,
+        'blocks': blocks,
+        'rows_per_sec': rows / min(timings),
+    }
+
+
+def run(rows: int, repeat: int) -> Dict[str, Dict]:
+    conn = make_database(rows)
+    try:
+        return {name: measure(conn, fetch, repeat) for name, fetch in STRATEGIES.items()}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"rows: {args.rows:,}")
+    print(f"{'':12}{'retained MiB':>14}{'peak MiB':>10}{'blocks':>12}{'rows/sec':>12}")
+    for name, result in results.items():
+        print(f"{name:12}{result['retained_bytes'] / 2**20:>14.1f}{result['peak_bytes'] / 2**20:>10.1f}"
+              f"{result['blocks']:>12,}{result['rows_per_sec']:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Storage encoding benchmark: legacy TEXT borrow_records vs integer epoch seconds
+and integer patron keys (schema v5).
+
+Generates one dataset, then rebuilds a copy of it with the pre-v5 encoding
+(ISO-8601 text timestamps, 6-digit text patron IDs) and compares on-disk size
+of the table and its indexes (from dbstat) and the cost of decoding loan rows
+back into datetimes.
+
+Usage:
+    python -m benchmarks.bench_storage [--profile small] [--repeat R]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Dict
+
+import numpy as np
+
+import database
+from benchmarks.generate_dataset import DEFAULT_SEED, PROFILES, generate_dataset
+
+BORROW_RECORDS_OBJECTS = (
+    'borrow_records',
+    'idx_borrow_records_patron_return',
+    'idx_borrow_records_book_return',
+    'idx_borrow_records_open_due',
+)
+
+
+def make_legacy_copy(source: str, target: str):
+    """Copy a v5 database and re-encode borrow_records the way v4 stored them."""
+    shutil.copyfile(source, target)
+    conn = sqlite3.connect(target)
+    conn.executescript('''
+        CREATE TABLE borrow_records_text (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        );
+        INSERT INTO borrow_records_text
+        SELECT id, printf('%06d', patron_id), book_id,
+               strftime('%Y-%m-%dT%H:%M:%S', borrow_date, 'unixepoch'),
+               strftime('%Y-%m-%dT%H:%M:%S', due_date, 'unixepoch'),
+               strftime('%Y-%m-%dT%H:%M:%S', return_date, 'unixepoch')
+        FROM borrow_records;
+        DROP TABLE borrow_records;
+        ALTER TABLE borrow_records_text RENAME TO borrow_records;
+    ''')
+    for statement in database._BORROW_RECORDS_INDEXES:
+        conn.execute(statement)
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def storage_profile(path: str) -> Dict:
+    """Bytes used by borrow_records and each of its indexes, plus bytes per row."""
+    conn = sqlite3.connect(path)
+    sizes = dict(conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name').fetchall())
+    payload = conn.execute("SELECT SUM(payload) FROM dbstat WHERE name = 'borrow_records'").fetchone()[0]
+    rows = conn.execute('SELECT COUNT(*) FROM borrow_records').fetchone()[0]
+    conn.close()
+    objects = {name: sizes.get(name, 0) for name in BORROW_RECORDS_OBJECTS}
+    return {
+        'rows': rows,
+        'objects': objects,
+        'table_bytes': objects['borrow_records'],
+        'index_bytes': sum(size for name, size in objects.items() if name != 'borrow_records'),
+        'payload_bytes_per_row': payload / rows if rows else 0.0,
+    }
+
+
+def decode_cost(path: str, repeat: int) -> Dict:
+    """
+    Best-of-`repeat` rows/sec decoding every loan's dates and patron ID, row by
+    row in Python and as one NumPy datetime64 conversion of the due dates
+    (the late fee engine's path).
+    """
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT patron_id, borrow_date, due_date, return_date FROM borrow_records').fetchall()
+    conn.close()
+
+    def decode():
+        for patron_id, borrow_date, due_date, return_date in rows:
+            database.from_db_patron_id(patron_id)
+            database.from_db_timestamp(borrow_date)
+            database.from_db_timestamp(due_date)
+            database.from_db_timestamp(return_date)
+
+    due_dates = [row[2] for row in rows]
+
+    def decode_vectorized():
+        due = np.asarray(due_dates)
+        if due.dtype.kind in 'iu':
+            return due.astype('datetime64[s]')
+        return due.astype('datetime64[us]')
+
+    def rate(func):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        return len(rows) / best if best else 0.0
+
+    return {'rows_per_sec': rate(decode), 'vectorized_rows_per_sec': rate(decode_vectorized)}
+
+
+def run(profile: str, repeat: int, seed: int = DEFAULT_SEED) -> Dict:
+    workdir = tempfile.mkdtemp(prefix='bench-storage-')
+    try:
+        encoded = os.path.join(workdir, 'encoded.db')
+        legacy = os.path.join(workdir, 'legacy.db')
+        generate_dataset(encoded, seed=seed, **PROFILES[profile])
+        conn = sqlite3.connect(encoded)
+        conn.execute('VACUUM')
+        conn.close()
+        make_legacy_copy(encoded, legacy)
+        return {
+            'profile': profile,
+            'legacy': dict(storage_profile(legacy), decode=decode_cost(legacy, repeat)),
+            'encoded': dict(storage_profile(encoded), decode=decode_cost(encoded, repeat)),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    result = run(args.profile, args.repeat)
+    legacy, encoded = result['legacy'], result['encoded']
+    print(f"rows:                 {encoded['rows']:,}")
+    print(f"{'':22}{'text':>14}{'integer':>14}{'ratio':>8}")
+    lines = [(name, legacy['objects'][name], encoded['objects'][name]) for name in BORROW_RECORDS_OBJECTS]
+    lines.append(('payload bytes/row', legacy['payload_bytes_per_row'], encoded['payload_bytes_per_row']))
+    lines.append(('decode rows/sec', legacy['decode']['rows_per_sec'], encoded['decode']['rows_per_sec']))
+    lines.append(('numpy due rows/sec', legacy['decode']['vectorized_rows_per_sec'],
+                  encoded['decode']['vectorized_rows_per_sec']))
+    for name, before, after in lines:
+        ratio = after / before if before else 0.0
+        print(f"{name[:21]:22}{before:>14,.0f}{after:>14,.0f}{ratio:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
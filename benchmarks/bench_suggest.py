@@ -0,0 +1,102 @@
+"""
+Typeahead benchmark for the in-memory prefix index behind /api/suggest.
+
+Builds a PrefixIndex over N synthetic books (titles from the dataset
+generator's word list plus one long-tail word each, so the vocabulary grows
+with the catalog the way real titles do) and reports build time, memory held
+by the index scaled to one million titles, and query latency percentiles for
+typical partial inputs: 1-3 letter prefixes, whole words and two-word queries.
+
+Usage:
+    python -m benchmarks.bench_suggest [--books 200000] [--queries 20000]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks.generate_dataset import FIRST_NAMES, LAST_NAMES, WORDS
+from services.suggest import PrefixIndex
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ren', 'sa', 'tor', 'vel', 'an', 'dri', 'el', 'os', 'thu', 'zan', 'bri', 'ne')
+
+
+def rare_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def generate_books(count: int, seed: int = 7) -> Iterator[Tuple[str, str]]:
+    rng = random.Random(seed)
+    authors = max(1, count // 10)
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(1, 4))]
+        words.insert(rng.randrange(len(words) + 1), rare_word(rng))
+        author_index = rng.randrange(authors)
+        author = f"{FIRST_NAMES[author_index % len(FIRST_NAMES)]} {LAST_NAMES[(author_index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+        if author_index >= len(FIRST_NAMES) * len(LAST_NAMES):
+            author += f" {author_index // (len(FIRST_NAMES) * len(LAST_NAMES))}"
+        yield ' '.join(words).title(), author
+
+
+def make_queries(count: int, seed: int = 11) -> List[str]:
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        word = rng.choice((rng.choice(WORDS), rare_word(rng), rng.choice(LAST_NAMES).lower()))
+        shape = rng.random()
+        if shape < 0.5:
+            queries.append(word[:rng.randint(1, 3)])
+        elif shape < 0.8:
+            queries.append(word)
+        else:
+            queries.append(f"{rng.choice(WORDS)} {word[:rng.randint(1, len(word))]}")
+    return queries
+
+
+def run(books: int, queries: int) -> Dict:
+    catalog = list(generate_books(books))
+    started = time.perf_counter()
+    PrefixIndex.build(catalog)
+    build_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    index = PrefixIndex.build(catalog)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for query in make_queries(queries):
+        started = time.perf_counter()
+        index.suggest(query)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'stats': index.stats(),
+        'build_seconds': build_seconds,
+        'retained_bytes': retained,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p99_ms': timings[int(len(timings) * 0.99)] * 1000,
+        'max_ms': timings[-1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=20_000)
+    args = parser.parse_args()
+
+    result = run(args.books, args.queries)
+    stats = result['stats']
+    print(f"books: {args.books:,}  suggestions: {stats['suggestions']:,}  "
+          f"tokens: {stats['tokens']:,}  postings: {stats['postings']:,}")
+    print(f"build: {result['build_seconds']:.2f}s  "
+          f"index: {result['retained_bytes'] / 2**20:.1f} MiB "
+          f"({result['retained_bytes'] / 2**20 * 1_000_000 / args.books:.0f} MiB per million titles)")
+    print(f"query: p50 {result['p50_ms']:.3f} ms  p99 {result['p99_ms']:.3f} ms  max {result['max_ms']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
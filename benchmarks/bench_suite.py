@@ -0,0 +1,368 @@
+"""
+Benchmark suite: service functions and Flask routes at small, medium and large scale.
+
+Each benchmark reports ops/sec, p50/p99 latency and SQL statements per call.
+Datasets are built once with generate_dataset and cached in benchmarks/data/;
+every run works on a fresh copy so write benchmarks don't drift between runs.
+Results can be saved as JSON and compared against an earlier run.
+
+Usage:
+    python -m benchmarks.bench_suite --sizes small medium --output results.json
+    python -m benchmarks.bench_suite --sizes small --compare baseline.json [--threshold 0.2]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import database
+from benchmarks.generate_dataset import DEFAULT_SEED, PROFILES, generate_dataset
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, calculate_late_fee_for_book,
+    search_books_in_catalog, get_patron_status_report, SEARCH_PAGE_SIZE
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_ITERATIONS = 200
+WARMUP_ITERATIONS = 5
+REGRESSION_THRESHOLD = 0.2  # relative change in ops/sec or p99 that counts as a regression
+QUERY_TOLERANCE = 0.5       # extra SQL statements per call that count as a regression
+LATENCY_FLOOR_MS = 0.05     # p99 changes smaller than this are timer noise, not regressions
+
+
+class QueryCounter:
+    """
+    Counts SQL statements per thread via sqlite3's trace callback.
+
+    Only statements the application issues are counted: statements run inside
+    triggers or by the FTS5 module on its shadow tables are skipped, as are the
+    repeated trace events sqlite3 emits for the outer statement of a trigger.
+    Register it with database.add_connection_hook() before connections are opened.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def __call__(self, conn: sqlite3.Connection):
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement: str):
+        if statement.startswith('--') or "'main'." in statement:
+            return
+        if statement == getattr(self._local, 'last', None):
+            return
+        self._local.last = statement
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+        self._local.last = None
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, 'count', 0)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(timings: List[float], queries: List[int]) -> Dict:
+    total = sum(timings)
+    return {
+        'calls': len(timings),
+        'ops_per_sec': round(len(timings) / total, 1) if total > 0 else 0.0,
+        'p50_ms': round(percentile(timings, 50) * 1000, 4),
+        'p99_ms': round(percentile(timings, 99) * 1000, 4),
+        'queries_per_call': round(sum(queries) / len(queries), 2),
+    }
+
+
+def check_result(func: Callable, args: tuple, result) -> None:
+    """
+    Fail the benchmark when a service call reports failure.
+
+    Service functions return (success, message) tuples; timing a call that bailed
+    out early (e.g. with "Database error") would report a fast but meaningless number.
+
+    Raises:
+        RuntimeError: If result is a (False, message) tuple
+    """
+    if isinstance(result, tuple) and result and result[0] is False:
+        name = getattr(func, '__name__', repr(func))
+        raise RuntimeError(f"{name}{args} failed: {result[1] if len(result) > 1 else result}")
+
+
+def measure(func: Callable, args_list: List[tuple], counter: QueryCounter) -> Dict:
+    """Time func(*args) for every args tuple, counting SQL statements per call."""
+    for args in args_list[:WARMUP_ITERATIONS]:
+        check_result(func, args, func(*args))
+    timings, queries = [], []
+    for args in args_list:
+        counter.reset()
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+        check_result(func, args, result)
+        queries.append(counter.count)
+    return summarize(timings, queries)
+
+
+def measure_pairs(first: Callable, second: Callable, args_list: List[tuple], counter: QueryCounter) -> Dict:
+    """Time two calls that undo each other (borrow, then return) and report them separately."""
+    results = {}
+    samples = {first: ([], []), second: ([], [])}
+    for args in args_list:
+        for func in (first, second):
+            counter.reset()
+            started = time.perf_counter()
+            result = func(*args)
+            samples[func][0].append(time.perf_counter() - started)
+            check_result(func, args, result)
+            samples[func][1].append(counter.count)
+    for func, (timings, queries) in samples.items():
+        results[func] = summarize(timings, queries)
+    return results
+
+
+class Workload:
+    """Inputs sampled (with a fixed seed) from a dataset so every run exercises the same rows."""
+
+    def __init__(self, path: str, iterations: int, seed: int = DEFAULT_SEED):
+        rng = random.Random(seed)
+        conn = sqlite3.connect(path)
+        decode = database.from_db_patron_id
+        idle_patrons = [decode(row[0]) for row in conn.execute('''
+            SELECT DISTINCT patron_id FROM borrow_records
+            WHERE patron_id NOT IN (SELECT patron_id FROM borrow_records WHERE return_date IS NULL)
+            LIMIT 10000
+        ''')] or ['999999']
+        available_books = [row[0] for row in conn.execute(
+            'SELECT id FROM books WHERE available_copies > 0 LIMIT 10000'
+        )]
+        open_loans = [(decode(patron), book) for patron, book in conn.execute(
+            'SELECT patron_id, book_id FROM borrow_records WHERE return_date IS NULL LIMIT 10000'
+        )]
+        patrons = [decode(row[0]) for row in conn.execute('SELECT DISTINCT patron_id FROM borrow_records LIMIT 10000')]
+        books = conn.execute('SELECT title, author, isbn FROM books ORDER BY id LIMIT 10000').fetchall()
+        conn.close()
+        if not available_books or not books:
+            raise ValueError(f"{path} has no books to benchmark against.")
+
+        pick = lambda seq: [rng.choice(seq) for _ in range(iterations)]
+        self.borrow_pairs = [(patron, book) for patron, book in zip(pick(idle_patrons), pick(available_books))]
+        self.open_loans = pick(open_loans) if open_loans else self.borrow_pairs
+        self.patrons = [(patron,) for patron in pick(patrons or idle_patrons)]
+        sampled = pick(books)
+        # Search by a single word so result sizes stay representative of user queries
+        self.title_terms = [(title.split()[-1], 'title') for title, author, isbn in sampled]
+        self.author_terms = [(author.split()[-1], 'author') for title, author, isbn in sampled]
+        self.isbn_terms = [(isbn, 'isbn') for title, author, isbn in sampled]
+
+
+def run_service_benchmarks(workload: Workload, counter: QueryCounter) -> Dict:
+    results = {}
+    pairs = measure_pairs(borrow_book_by_patron, return_book_by_patron, workload.borrow_pairs, counter)
+    results['service.borrow_book_by_patron'] = pairs[borrow_book_by_patron]
+    results['service.return_book_by_patron'] = pairs[return_book_by_patron]
+    results['service.calculate_late_fee_for_book'] = measure(
+        calculate_late_fee_for_book, workload.open_loans, counter)
+    results['service.search_books_in_catalog[title]'] = measure(
+        search_books_in_catalog, workload.title_terms, counter)
+    results['service.search_books_in_catalog[author]'] = measure(
+        search_books_in_catalog, workload.author_terms, counter)
+    results['service.search_books_in_catalog[isbn]'] = measure(
+        search_books_in_catalog, workload.isbn_terms, counter)
+    results['service.search_books_in_catalog[title,page]'] = measure(
+        lambda term, search_type: search_books_in_catalog(term, search_type, limit=SEARCH_PAGE_SIZE + 1),
+        workload.title_terms, counter)
+    results['service.get_patron_status_report'] = measure(
+        get_patron_status_report, workload.patrons, counter)
+    return results
+
+
+def run_route_benchmarks(workload: Workload, counter: QueryCounter) -> Dict:
+    from app import create_app
+
+    app = create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+
+    def get(url):
+        response = client.get(url)
+        assert response.status_code < 400, f"GET {url} returned {response.status_code}"
+
+    def post(url, patron_id, book_id):
+        response = client.post(url, data={'patron_id': patron_id, 'book_id': book_id})
+        assert response.status_code < 400, f"POST {url} returned {response.status_code}"
+
+    urls = lambda template, args: [(template.format(*arg),) for arg in args]
+    first_page = client.get('/api/books').get_json()
+    next_page = [(f"/api/books?after={first_page['next_cursor']}",)] * len(workload.patrons) \
+        if first_page.get('next_cursor') else [('/api/books',)] * len(workload.patrons)
+
+    results = {
+        'route.GET /catalog': measure(get, [('/catalog',)] * len(workload.patrons), counter),
+        'route.GET /search': measure(get, urls('/search?q={}&type={}', workload.title_terms), counter),
+        'route.GET /api/search': measure(get, urls('/api/search?q={}&type={}', workload.author_terms), counter),
+        'route.GET /api/books': measure(get, next_page, counter),
+        'route.GET /api/late_fee': measure(get, urls('/api/late_fee/{}/{}', workload.open_loans), counter),
+    }
+    pairs = measure_pairs(
+        lambda patron, book: post('/borrow', patron, book),
+        lambda patron, book: post('/return', patron, book),
+        workload.borrow_pairs, counter,
+    )
+    results['route.POST /borrow'], results['route.POST /return'] = pairs.values()
+    return results
+
+
+def ensure_dataset(size: str, seed: int = DEFAULT_SEED) -> str:
+    """
+    Path of the cached dataset for a named size, generating it on first use.
+
+    The schema version is part of the file name, so adding a migration makes
+    the suite generate a fresh dataset instead of reusing an outdated one.
+    """
+    path = os.path.join(DATA_DIR, f"{size}-{seed}-v{len(database.SCHEMA_MIGRATIONS)}.db")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"generating {size} dataset ({PROFILES[size]}) ...", file=sys.stderr)
+        generate_dataset(path, seed=seed, **PROFILES[size])
+    return path
+
+
+def run_dataset(path: str, iterations: int = DEFAULT_ITERATIONS, seed: int = DEFAULT_SEED) -> Dict:
+    """
+    Run every benchmark against a copy of the database at `path`.
+
+    Returns:
+        dict: Benchmark name -> {calls, ops_per_sec, p50_ms, p99_ms, queries_per_call}
+    """
+    workload = Workload(path, iterations, seed)
+    counter = QueryCounter()
+    previous_database = database.DATABASE
+    with tempfile.TemporaryDirectory() as workdir:
+        working_copy = os.path.join(workdir, os.path.basename(path))
+        shutil.copyfile(path, working_copy)
+        database.DATABASE = working_copy
+        database.init_database()  # bring datasets generated by older code up to the current schema
+        database.add_connection_hook(counter)
+        database.configure_pool()
+        database.configure_book_cache()
+        try:
+            results = run_service_benchmarks(workload, counter)
+            results.update(run_route_benchmarks(workload, counter))
+        finally:
+            database.remove_connection_hook(counter)
+            database.configure_pool()
+            database.configure_book_cache()
+            database.DATABASE = previous_database
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(DATA_DIR), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[str], iterations: int = DEFAULT_ITERATIONS, seed: int = DEFAULT_SEED) -> Dict:
+    """Run the suite for each named size and wrap the results with run metadata."""
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'iterations': iterations,
+            'seed': seed,
+        },
+        'results': {size: run_dataset(ensure_dataset(size, seed), iterations, seed) for size in sizes},
+    }
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Compare two run_suite() results.
+
+    Returns:
+        list: One entry per regression with size, benchmark, metric, baseline and current values
+    """
+    regressions = []
+    for size, benchmarks in current['results'].items():
+        for name, result in benchmarks.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            checks = (
+                ('ops_per_sec', result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold)),
+                ('p99_ms', result['p99_ms'] > max(before['p99_ms'] * (1 + threshold),
+                                                   before['p99_ms'] + LATENCY_FLOOR_MS)),
+                ('queries_per_call', result['queries_per_call'] > before['queries_per_call'] + QUERY_TOLERANCE),
+            )
+            for metric, regressed in checks:
+                if regressed:
+                    regressions.append({'size': size, 'benchmark': name, 'metric': metric,
+                                        'baseline': before[metric], 'current': result[metric]})
+    return regressions
+
+
+def format_results(suite: Dict) -> str:
+    lines = []
+    for size, benchmarks in suite['results'].items():
+        lines.append(f"\n[{size}]")
+        lines.append(f"{'benchmark':<46} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, result in benchmarks.items():
+            lines.append(f"{name:<46} {result['ops_per_sec']:>10,.0f} {result['p50_ms']:>9.3f} "
+                         f"{result['p99_ms']:>9.3f} {result['queries_per_call']:>8.2f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=sorted(PROFILES), default=['small'])
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline results JSON to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    suite = run_suite(args.sizes, args.iterations, args.seed)
+    print(format_results(suite))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(suite, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, suite, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION [{r['size']}] {r['benchmark']} {r['metric']}: {r['baseline']} -> {r['current']}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
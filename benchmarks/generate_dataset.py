@@ -0,0 +1,292 @@
+"""
+Synthetic dataset generator for library.db-shaped databases.
+
+Builds a database with N books, M patrons and a realistic mix of returned,
+open and overdue borrow records. Output is fully determined by the seed and
+the --as-of date, so benchmarks and capacity planning run against known shapes.
+A JSON size profile is written next to the database.
+
+Usage:
+    python -m benchmarks.generate_dataset out.db --profile medium
+    python -m benchmarks.generate_dataset out.db --books 1000000 --patrons 100000 --loans 20000000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+
+import database
+
+# Named dataset shapes shared with the benchmark suite
+PROFILES = {
+    'small': {'books': 1_000, 'patrons': 200, 'loans': 5_000},
+    'medium': {'books': 100_000, 'patrons': 10_000, 'loans': 500_000},
+    'large': {'books': 1_000_000, 'patrons': 100_000, 'loans': 20_000_000},
+}
+
+DEFAULT_SEED = 327
+DEFAULT_AS_OF = datetime(2025, 1, 1, 12, 0, 0)
+BATCH_SIZE = 50_000
+MAX_BORROWED = 5
+LOAN_DAYS = 14
+HISTORY_DAYS = 365
+OPEN_RATE = 0.08      # share of loans still out and not yet due
+OVERDUE_RATE = 0.04   # share of loans still out and past due
+HOT_SHARE = 0.3       # share of loans drawn from the most popular 5% of patrons/books
+
+WORDS = (
+    'the a of and in to night day river house garden city shadow light dark secret last first lost '
+    'great little old new young silent hidden broken golden silver winter summer autumn spring '
+    'king queen child stranger doctor captain road sea mountain island forest storm fire stone '
+    'glass paper iron heart mind song story history war peace love death life time world star '
+    'dream memory journey return letter voice window door bridge tower station empire kingdom '
+    'midnight morning evening wild quiet last long short hundred thousand years'
+).split()
+FIRST_NAMES = (
+    'James Mary John Patricia Robert Jennifer Michael Linda William Elizabeth David Barbara '
+    'Richard Susan Joseph Jessica Thomas Sarah Charles Karen Haruki Chimamanda Gabriel Toni '
+    'Leo Virginia Fyodor Jane Ursula Octavia Kazuo Zadie Salman Margaret'
+).split()
+LAST_NAMES = (
+    'Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Hernandez Lopez '
+    'Wilson Anderson Thomas Taylor Moore Jackson Martin Lee Murakami Adichie Marquez Morrison '
+    'Tolstoy Woolf Dostoevsky Austen Le Guin Butler Ishiguro Smith Rushdie Atwood'
+).split()
+
+
+def patron_id_for(index: int) -> str:
+    """Patron IDs are 6-digit strings starting at 100000 (stored as integers)."""
+    return f"{100000 + index:06d}"
+
+
+def isbn_for(book_id: int) -> str:
+    return f"978{book_id:010d}"
+
+
+def _fast_connection(path: str) -> sqlite3.Connection:
+    # The file is being built from scratch, so durability during the load doesn't matter
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    return conn
+
+
+def _drop_secondary_structures(conn: sqlite3.Connection) -> list:
+    """
+    Drop indexes and triggers so rows load without per-row index maintenance.
+
+    Returns:
+        list: The CREATE statements needed to restore them
+    """
+    saved = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"
+    ).fetchall()
+    for kind, name, sql in saved:
+        conn.execute(f'DROP {kind.upper()} {name}')
+    return [sql for kind, name, sql in saved]
+
+
+def _rebuild_secondary_structures(conn: sqlite3.Connection, statements: list):
+    """Recreate dropped indexes and triggers and repopulate the search indexes, if any."""
+    for sql in statements:
+        conn.execute(sql)
+    for index in ('books_fts', 'books_trigram'):
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (index,)).fetchone():
+            conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def _generate_loans(rng: random.Random, config: Dict, copies: array, open_by_book: array,
+                    open_by_patron: array, as_of: datetime, counts: Dict) -> Iterator[Tuple]:
+    """Yield borrow_records rows, keeping per-patron and per-book open loan counts consistent."""
+    books, patrons = config['books'], config['patrons']
+    history_seconds = HISTORY_DAYS * 86400
+    hot_patrons, hot_books = max(1, patrons // 20), max(1, books // 20)
+    for _ in range(config['loans']):
+        # Skew activity: the top 5% of patrons and titles account for roughly a third of loans
+        patron = rng.randrange(hot_patrons) if rng.random() < HOT_SHARE else rng.randrange(patrons)
+        book = rng.randrange(hot_books) if rng.random() < HOT_SHARE else rng.randrange(books)
+
+        roll = rng.random()
+        state = 'returned'
+        if roll < OPEN_RATE + OVERDUE_RATE and open_by_patron[patron] < MAX_BORROWED \
+                and open_by_book[book] < copies[book]:
+            state = 'open' if roll < OPEN_RATE else 'overdue'
+
+        if state == 'open':
+            borrow_date = as_of - timedelta(seconds=rng.randrange(LOAN_DAYS * 86400))
+        elif state == 'overdue':
+            borrow_date = as_of - timedelta(seconds=rng.randrange((LOAN_DAYS + 1) * 86400, 75 * 86400))
+        else:
+            borrow_date = as_of - timedelta(seconds=rng.randrange(LOAN_DAYS * 86400, history_seconds))
+        due_date = borrow_date + timedelta(days=LOAN_DAYS)
+
+        return_date = None
+        if state == 'returned':
+            # Recent loans can't have been returned after as_of
+            returned = borrow_date + timedelta(seconds=rng.randrange(3600, 21 * 86400))
+            return_date = database.to_db_timestamp(min(returned, as_of))
+        else:
+            open_by_patron[patron] += 1
+            open_by_book[book] += 1
+        counts[state] += 1
+
+        yield (100000 + patron, book + 1, database.to_db_timestamp(borrow_date),
+               database.to_db_timestamp(due_date), return_date)
+
+
+def _generate_books(rng: random.Random, config: Dict, copies: array, open_by_book: array) -> Iterator[Tuple]:
+    authors = max(1, config['books'] // 10)
+    for book in range(config['books']):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 5))).title()
+        author_index = rng.randrange(authors)
+        author = f"{FIRST_NAMES[author_index % len(FIRST_NAMES)]} {LAST_NAMES[(author_index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+        if author_index >= len(FIRST_NAMES) * len(LAST_NAMES):
+            author += f" {author_index // (len(FIRST_NAMES) * len(LAST_NAMES))}"
+        yield (book + 1, title[:200], author[:100], isbn_for(book + 1), copies[book], copies[book] - open_by_book[book])
+
+
+def _batched(rows: Iterator[Tuple], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def size_profile(path: str) -> Dict:
+    """Row counts, loan states and on-disk sizes of a generated (or any) library database."""
+    conn = sqlite3.connect(path)
+    profile = {
+        'books': conn.execute('SELECT COUNT(*) FROM books').fetchone()[0],
+        'patrons': conn.execute('SELECT COUNT(DISTINCT patron_id) FROM borrow_records').fetchone()[0],
+        'loans': conn.execute('SELECT COUNT(*) FROM borrow_records').fetchone()[0],
+        'file_bytes': os.path.getsize(path),
+        'page_size': conn.execute('PRAGMA page_size').fetchone()[0],
+        'page_count': conn.execute('PRAGMA page_count').fetchone()[0],
+    }
+    try:
+        profile['objects'] = {
+            name: size for name, size in conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY name')
+        }
+    except sqlite3.OperationalError:
+        profile['objects'] = None  # SQLite built without the dbstat virtual table
+    conn.close()
+    return profile
+
+
+def generate_dataset(path: str, books: int, patrons: int, loans: int, seed: int = DEFAULT_SEED,
+                     as_of: datetime = DEFAULT_AS_OF, batch_size: int = BATCH_SIZE,
+                     profile_path: Optional[str] = None) -> Dict:
+    """
+    Build a new database at `path` and write its size profile.
+
+    Args:
+        path: Output database file (must not exist)
+        books, patrons, loans: Dataset shape
+        seed: Random seed; the same seed and as_of always produce the same data
+        as_of: The 'current' time that open and overdue loans are relative to
+        batch_size: Rows per executemany call
+        profile_path: Where to write the JSON profile (defaults to <path>.profile.json)
+
+    Returns:
+        dict: The size profile
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    if not 0 < patrons <= 900_000:
+        raise ValueError("Patrons must be between 1 and 900000 (6-digit IDs).")
+    if books < 1:
+        raise ValueError("At least one book is required.")
+
+    started = time.perf_counter()
+    config = {'books': books, 'patrons': patrons, 'loans': loans}
+    rng = random.Random(seed)
+
+    # Create the schema exactly as the application would
+    previous_database = database.DATABASE
+    database.DATABASE = path
+    try:
+        database.init_database()
+    finally:
+        database.configure_pool()
+        database.DATABASE = previous_database
+
+    copies = array('b', (rng.randint(1, 5) for _ in range(books)))
+    open_by_book = array('b', bytes(books))
+    open_by_patron = array('b', bytes(patrons))
+    counts = {'returned': 0, 'open': 0, 'overdue': 0}
+
+    conn = _fast_connection(path)
+    dropped = _drop_secondary_structures(conn)
+    conn.commit()
+
+    for batch in _batched(_generate_loans(rng, config, copies, open_by_book, open_by_patron, as_of, counts), batch_size):
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+
+    for batch in _batched(_generate_books(rng, config, copies, open_by_book), batch_size):
+        conn.executemany('''
+            INSERT INTO books (id, title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+
+    _rebuild_secondary_structures(conn, dropped)
+    # Triggers were off during the load, so the patron counters are rebuilt in one pass
+    database.reconcile_patron_counters(as_of, conn=conn)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.commit()
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.close()
+
+    profile = size_profile(path)
+    profile.update({
+        'seed': seed,
+        'as_of': as_of.isoformat(),
+        'requested': config,
+        'loan_states': counts,
+        'build_seconds': round(time.perf_counter() - started, 2),
+    })
+    with open(profile_path or f"{path}.profile.json", 'w') as f:
+        json.dump(profile, f, indent=2)
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="Output database file")
+    parser.add_argument('--profile', choices=sorted(PROFILES), help="Named dataset shape")
+    parser.add_argument('--books', type=int)
+    parser.add_argument('--patrons', type=int)
+    parser.add_argument('--loans', type=int)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--as-of', type=datetime.fromisoformat, default=DEFAULT_AS_OF,
+                        help="Reference 'now' for open/overdue loans (ISO-8601)")
+    args = parser.parse_args()
+
+    shape = dict(PROFILES[args.profile or 'small'])
+    for key in ('books', 'patrons', 'loans'):
+        if getattr(args, key) is not None:
+            shape[key] = getattr(args, key)
+
+    profile = generate_dataset(args.path, seed=args.seed, as_of=args.as_of, **shape)
+    print(json.dumps({key: value for key, value in profile.items() if key != 'objects'}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
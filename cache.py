@@ -0,0 +1,174 @@
+"""
+Cache module for Library Management System
+Bounded, thread-safe in-memory caches used in front of database lookups
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live per entry.
+
+    Holds at most `maxsize` entries; the least recently used entry is evicted
+    first. Entries older than `ttl` seconds are treated as misses.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so in-flight loads don't store stale values
+        self._generation = 0
+        self._version: Optional[Hashable] = None
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, counting a hit or a miss."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._data[key]
+                self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        """
+        Store a value. If `generation` is given and an invalidation has happened
+        since it was read, the value may be stale and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Read-through lookup: return the cached value or call loader() and cache it (unless None)."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self.generation
+        value = loader()
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    @property
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def invalidate(self, key: Hashable):
+        """Drop one entry."""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+            self._data.clear()
+
+    def ensure_version(self, version: Hashable):
+        """
+        Drop every entry when `version` differs from the one the entries were
+        stored under, e.g. the version of the data the cache sits in front of.
+        The check and the clear happen under the cache's lock.
+        """
+        with self._lock:
+            if version == self._version:
+                return
+            if self._version is not None:
+                self._generation += 1
+                self._stats['invalidations'] += 1
+                self._data.clear()
+            self._version = version
+
+    def stats(self) -> Dict:
+        """Snapshot of size and hit/miss/eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats['hits'] + stats['misses']
+            stats.update({
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hit_ratio': stats['hits'] / lookups if lookups else 0.0,
+            })
+            return stats
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the
+    function and callers arriving before it finishes wait for, and share, its
+    result (or its exception). Nothing is remembered once the call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {'executions': 0, 'coalesced': 0}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Run func() for `key`, or wait for the call already in flight for it."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['executions'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self) -> Dict:
+        """Calls executed, calls that waited on another caller's result, and calls in flight."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights))
@@ -3,23 +3,300 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import base64
+import json
+import re
 import sqlite3
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app, g, has_app_context
+
+from cache import LRUCache
+from query_stats import fingerprint, instrumentation_enabled, record_query
+from records import Book, Loan, fetch_records
+from tracing import current_span, span, traced, tracing_enabled
 
 # Database configuration
 DATABASE = 'library.db'
+DB_POOL_SIZE = 5
+DB_POOL_TIMEOUT = 5.0  # seconds to wait for a free connection
+DB_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file to memory-map
+CATALOG_PAGE_SIZE = 50
+CATALOG_MAX_PAGE_SIZE = 200
+BOOK_CACHE_SIZE = 10000
+BOOK_CACHE_TTL = 30.0  # seconds; bounds staleness from writes made by other processes
+TRANSACTION_RETRIES = 5
+TRANSACTION_BACKOFF = 0.01  # seconds, doubled on every retry
+EXPORT_BATCH_SIZE = 1000  # rows per fetchmany() when streaming an export
+
+_connection_hooks: List[Callable[[sqlite3.Connection], None]] = []
+
+def add_connection_hook(hook: Callable[[sqlite3.Connection], None]):
+    """Register a callback run on every new pooled connection (e.g. to install a trace callback)."""
+    if hook not in _connection_hooks:
+        _connection_hooks.append(hook)
+
+def remove_connection_hook(hook: Callable[[sqlite3.Connection], None]):
+    """Unregister a connection hook; connections already open keep whatever it installed."""
+    if hook in _connection_hooks:
+        _connection_hooks.remove(hook)
+
+_book_listeners: List[Callable[[List[Tuple[str, str]]], None]] = []
+
+def add_book_listener(listener: Callable[[List[Tuple[str, str]]], None]):
+    """Register a callback given the (title, author) of books after they are committed."""
+    if listener not in _book_listeners:
+        _book_listeners.append(listener)
+
+def remove_book_listener(listener: Callable[[List[Tuple[str, str]]], None]):
+    """Unregister a book listener."""
+    if listener in _book_listeners:
+        _book_listeners.remove(listener)
+
+def _notify_books_added(books: List[Tuple[str, str]]):
+    for listener in list(_book_listeners):
+        listener(books)
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+class PooledConnection:
+    """
+    Proxy around a pooled sqlite3 connection.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to its pool instead of closing it. Request-scoped
+    connections ignore close() and are released at app-context teardown.
+    execute() and executemany() are timed and reported to query_stats, and
+    traced, when either is enabled; otherwise they go straight to sqlite3.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, pool: 'ConnectionPool', request_scoped: bool = False):
+        self._conn = conn
+        self._pool = pool
+        self._request_scoped = request_scoped
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def execute(self, sql: str, parameters=()):
+        """Execute a statement, timing it (to the first row) for query_stats and tracing."""
+        if not (instrumentation_enabled() or tracing_enabled()):
+            return self._conn.execute(sql, parameters)
+        return self._instrumented(self._conn.execute, sql, parameters, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        """Execute a statement once per parameter set; recorded as a single statement."""
+        if not (instrumentation_enabled() or tracing_enabled()):
+            return self._conn.executemany(sql, seq_of_parameters)
+        return self._instrumented(self._conn.executemany, sql, seq_of_parameters, ())
+
+    def _instrumented(self, method, sql, arguments, parameters):
+        if tracing_enabled() and current_span() is not None:
+            with span('db.statement', statement=fingerprint(sql)):
+                return self._timed(method, sql, arguments, parameters)
+        return self._timed(method, sql, arguments, parameters)
+
+    def _timed(self, method, sql, arguments, parameters):
+        if not instrumentation_enabled():
+            return method(sql, arguments)
+        started = time.perf_counter()
+        try:
+            return method(sql, arguments)
+        finally:
+            record_query(self._conn, sql, parameters, time.perf_counter() - started)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        """Return the connection to the pool (no-op for request-scoped connections)."""
+        if not self._request_scoped:
+            self.release()
+
+    def release(self):
+        """Return the connection to the pool regardless of scope."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Safety net for code paths that forget to close their connection
+        if getattr(self, '_conn', None) is not None:
+            self.release()
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections for a single database file.
+
+    Connections are opened lazily up to `size`; once the pool is exhausted,
+    callers wait up to `timeout` seconds for a connection to be released.
+    """
+
+    def __init__(self, database: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[sqlite3.Connection] = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0, 'wait_time': 0.0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # This enables column access by name
+        # Per-connection pragmas; journal_mode=WAL is persistent and set in init_database()
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(DB_MMAP_SIZE)}')
+        for hook in list(_connection_hooks):
+            hook(conn)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection from the pool, opening or waiting for one if needed."""
+        with self._cond:
+            if self._idle:
+                self._stats['hits'] += 1
+                return self._idle.pop()
+            if self._created < self.size:
+                self._created += 1
+                self._stats['misses'] += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+            self._stats['waits'] += 1
+            started = time.monotonic()
+            deadline = started + self.timeout
+            while not self._idle:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+            self._stats['wait_time'] += time.monotonic() - started
+            return self._idle.pop()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection, discarding any transaction left open by the caller."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped rather than handed out again
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            if self._closed:
+                conn.close()
+                self._created -= 1
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close idle connections; connections still in use are closed on release."""
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._created -= len(self._idle)
+            self._idle.clear()
+
+    def stats(self) -> Dict:
+        """Snapshot of pool occupancy and hit/miss/wait counters."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'database': self.database,
+                'size': self.size,
+                'open': self._created,
+                'idle': len(self._idle),
+                'in_use': self._created - len(self._idle),
+            })
+            return stats
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_pool_size = DB_POOL_SIZE
+_pool_timeout = DB_POOL_TIMEOUT
+
+def get_pool() -> ConnectionPool:
+    """Get the connection pool for the current DATABASE, recreating it if the path changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database != DATABASE:
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DATABASE, _pool_size, _pool_timeout)
+        return _pool
+
+def configure_pool(size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+    """Set the pool size and wait timeout; the pool is rebuilt on next use."""
+    global _pool, _pool_size, _pool_timeout
+    if size < 1:
+        raise ValueError("Pool size must be at least 1.")
+    with _pool_lock:
+        _pool_size, _pool_timeout = size, timeout
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+def get_pool_stats() -> Dict:
+    """Get hit/miss/wait metrics for the connection pool."""
+    return get_pool().stats()
 
 def get_db_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
-    return conn
+    """
+    Get a database connection.
+
+    Inside an app context of an app set up with init_app(), the same
+    connection is reused for the whole request and released on teardown.
+    Otherwise a pooled connection is returned; close() gives it back.
+    """
+    if has_app_context() and 'database' in current_app.extensions:
+        conn = g.get('_db_conn')
+        if conn is None:
+            pool = get_pool()
+            conn = g._db_conn = PooledConnection(pool.acquire(), pool, request_scoped=True)
+        return conn
+    pool = get_pool()
+    return PooledConnection(pool.acquire(), pool)
+
+def close_db_connection(exception=None):
+    """Release the request-scoped connection (registered as an app-context teardown)."""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.release()
+
+def init_app(app):
+    """Configure the connection pool from app config and tie connections to the app context."""
+    app.config.setdefault('DB_POOL_SIZE', DB_POOL_SIZE)
+    app.config.setdefault('DB_POOL_TIMEOUT', DB_POOL_TIMEOUT)
+    configure_pool(app.config['DB_POOL_SIZE'], app.config['DB_POOL_TIMEOUT'])
+    app.extensions['database'] = get_pool
+    app.teardown_appcontext(close_db_connection)
 
 def init_database():
-    """Initialize the database with required tables."""
+    """Initialize the database with required tables and apply pending schema migrations."""
     conn = get_db_connection()
     
+    # WAL lets readers proceed while a writer holds the lock
+    conn.execute('PRAGMA journal_mode = WAL')
+    
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -46,7 +323,279 @@ def init_database():
     ''')
     
     conn.commit()
-    conn.close()
+    
+    try:
+        migrate_database(conn)
+    finally:
+        conn.close()
+
+# Schema Migrations
+
+# Ordered list of (version, description, steps). A step is either an SQL
+# statement or a callable taking the connection. Each migration runs in its
+# own transaction and bumps PRAGMA user_version, so existing library.db files
+# are upgraded in place the next time init_database() runs.
+_BORROW_RECORDS_INDEXES = [
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_return
+       ON borrow_records (patron_id, return_date)''',
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_records_book_return
+       ON borrow_records (book_id, return_date)''',
+    '''CREATE INDEX IF NOT EXISTS idx_borrow_records_open_due
+       ON borrow_records (due_date) WHERE return_date IS NULL''',
+]
+
+# open_loans is kept exact by triggers, so every write path maintains it
+# in the same transaction as the loan change
+_PATRON_COUNTER_TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS borrow_records_patrons_ai AFTER INSERT ON borrow_records BEGIN
+           INSERT INTO patrons (patron_id, open_loans) VALUES (new.patron_id, new.return_date IS NULL)
+           ON CONFLICT (patron_id) DO UPDATE SET open_loans = open_loans + (new.return_date IS NULL);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS borrow_records_patrons_au
+       AFTER UPDATE OF patron_id, return_date ON borrow_records BEGIN
+           UPDATE patrons SET open_loans = open_loans - (old.return_date IS NULL)
+           WHERE patron_id = old.patron_id;
+           INSERT INTO patrons (patron_id, open_loans) VALUES (new.patron_id, new.return_date IS NULL)
+           ON CONFLICT (patron_id) DO UPDATE SET open_loans = open_loans + (new.return_date IS NULL);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS borrow_records_patrons_ad AFTER DELETE ON borrow_records BEGIN
+           UPDATE patrons SET open_loans = open_loans - (old.return_date IS NULL)
+           WHERE patron_id = old.patron_id;
+       END''',
+]
+
+SCHEMA_MIGRATIONS = [
+    (1, 'Indexes for open-loan lookups', _BORROW_RECORDS_INDEXES),
+    (2, 'FTS5 search index over book title and author', [
+        lambda conn: _create_books_fts(conn),
+    ]),
+    (3, 'Index for keyset pagination of the catalog', [
+        'CREATE INDEX IF NOT EXISTS idx_books_title_id ON books (title, id)',
+    ]),
+    (4, 'Patrons table with materialized loan counters', [
+        '''CREATE TABLE IF NOT EXISTS patrons (
+               patron_id TEXT PRIMARY KEY,
+               open_loans INTEGER NOT NULL DEFAULT 0,
+               overdue_loans INTEGER NOT NULL DEFAULT 0,
+               fee_balance REAL NOT NULL DEFAULT 0,
+               counters_as_of TEXT
+           )''',
+        *_PATRON_COUNTER_TRIGGERS,
+        # Time-dependent counters are filled in by the reconcile at the end of v5
+        '''INSERT INTO patrons (patron_id, open_loans)
+           SELECT patron_id, SUM(return_date IS NULL) FROM borrow_records GROUP BY patron_id''',
+    ]),
+    (5, 'Integer epoch-second timestamps and integer patron keys', [
+        '''CREATE TABLE borrow_records_v5 (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               patron_id INTEGER NOT NULL,
+               book_id INTEGER NOT NULL,
+               borrow_date INTEGER NOT NULL,
+               due_date INTEGER NOT NULL,
+               return_date INTEGER,
+               FOREIGN KEY (book_id) REFERENCES books (id)
+           )''',
+        '''INSERT INTO borrow_records_v5 (id, patron_id, book_id, borrow_date, due_date, return_date)
+           SELECT id, CAST(patron_id AS INTEGER), book_id,
+                  iif(typeof(borrow_date) = 'integer', borrow_date, CAST(strftime('%s', borrow_date) AS INTEGER)),
+                  iif(typeof(due_date) = 'integer', due_date, CAST(strftime('%s', due_date) AS INTEGER)),
+                  iif(typeof(return_date) = 'integer', return_date, CAST(strftime('%s', return_date) AS INTEGER))
+           FROM borrow_records''',
+        'DROP TABLE borrow_records',
+        'ALTER TABLE borrow_records_v5 RENAME TO borrow_records',
+        '''CREATE TABLE patrons_v5 (
+               patron_id INTEGER PRIMARY KEY,
+               open_loans INTEGER NOT NULL DEFAULT 0,
+               overdue_loans INTEGER NOT NULL DEFAULT 0,
+               fee_balance REAL NOT NULL DEFAULT 0,
+               counters_as_of INTEGER
+           )''',
+        'DROP TABLE patrons',
+        'ALTER TABLE patrons_v5 RENAME TO patrons',
+        *_BORROW_RECORDS_INDEXES,
+        *_PATRON_COUNTER_TRIGGERS,
+        lambda conn: reconcile_patron_counters(conn=conn),
+    ]),
+    (6, 'Catalog version counter for HTTP conditional requests', [
+        '''CREATE TABLE IF NOT EXISTS catalog_version (
+               id INTEGER PRIMARY KEY CHECK (id = 1),
+               version INTEGER NOT NULL,
+               updated_at INTEGER NOT NULL
+           )''',
+        "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 1, CAST(strftime('%s', 'now') AS INTEGER))",
+        # Any write to books (insert_book, availability changes inside the
+        # borrow/return transactions, bulk imports) moves the version on
+        *[f'''CREATE TRIGGER IF NOT EXISTS books_catalog_version_{suffix} AFTER {event} ON books BEGIN
+                  UPDATE catalog_version SET version = version + 1,
+                         updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                  WHERE id = 1;
+              END''' for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))],
+    ]),
+    (7, 'Trigram index over book title and author for fuzzy search', [
+        lambda conn: _create_books_trigram(conn),
+    ]),
+    (8, 'Indexes for available-only and availability-ordered search', [
+        # Title order over only the books with a copy on the shelf
+        'CREATE INDEX IF NOT EXISTS idx_books_available_title ON books (title, id) WHERE available_copies > 0',
+        'CREATE INDEX IF NOT EXISTS idx_books_availability ON books (available_copies DESC, title, id)',
+    ]),
+]
+
+def get_schema_version(conn=None) -> int:
+    """Get the schema version recorded in the database."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_db_connection()
+    try:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        if own_conn:
+            conn.close()
+
+def migrate_database(conn) -> List[int]:
+    """
+    Apply every migration newer than the database's schema version.
+    
+    Returns:
+        list: Versions that were applied (empty if already up to date)
+    """
+    applied = []
+    for version, description, steps in SCHEMA_MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the lock
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+# Full-Text Search
+
+# Whether each search index table exists, keyed by (database, table)
+_search_indexes: Dict[Tuple[str, str], bool] = {}
+
+def _create_books_fts(conn):
+    """Create the books_fts index and the triggers that keep it in sync with books."""
+    if not sqlite_has_fts5(conn):
+        # Search falls back to LIKE scans on SQLite builds without FTS5
+        return
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+            title, author,
+            content='books', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_fts (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+    _search_indexes.pop((DATABASE, 'books_fts'), None)
+
+def _create_books_trigram(conn):
+    """
+    Create the books_trigram index (every three-character substring of title
+    and author, case-folded), its books_trigram_vocab document-frequency view
+    and the triggers that keep it in sync with books. detail=none keeps only
+    which rows contain each trigram, which is all fuzzy search needs.
+    """
+    if not sqlite_has_trigram(conn):
+        # Fuzzy search falls back to LIKE scans without the trigram tokenizer
+        return
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_trigram USING fts5(
+            title, author,
+            content='books', content_rowid='id',
+            tokenize='trigram',
+            detail=none
+        )
+    ''')
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS books_trigram_vocab USING fts5vocab(books_trigram, 'row')")
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_trigram_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_trigram (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_trigram_ad AFTER DELETE ON books BEGIN
+            INSERT INTO books_trigram (books_trigram, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS books_trigram_au AFTER UPDATE OF title, author ON books BEGIN
+            INSERT INTO books_trigram (books_trigram, rowid, title, author) VALUES ('delete', old.id, old.title, old.author);
+            INSERT INTO books_trigram (rowid, title, author) VALUES (new.id, new.title, new.author);
+        END
+    ''')
+    conn.execute("INSERT INTO books_trigram (books_trigram) VALUES ('rebuild')")
+    _search_indexes.pop((DATABASE, 'books_trigram'), None)
+
+def sqlite_has_fts5(conn) -> bool:
+    """Check whether the SQLite library was compiled with FTS5."""
+    return conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0] == 1
+
+def sqlite_has_trigram(conn) -> bool:
+    """Check whether FTS5 has the trigram tokenizer (SQLite 3.34+)."""
+    return sqlite_has_fts5(conn) and sqlite3.sqlite_version_info >= (3, 34, 0)
+
+def _search_index_exists(table: str) -> bool:
+    key = (DATABASE, table)
+    if key not in _search_indexes:
+        conn = get_db_connection()
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        conn.close()
+        _search_indexes[key] = row is not None
+    return _search_indexes[key]
+
+def fts_enabled() -> bool:
+    """Check whether the current database has the books_fts search index."""
+    return _search_index_exists('books_fts')
+
+def trigram_enabled() -> bool:
+    """Check whether the current database has the books_trigram fuzzy search index."""
+    return _search_index_exists('books_trigram')
+
+def build_fts_query(search_term: str, column: str) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression that prefix-matches every word of the
+    search term within one column, e.g. 'great gats' -> title : ("great"* "gats"*).
+    
+    Returns:
+        The MATCH expression, or None if the term contains no searchable words
+    """
+    tokens = re.findall(r'\w+', search_term.lower())
+    if not tokens:
+        return None
+    return f'{column} : (' + ' '.join(f'"{token}"*' for token in tokens) + ')'
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
@@ -71,9 +620,9 @@ def add_sample_data():
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
+        ''', (to_db_patron_id('123456'), 3, 
+              to_db_timestamp(datetime.now() - timedelta(days=5)),
+              to_db_timestamp(datetime.now() + timedelta(days=9))))
         
         # Update available copies for 1984
         conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
@@ -82,64 +631,411 @@ def add_sample_data():
     
     conn.close()
 
+# Storage Encoding
+
+# borrow_records and patrons store timestamps as whole epoch seconds and
+# patron IDs as integers. Datetimes are naive local times, encoded as if
+# they were UTC so that decoding gives back the same wall-clock value.
+_EPOCH = datetime(1970, 1, 1)
+
+def to_db_timestamp(value: Optional[datetime]) -> Optional[int]:
+    """Encode a datetime as epoch seconds (sub-second precision is dropped)."""
+    if value is None:
+        return None
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+def from_db_timestamp(value) -> Optional[datetime]:
+    """Decode a stored timestamp; accepts epoch seconds or legacy ISO-8601 text."""
+    if type(value) is int:
+        return _EPOCH + timedelta(0, value)
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, float):
+        return _EPOCH + timedelta(0, value)
+    return datetime.fromisoformat(str(value))
+
+def to_db_patron_id(patron_id) -> Optional[int]:
+    """Encode a library card ID; IDs that aren't all digits match no stored patron."""
+    if isinstance(patron_id, int):
+        return patron_id
+    patron_id = str(patron_id or '').strip()
+    return int(patron_id) if patron_id.isdigit() else None
+
+def from_db_patron_id(value) -> Optional[str]:
+    """Decode a stored patron key back to its zero-padded 6-digit form."""
+    if isinstance(value, int):
+        return f"{value:06d}"
+    return value
+
+def decode_loan(row) -> Dict:
+    """A borrow_records row as a dict with datetimes and a string patron ID."""
+    loan = dict(row)
+    for key in ('borrow_date', 'due_date', 'return_date'):
+        if key in loan:
+            loan[key] = from_db_timestamp(loan[key])
+    if 'patron_id' in loan:
+        loan['patron_id'] = from_db_patron_id(loan['patron_id'])
+    return loan
+
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
+def get_all_books() -> List[Book]:
     """Get all books from the database."""
     conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
+    books = fetch_records(conn.execute('SELECT * FROM books ORDER BY title'), Book)
     conn.close()
-    return [dict(book) for book in books]
+    return books
 
-def get_book_by_id(book_id: int) -> Optional[Dict]:
-    """Get a specific book by ID."""
+def encode_cursor(title: str, book_id: int) -> str:
+    """Encode a (title, id) catalog position as an opaque URL-safe cursor."""
+    raw = json.dumps([title, book_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Decode a cursor from encode_cursor(); raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        title, book_id = json.loads(raw.decode('utf-8'))
+    except Exception:
+        raise ValueError("Invalid cursor.")
+    if not isinstance(title, str) or not isinstance(book_id, int):
+        raise ValueError("Invalid cursor.")
+    return title, book_id
+
+def clamp_catalog_page_size(limit) -> int:
+    """Clamp a requested catalog page size to 1..CATALOG_MAX_PAGE_SIZE."""
+    return max(1, min(int(limit), CATALOG_MAX_PAGE_SIZE))
+
+@traced('db.get_books_page')
+def get_books_page(after: Optional[str] = None, limit: int = CATALOG_PAGE_SIZE) -> Tuple[List[Book], Optional[str]]:
+    """
+    Get one page of the catalog ordered by (title, id) using keyset pagination.
+    
+    Args:
+        after: Cursor of the last book on the previous page (None for the first page)
+        limit: Page size, clamped to 1..CATALOG_MAX_PAGE_SIZE
+        
+    Returns:
+        tuple: (books on this page, cursor for the next page or None on the last page)
+    """
+    limit = clamp_catalog_page_size(limit)
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,)).fetchone()
+    if after:
+        title, book_id = decode_cursor(after)
+        cursor = conn.execute('''
+            SELECT * FROM books WHERE (title, id) > (?, ?)
+            ORDER BY title, id LIMIT ?
+        ''', (title, book_id, limit + 1))
+    else:
+        cursor = conn.execute('SELECT * FROM books ORDER BY title, id LIMIT ?', (limit + 1,))
+    books = fetch_records(cursor, Book)
     conn.close()
-    return dict(book) if book else None
+    
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(books[-1]['title'], books[-1]['id'])
+    return books, next_cursor
+
+# Read-through cache for book lookups. Entries are keyed by database path;
+# ISBN entries only map to a book id, so invalidating the id entry is enough
+# after any write to a book row. Availability read from the cache is only
+# used for display and early rejection: borrow_book_transaction() re-reads
+# the row under the write lock, so a stale entry can never let a borrow
+# of the last copy succeed twice.
+_book_cache = LRUCache(BOOK_CACHE_SIZE, BOOK_CACHE_TTL)
+
+def _book_cache_key(book_id) -> Optional[Tuple]:
+    try:
+        return ('id', DATABASE, int(book_id))
+    except (TypeError, ValueError):
+        return None
+
+def invalidate_book_cache(book_id=None):
+    """Drop a cached book after a write, or the whole cache if no id is given."""
+    if book_id is None:
+        _book_cache.clear()
+        return
+    key = _book_cache_key(book_id)
+    if key is not None:
+        _book_cache.invalidate(key)
+
+def configure_book_cache(size: int = BOOK_CACHE_SIZE, ttl: Optional[float] = BOOK_CACHE_TTL):
+    """Replace the book cache with one of the given size and TTL."""
+    global _book_cache
+    _book_cache = LRUCache(size, ttl)
 
-def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
+def get_book_cache_stats() -> Dict:
+    """Get hit/miss/eviction counters for the book lookup cache."""
+    return _book_cache.stats()
+
+def _load_book_by_id(book_id) -> Optional[Book]:
+    conn = get_db_connection()
+    cursor = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,))
+    cursor.row_factory = Book.row_factory
+    book = cursor.fetchone()
+    conn.close()
+    return book
+
+@traced('db.get_book_by_id')
+def get_book_by_id(book_id: int) -> Optional[Book]:
+    """Get a specific book by ID (served from the book cache when possible)."""
+    key = _book_cache_key(book_id)
+    if key is None:
+        return _load_book_by_id(book_id)
+    book = _book_cache.get_or_load(key, lambda: _load_book_by_id(book_id))
+    return book.copy() if book else None
+
+@traced('db.get_book_by_isbn')
+def get_book_by_isbn(isbn: str) -> Optional[Book]:
+    """Get a specific book by ISBN (served from the book cache when possible)."""
+    key = ('isbn', DATABASE, isbn)
+    book_id = _book_cache.get(key)
+    if book_id is not None:
+        book = get_book_by_id(book_id)
+        if book is not None and book['isbn'] == isbn:
+            return book
+        _book_cache.invalidate(key)
+
+    generation = _book_cache.generation
     conn = get_db_connection()
-    book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
+    cursor = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,))
+    cursor.row_factory = Book.row_factory
+    book = cursor.fetchone()
     conn.close()
-    return dict(book) if book else None
+    if not book:
+        return None
+    _book_cache.set(key, book.id, generation)
+    _book_cache.set(_book_cache_key(book.id), book, generation)
+    return book.copy()
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
+@traced('db.get_patron_borrowed_books')
+def get_patron_borrowed_books(patron_id: str) -> List[Loan]:
     """Get currently borrowed books for a patron."""
+    now = datetime.now()
+
+    def loan_row(cursor, row):
+        book_id, title, author, borrow_date, due_date = row
+        due_date = from_db_timestamp(due_date)
+        return Loan(book_id, title, author, from_db_timestamp(borrow_date), due_date, now > due_date)
+
     conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
+    cursor = conn.execute('''
+        SELECT br.book_id, b.title, b.author, br.borrow_date, br.due_date
         FROM borrow_records br 
         JOIN books b ON br.book_id = b.id 
         WHERE br.patron_id = ? AND br.return_date IS NULL
         ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
+    ''', (to_db_patron_id(patron_id),))
+    cursor.row_factory = loan_row
+    borrowed_books = cursor.fetchall()
     conn.close()
-    
-    borrowed_books = []
-    for record in records:
-        borrowed_books.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
-        })
-    
     return borrowed_books
 
+@traced('db.get_overdue_loans')
+def get_overdue_loans(patron_ids: Optional[List[str]] = None, now: Optional[datetime] = None) -> List[Tuple]:
+    """
+    Get every open loan that is past its due date, optionally for a set of patrons.
+    Served by the partial index on due_date for open loans.
+    
+    Returns:
+        list: (loan_id, patron_id, book_id, due_date) tuples, due_date as
+        epoch seconds (see from_db_timestamp)
+    """
+    now = now or datetime.now()
+    conn = get_db_connection()
+    if patron_ids is None:
+        loans = conn.execute('''
+            SELECT id, patron_id, book_id, due_date FROM borrow_records
+            WHERE return_date IS NULL AND due_date < ?
+        ''', (to_db_timestamp(now),)).fetchall()
+    else:
+        # One bound parameter however many patrons are requested
+        keys = [key for key in map(to_db_patron_id, patron_ids) if key is not None]
+        loans = conn.execute('''
+            SELECT id, patron_id, book_id, due_date FROM borrow_records
+            WHERE return_date IS NULL AND due_date < ?
+              AND patron_id IN (SELECT value FROM json_each(?))
+        ''', (to_db_timestamp(now), json.dumps(keys))).fetchall()
+    conn.close()
+    return [(loan_id, from_db_patron_id(patron), book_id, due) for loan_id, patron, book_id, due in loans]
+
+@traced('db.get_patron_borrow_count')
 def get_patron_borrow_count(patron_id: str) -> int:
-    """Get the number of books currently borrowed by a patron."""
+    """Get the number of books currently borrowed by a patron (from the patrons counters)."""
+    conn = get_db_connection()
+    row = conn.execute('SELECT open_loans FROM patrons WHERE patron_id = ?',
+                       (to_db_patron_id(patron_id),)).fetchone()
+    conn.close()
+    return row['open_loans'] if row else 0
+
+# Patron Counters
+
+# Per-patron open/overdue loan counts and outstanding fees computed from
+# borrow_records. The fee expression mirrors compute_late_fee(): whole days
+# overdue rounded up, $0.50/day for 7 days, $1.00/day after, capped at $15.
+# Days are rounded up with integer arithmetic; CEIL() needs a SQLite built
+# with SQLITE_ENABLE_MATH_FUNCTIONS.
+_PATRON_COUNTERS_SQL = '''
+    SELECT patron_id,
+           COALESCE(SUM(is_open), 0) AS open_loans,
+           COALESCE(SUM(days_overdue > 0), 0) AS overdue_loans,
+           ROUND(COALESCE(SUM(CASE
+               WHEN days_overdue <= 0 THEN 0.0
+               WHEN days_overdue <= 7 THEN days_overdue * 0.5
+               ELSE MIN(15.0, 3.5 + (days_overdue - 7) * 1.0)
+           END), 0), 2) AS fee_balance
+    FROM (
+        SELECT patron_id, return_date IS NULL AS is_open,
+               CASE WHEN return_date IS NULL
+                    THEN MAX((:now - due_date + 86399) / 86400, 0)
+                    ELSE 0 END AS days_overdue
+        FROM borrow_records
+        WHERE :patron_id IS NULL OR patron_id = :patron_id
+    )
+    GROUP BY patron_id
+'''
+
+def refresh_patron_counters(conn, patron_id: str, now: Optional[datetime] = None):
+    """Recompute one patron's counters on `conn` (inside the caller's transaction)."""
+    now = now or datetime.now()
+    conn.execute(f'''
+        INSERT INTO patrons (patron_id, open_loans, overdue_loans, fee_balance, counters_as_of)
+        SELECT patron_id, open_loans, overdue_loans, fee_balance, :now FROM ({_PATRON_COUNTERS_SQL}) WHERE true
+        ON CONFLICT (patron_id) DO UPDATE SET
+            open_loans = excluded.open_loans,
+            overdue_loans = excluded.overdue_loans,
+            fee_balance = excluded.fee_balance,
+            counters_as_of = excluded.counters_as_of
+    ''', {'now': to_db_timestamp(now), 'patron_id': to_db_patron_id(patron_id)})
+
+def reconcile_patron_counters(now: Optional[datetime] = None, conn=None) -> Dict:
+    """
+    Rebuild every patron's counters from borrow_records with one set-based query.
+
+    open_loans is maintained continuously by triggers; overdue_loans and
+    fee_balance depend on the clock, so they are refreshed here (and for
+    the patron involved on every return).
+
+    Args:
+        now: Point in time to compute overdue counts and fees at
+        conn: Connection to use inside an existing transaction (a new
+            transaction on a pooled connection otherwise)
+
+    Returns:
+        dict: patrons (rows written) and drifted (patrons whose open_loans
+        counter disagreed with the loans before the rebuild)
+    """
+    params = {'now': to_db_timestamp(now or datetime.now()), 'patron_id': None}
+
+    def work(conn):
+        drifted = conn.execute(f'''
+            SELECT COUNT(*) FROM ({_PATRON_COUNTERS_SQL}) c
+            LEFT JOIN patrons p ON p.patron_id = c.patron_id
+            WHERE p.open_loans IS NOT c.open_loans
+        ''', params).fetchone()[0]
+        conn.execute('''
+            UPDATE patrons SET open_loans = 0, overdue_loans = 0, fee_balance = 0, counters_as_of = :now
+        ''', params)
+        written = conn.execute(f'''
+            INSERT INTO patrons (patron_id, open_loans, overdue_loans, fee_balance, counters_as_of)
+            SELECT patron_id, open_loans, overdue_loans, fee_balance, :now FROM ({_PATRON_COUNTERS_SQL}) WHERE true
+            ON CONFLICT (patron_id) DO UPDATE SET
+                open_loans = excluded.open_loans,
+                overdue_loans = excluded.overdue_loans,
+                fee_balance = excluded.fee_balance,
+                counters_as_of = excluded.counters_as_of
+        ''', params).rowcount
+        return {'patrons': written, 'drifted': drifted}
+
+    if conn is not None:
+        return work(conn)
+    return run_in_transaction(work)
+
+@traced('db.get_patron_counters')
+def get_patron_counters(patron_id: str) -> Optional[Dict]:
+    """Get a patron's materialized counters, or None if the patron has never borrowed."""
     conn = get_db_connection()
-    count = conn.execute('''
-        SELECT COUNT(*) as count FROM borrow_records 
-        WHERE patron_id = ? AND return_date IS NULL
-    ''', (patron_id,)).fetchone()['count']
+    row = conn.execute('SELECT * FROM patrons WHERE patron_id = ?', (to_db_patron_id(patron_id),)).fetchone()
     conn.close()
-    return count
+    if row is None:
+        return None
+    counters = dict(row)
+    counters['patron_id'] = from_db_patron_id(counters['patron_id'])
+    counters['counters_as_of'] = from_db_timestamp(counters['counters_as_of'])
+    return counters
+
+@traced('db.get_catalog_version')
+def get_catalog_version() -> Tuple[int, int]:
+    """
+    Get the catalog version, which increases with every write to books.
+
+    Returns:
+        tuple: (version, updated_at) with updated_at in UTC epoch seconds
+    """
+    conn = get_db_connection()
+    row = conn.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    conn.close()
+    return (row['version'], row['updated_at']) if row else (0, 0)
+
+# Streaming Export
+
+BOOK_EXPORT_COLUMNS = ('id', 'title', 'author', 'isbn', 'total_copies', 'available_copies')
+LOAN_EXPORT_COLUMNS = ('id', 'patron_id', 'book_id', 'title', 'author', 'borrow_date', 'due_date', 'return_date')
 
+def _stream_query(sql: str, parameters=(), batch_size: int = EXPORT_BATCH_SIZE,
+                  row_factory: Optional[Callable] = None) -> Iterator:
+    """
+    Yield the rows of one query, fetched in batches of `batch_size`.
+
+    Uses its own pooled connection rather than the request-scoped one, since
+    a streamed response outlives the request teardown. The connection is held
+    until the generator is exhausted or closed, and the single SELECT reads
+    one consistent snapshot however long the export takes.
+    """
+    pool = get_pool()
+    conn = PooledConnection(pool.acquire(), pool)
+    try:
+        cursor = conn.execute(sql, parameters)
+        cursor.row_factory = row_factory
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+def _export_loan_row(cursor, row) -> Tuple:
+    loan_id, patron_id, book_id, title, author, borrow_date, due_date, return_date = row
+    return (loan_id, from_db_patron_id(patron_id), book_id, title, author, from_db_timestamp(borrow_date),
+            from_db_timestamp(due_date), from_db_timestamp(return_date))
+
+def iter_books(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple]:
+    """Stream the whole catalog in id order as tuples of BOOK_EXPORT_COLUMNS."""
+    return _stream_query(f"SELECT {', '.join(BOOK_EXPORT_COLUMNS)} FROM books ORDER BY id",
+                         batch_size=batch_size)
+
+def iter_loans(patron_id: Optional[str] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Tuple]:
+    """
+    Stream borrow records as tuples of LOAN_EXPORT_COLUMNS, with decoded
+    datetimes and patron IDs.
+
+    Args:
+        patron_id: Only this patron's history, oldest first (None for every loan in id order)
+        batch_size: Rows per fetchmany() call
+    """
+    select = '''
+        SELECT br.id, br.patron_id, br.book_id, b.title, b.author, br.borrow_date, br.due_date, br.return_date
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+    '''
+    if patron_id is None:
+        return _stream_query(select + ' ORDER BY br.id', batch_size=batch_size, row_factory=_export_loan_row)
+    return _stream_query(select + ' WHERE br.patron_id = ? ORDER BY br.borrow_date, br.id',
+                         (to_db_patron_id(patron_id),), batch_size, _export_loan_row)
+
+@traced('db.insert_book')
 def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
     """Insert a new book into the database."""
     conn = get_db_connection()
@@ -150,11 +1046,47 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
         ''', (title, author, isbn, total_copies, available_copies))
         conn.commit()
         conn.close()
-        return True
+        _book_cache.invalidate(('isbn', DATABASE, isbn))
     except Exception as e:
         conn.close()
         return False
+    _notify_books_added([(title, author)])
+    return True
+
+@traced('db.insert_books_bulk')
+def insert_books_bulk(books: List[Tuple[str, str, str, int]]) -> List[str]:
+    """
+    Insert a batch of books in one transaction with executemany.
+    Rows whose ISBN already exists are skipped; the check runs inside the
+    same transaction as the insert, so concurrent writers can't slip in between.
+    
+    Args:
+        books: (title, author, isbn, total_copies) tuples with unique ISBNs
+        
+    Returns:
+        list: ISBNs that were skipped because they already exist
+    """
+    def work(conn):
+        isbns = [book[2] for book in books]
+        existing = {row[0] for row in conn.execute(
+            'SELECT isbn FROM books WHERE isbn IN (SELECT value FROM json_each(?))',
+            (json.dumps(isbns),)
+        )}
+        conn.executemany('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(title, author, isbn, copies, copies)
+              for title, author, isbn, copies in books if isbn not in existing])
+        return [isbn for isbn in isbns if isbn in existing]
 
+    if not books:
+        return []
+    skipped = run_in_transaction(work)
+    existing = set(skipped)
+    _notify_books_added([(title, author) for title, author, isbn, copies in books if isbn not in existing])
+    return skipped
+
+@traced('db.insert_borrow_record')
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
     conn = get_db_connection()
@@ -162,7 +1094,7 @@ def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, du
         conn.execute('''
             INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
             VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+        ''', (to_db_patron_id(patron_id), book_id, to_db_timestamp(borrow_date), to_db_timestamp(due_date)))
         conn.commit()
         conn.close()
         return True
@@ -170,6 +1102,7 @@ def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, du
         conn.close()
         return False
 
+@traced('db.update_book_availability')
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
     conn = get_db_connection()
@@ -179,11 +1112,13 @@ def update_book_availability(book_id: int, change: int) -> bool:
         ''', (change, book_id))
         conn.commit()
         conn.close()
+        invalidate_book_cache(book_id)
         return True
     except Exception as e:
         conn.close()
         return False
 
+@traced('db.update_borrow_record_return_date')
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
     conn = get_db_connection()
@@ -192,10 +1127,165 @@ def update_borrow_record_return_date(patron_id: str, book_id: int, return_date:
             UPDATE borrow_records 
             SET return_date = ? 
             WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
+        ''', (to_db_timestamp(return_date), to_db_patron_id(patron_id), book_id))
         conn.commit()
         conn.close()
         return True
     except Exception as e:
         conn.close()
         return False
+
+# Transactional Unit of Work
+
+_txn_stats = {'transactions': 0, 'commits': 0, 'retries': 0, 'contention': 0, 'failures': 0}
+_txn_stats_lock = threading.Lock()
+
+def _count_txn(key: str):
+    with _txn_stats_lock:
+        _txn_stats[key] += 1
+
+def get_transaction_stats() -> Dict:
+    """Get commit, retry and lock-contention counters for run_in_transaction()."""
+    with _txn_stats_lock:
+        return dict(_txn_stats)
+
+def _is_lock_error(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+def run_in_transaction(work: Callable[[Any], Any], retries: int = TRANSACTION_RETRIES) -> Any:
+    """
+    Run work(conn) inside a single BEGIN IMMEDIATE transaction.
+
+    The write lock is taken up front, so every read done by `work` stays
+    valid until commit. If the database is locked by another writer the
+    transaction is rolled back and retried with exponential backoff.
+
+    Args:
+        work: Callable receiving the connection; its return value is passed through
+        retries: Number of retries after lock contention before giving up
+
+    Returns:
+        Whatever `work` returned, after the transaction has been committed
+    """
+    _count_txn('transactions')
+    attempt = 0
+    while True:
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            result = work(conn)
+            conn.commit()
+            _count_txn('commits')
+            return result
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not _is_lock_error(e):
+                _count_txn('failures')
+                raise
+            _count_txn('contention')
+            if attempt >= retries:
+                _count_txn('failures')
+                raise
+            attempt += 1
+            _count_txn('retries')
+            time.sleep(TRANSACTION_BACKOFF * (2 ** (attempt - 1)))
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            _count_txn('failures')
+            raise
+        finally:
+            conn.close()
+
+@traced('db.borrow_book_transaction')
+def borrow_book_transaction(patron_id: str, book_id: int, borrow_date: datetime,
+                            due_date: datetime, max_borrowed: int = 5) -> Tuple[str, Optional[Dict]]:
+    """
+    Check availability and the borrowing limit, insert the borrow record and
+    decrement available copies in one transaction.
+
+    Returns:
+        tuple: (status, book) where status is one of 'borrowed', 'not_found',
+        'unavailable', 'limit_reached' or 'error'
+    """
+    patron_key = to_db_patron_id(patron_id)
+
+    def work(conn):
+        cursor = conn.execute('SELECT * FROM books WHERE id = ?', (book_id,))
+        cursor.row_factory = Book.row_factory
+        book = cursor.fetchone()
+        if book is None:
+            return 'not_found', None
+        if book['available_copies'] <= 0:
+            return 'unavailable', book
+
+        patron = conn.execute('SELECT open_loans FROM patrons WHERE patron_id = ?', (patron_key,)).fetchone()
+        if patron is not None and patron['open_loans'] >= max_borrowed:
+            return 'limit_reached', book
+
+        # Conditional decrement: never lets available_copies go below zero
+        updated = conn.execute('''
+            UPDATE books SET available_copies = available_copies - 1
+            WHERE id = ? AND available_copies > 0
+        ''', (book_id,)).rowcount
+        if updated == 0:
+            return 'unavailable', book
+
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES (?, ?, ?, ?)
+        ''', (patron_key, book['id'], to_db_timestamp(borrow_date), to_db_timestamp(due_date)))
+        return 'borrowed', book
+
+    try:
+        result = run_in_transaction(work)
+    except Exception as e:
+        return 'error', None
+    finally:
+        invalidate_book_cache(book_id)
+    return result
+
+@traced('db.return_book_transaction')
+def return_book_transaction(patron_id: str, book_id: int, return_date: datetime) -> Tuple[str, Optional[Dict]]:
+    """
+    Close the patron's oldest open loan for a book and increment available
+    copies in one transaction.
+
+    Returns:
+        tuple: (status, loan) where status is one of 'returned', 'not_borrowed',
+        'no_loans' (patron has nothing borrowed) or 'error'
+    """
+    patron_key = to_db_patron_id(patron_id)
+
+    def work(conn):
+        loan = conn.execute('''
+            SELECT id, book_id, borrow_date, due_date FROM borrow_records
+            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+            ORDER BY borrow_date
+            LIMIT 1
+        ''', (patron_key, book_id)).fetchone()
+        if loan is None:
+            patron = conn.execute('SELECT open_loans FROM patrons WHERE patron_id = ?', (patron_key,)).fetchone()
+            has_loans = patron is not None and patron['open_loans'] > 0
+            return ('not_borrowed' if has_loans else 'no_loans'), None
+
+        conn.execute('UPDATE borrow_records SET return_date = ? WHERE id = ?',
+                     (to_db_timestamp(return_date), loan['id']))
+        conn.execute('UPDATE books SET available_copies = available_copies + 1 WHERE id = ?',
+                     (loan['book_id'],))
+        refresh_patron_counters(conn, patron_id, return_date)
+        return 'returned', {
+            'book_id': loan['book_id'],
+            'borrow_date': from_db_timestamp(loan['borrow_date']),
+            'due_date': from_db_timestamp(loan['due_date']),
+        }
+
+    try:
+        result = run_in_transaction(work)
+    except Exception as e:
+        return 'error', None
+    finally:
+        invalidate_book_cache(book_id)
+    return result
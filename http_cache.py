@@ -0,0 +1,101 @@
+"""
+HTTP caching module for Library Management System
+Conditional GET for views whose output depends only on the catalog and the
+request URL (/catalog, /search, /api/search). The strong ETag combines the
+catalog version, which triggers bump on every write to books, with the
+request path and query string. A client that presents it gets
+304 Not Modified before the view runs a query or renders anything.
+
+Usage:
+    @catalog_bp.route('/catalog')
+    @conditional_on_catalog
+    def catalog(): ...
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from flask import current_app, g, request, session
+
+from database import get_catalog_version
+
+
+def catalog_etag(version: int) -> str:
+    """Strong ETag for the current request URL at a given catalog version."""
+    salt = current_app.extensions.get('http_cache', '')
+    key = hashlib.sha1(f"{salt}\0{request.full_path}".encode('utf-8')).hexdigest()[:16]
+    return f"{version}-{key}"
+
+
+def _is_not_modified(etag: str, last_modified) -> bool:
+    # If-None-Match takes precedence; If-Modified-Since is only a fallback
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return last_modified is not None and since is not None and last_modified <= since
+
+
+def conditional_on_catalog(view: Callable) -> Callable:
+    """
+    Mark a view as depending only on the catalog and its URL. The view itself
+    is left unchanged; the hooks installed by init_app() do the work.
+    """
+    view.conditional_on_catalog = True
+    return view
+
+
+def init_app(app):
+    """
+    Answer conditional GETs for views marked with @conditional_on_catalog.
+
+    Successful responses get ETag, Last-Modified and `Cache-Control: no-cache`
+    (clients keep the copy but revalidate every time). Requests with flash
+    messages waiting are always rendered, since those end up in the page.
+    ETags are salted with the app's template sources, so pages cached before
+    a template change are not confirmed as current afterwards.
+
+    Config: CATALOG_ETAG_SALT overrides the derived salt.
+    """
+    app.config.setdefault('CATALOG_ETAG_SALT', None)
+    salt = app.config['CATALOG_ETAG_SALT']
+    if salt is None:
+        digest = hashlib.sha1()
+        for name in sorted(app.jinja_env.list_templates()):
+            source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+            digest.update(source.encode('utf-8'))
+        salt = digest.hexdigest()
+    app.extensions['http_cache'] = salt
+
+    @app.before_request
+    def check_catalog_etag():
+        view = app.view_functions.get(request.endpoint)
+        if not getattr(view, 'conditional_on_catalog', False):
+            return None
+        if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+            return None
+
+        version, updated_at = get_catalog_version()
+        etag = catalog_etag(version)
+        # Last-Modified has one-second resolution, so it is only sent once that
+        # second is over; another write within it would otherwise go unnoticed
+        last_modified = None
+        if updated_at < int(time.time()):
+            last_modified = datetime.fromtimestamp(updated_at, timezone.utc)
+        g._catalog_validators = (etag, last_modified)
+        if _is_not_modified(etag, last_modified):
+            return app.response_class(status=304)
+        return None
+
+    @app.after_request
+    def add_catalog_validators(response):
+        validators = g.pop('_catalog_validators', None)
+        if validators is None or response.status_code not in (200, 304):
+            return response
+        etag, last_modified = validators
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
@@ -0,0 +1,231 @@
+"""
+Metrics module for Library Management System
+Per-endpoint request latency histograms, in-flight gauges and status-code
+counters, exposed in the Prometheus text format on /metrics.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Response, g, request
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PATH = '/metrics'
+UNMATCHED_ENDPOINT = 'unmatched'  # requests that didn't route to a view (404/405)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and two additions."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs as Prometheus expects, ending with +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Request metrics keyed by Flask endpoint name.
+
+    All updates happen under one lock held for a few dictionary operations,
+    so recording costs a couple of microseconds per request.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._latency: Dict[str, Histogram] = {}
+        # Extra (name, type, help, callable returning {labels: value}) families rendered on scrape
+        self._collectors: List[Tuple[str, str, str, Callable[[], Dict[Tuple, float]]]] = []
+
+    def request_started(self, endpoint: str):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def request_finished(self, endpoint: str, method: str, status: int, duration: float):
+        key = (endpoint, method, str(status))
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get(endpoint)
+            if histogram is None:
+                histogram = self._latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(duration)
+
+    def add_collector(self, name: str, metric_type: str, help_text: str,
+                      collect: Callable[[], Dict[Tuple, float]]):
+        """
+        Register a metric family computed at scrape time.
+
+        Args:
+            name: Metric name
+            metric_type: 'gauge' or 'counter'
+            help_text: HELP line
+            collect: Returns {((label, value), ...): sample value}
+        """
+        self._collectors.append((name, metric_type, help_text, collect))
+
+    def snapshot(self) -> Dict:
+        """Copy of the request counters, in-flight gauges and histograms."""
+        with self._lock:
+            return {
+                'in_flight': dict(self._in_flight),
+                'requests': dict(self._requests),
+                'latency': {
+                    endpoint: {'buckets': h.cumulative(), 'sum': h.sum, 'count': h.count}
+                    for endpoint, h in self._latency.items()
+                },
+            }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        data = self.snapshot()
+        lines = [
+            '# HELP library_http_requests_total HTTP requests by endpoint, method and status code.',
+            '# TYPE library_http_requests_total counter',
+        ]
+        for (endpoint, method, status), count in sorted(data['requests'].items()):
+            lines.append(f'library_http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+        lines += [
+            '# HELP library_http_requests_in_flight HTTP requests currently being handled.',
+            '# TYPE library_http_requests_in_flight gauge',
+        ]
+        for endpoint, count in sorted(data['in_flight'].items()):
+            lines.append(f'library_http_requests_in_flight{_labels(endpoint=endpoint)} {count}')
+
+        lines += [
+            '# HELP library_http_request_duration_seconds HTTP request latency by endpoint.',
+            '# TYPE library_http_request_duration_seconds histogram',
+        ]
+        for endpoint, histogram in sorted(data['latency'].items()):
+            for le, count in histogram['buckets']:
+                lines.append(f'library_http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=le)} {count}')
+            lines.append(f'library_http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {histogram["sum"]!r}')
+            lines.append(f'library_http_request_duration_seconds_count{_labels(endpoint=endpoint)} {histogram["count"]}')
+
+        for name, metric_type, help_text, collect in self._collectors:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+            for labels, value in sorted(collect().items()):
+                lines.append(f'{name}{_labels(**dict(labels))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _database_collectors(registry: MetricsRegistry):
+    # Imported here so metrics.py has no import-time dependency on the database layer
+    from database import get_book_cache_stats, get_pool_stats, get_transaction_stats
+
+    registry.add_collector(
+        'library_db_pool_connections', 'gauge', 'Pooled database connections by state.',
+        lambda: {(('state', state),): value for state, value in get_pool_stats().items()
+                 if state in ('open', 'idle', 'in_use')},
+    )
+    registry.add_collector(
+        'library_db_pool_waits_total', 'counter', 'Connection requests that had to wait for a free connection.',
+        lambda: {(): get_pool_stats()['waits']},
+    )
+    registry.add_collector(
+        'library_db_transactions_total', 'counter', 'run_in_transaction() events by outcome.',
+        lambda: {(('outcome', outcome),): value for outcome, value in get_transaction_stats().items()},
+    )
+    registry.add_collector(
+        'library_book_cache_requests_total', 'counter', 'Book cache lookups by result.',
+        lambda: {(('result', result),): value for result, value in get_book_cache_stats().items()
+                 if result in ('hits', 'misses')},
+    )
+
+
+def _search_collectors(registry: MetricsRegistry):
+    from services.library_service import get_search_cache_stats
+
+    registry.add_collector(
+        'library_search_cache_requests_total', 'counter', 'Search result cache lookups by result.',
+        lambda: {(('result', result),): value for result, value in get_search_cache_stats().items()
+                 if result in ('hits', 'misses')},
+    )
+    registry.add_collector(
+        'library_search_executions_total', 'counter',
+        'Cache-miss searches by whether they ran the query or waited for an identical one in flight.',
+        lambda: {(('outcome', outcome),): value for outcome, value in get_search_cache_stats().items()
+                 if outcome in ('executions', 'coalesced')},
+    )
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> Optional[MetricsRegistry]:
+    """The registry installed by init_app(), if any."""
+    return _registry
+
+
+def init_app(app, registry: Optional[MetricsRegistry] = None):
+    """
+    Record request metrics for every request and serve them on /metrics.
+
+    Args:
+        app: Flask application
+        registry: Registry to record into (a new one by default)
+    """
+    global _registry
+    registry = registry or MetricsRegistry()
+    _database_collectors(registry)
+    _search_collectors(registry)
+    _registry = registry
+    app.extensions['metrics'] = registry
+
+    @app.before_request
+    def start_request_timer():
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        g._metrics = (endpoint, time.perf_counter())
+        registry.request_started(endpoint)
+
+    @app.after_request
+    def record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_request(exception=None):
+        started = g.pop('_metrics', None)
+        if started is None:
+            return
+        endpoint, start = started
+        # after_request doesn't run when a view raises, so that's a 500
+        status = g.pop('_metrics_status', 500)
+        registry.request_finished(endpoint, request.method, status, time.perf_counter() - start)
+
+    def metrics_view():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    app.add_url_rule(METRICS_PATH, 'metrics', metrics_view)
@@ -0,0 +1,195 @@
+"""
+Profiling module for Library Management System
+Opt-in per-request cProfile and tracemalloc capture. A request is profiled
+when PROFILING_ENABLED is set and it either carries the X-Profile header
+together with a valid X-Admin-Token or is picked by PROFILE_SAMPLE_RATE. Captures are written to PROFILE_DIR and
+listed on /admin/profiles.
+
+With PROFILING_ENABLED off no request hooks are installed at all.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+from flask import abort, g, jsonify, request, send_from_directory
+
+from admin import has_admin_token, require_admin_token
+
+PROFILE_DIR = 'profiles'
+PROFILE_HEADER = 'X-Profile'  # value: cpu, memory or all
+PROFILE_SAMPLE_RATE = 0.0     # share of requests profiled without the header
+PROFILE_MAX_CAPTURES = 100    # older capture files are deleted
+PROFILE_TOP_ALLOCATIONS = 25
+PROFILE_MODES = ('cpu', 'memory', 'all')
+
+_CAPTURE_NAME = re.compile(r'^[\w.-]+$')
+
+
+class ProfileStore:
+    """Writes captures to a directory and remembers the most recent ones."""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_captures: int = PROFILE_MAX_CAPTURES):
+        self.directory = directory
+        self.max_captures = max_captures
+        self._captures = deque(maxlen=max_captures)
+        self._lock = threading.Lock()
+
+    def save(self, meta: Dict, profile: Optional[cProfile.Profile], snapshot: Optional[tracemalloc.Snapshot]) -> Dict:
+        """Write the pstats dump and allocation report for one request and record its metadata."""
+        os.makedirs(self.directory, exist_ok=True)
+        base = f"{time.strftime('%Y%m%d-%H%M%S')}-{meta['endpoint']}-{uuid.uuid4().hex[:8]}"
+        files = []
+        if profile is not None:
+            profile.dump_stats(os.path.join(self.directory, f'{base}.pstats'))
+            files.append(f'{base}.pstats')
+            summary = io.StringIO()
+            pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(30)
+            with open(os.path.join(self.directory, f'{base}.cpu.txt'), 'w') as f:
+                f.write(summary.getvalue())
+            files.append(f'{base}.cpu.txt')
+        if snapshot is not None:
+            with open(os.path.join(self.directory, f'{base}.alloc.txt'), 'w') as f:
+                f.write(format_allocations(snapshot, meta.get('peak_bytes')))
+            files.append(f'{base}.alloc.txt')
+
+        capture = dict(meta, name=base, files=files)
+        with open(os.path.join(self.directory, f'{base}.json'), 'w') as f:
+            json.dump(capture, f, indent=2)
+        with self._lock:
+            if len(self._captures) == self._captures.maxlen:
+                self._delete(self._captures[0])
+            self._captures.append(capture)
+        return capture
+
+    def _delete(self, capture: Dict):
+        for filename in capture['files'] + [f"{capture['name']}.json"]:
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                pass
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """Most recent captures first."""
+        with self._lock:
+            captures = list(reversed(self._captures))
+        return captures[:limit] if limit else captures
+
+
+def format_allocations(snapshot: tracemalloc.Snapshot, peak_bytes: Optional[int] = None,
+                       limit: int = PROFILE_TOP_ALLOCATIONS) -> str:
+    """Top allocation sites (by size) of a tracemalloc snapshot as text."""
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+    stats = snapshot.statistics('lineno')
+    lines = []
+    if peak_bytes is not None:
+        lines.append(f"peak traced memory during request: {peak_bytes / 1024:.1f} KiB")
+    lines.append(f"top {limit} allocation sites still alive at end of request:")
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    return '\n'.join(lines) + '\n'
+
+
+def _requested_mode(app) -> Optional[str]:
+    mode = request.headers.get(PROFILE_HEADER)
+    if mode and has_admin_token():
+        mode = mode.strip().lower()
+        return mode if mode in PROFILE_MODES else 'all'
+    rate = app.config['PROFILE_SAMPLE_RATE']
+    if rate and random.random() < rate:
+        return app.config['PROFILE_SAMPLE_MODE']
+    return None
+
+
+def init_app(app):
+    """
+    Register the profiling hooks (only if PROFILING_ENABLED) and the admin listing.
+
+    Config: PROFILING_ENABLED, PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_SAMPLE_MODE,
+    PROFILE_MAX_CAPTURES. The listing requires ADMIN_TOKEN (see admin), and so
+    does honoring X-Profile.
+    """
+    app.config.setdefault('PROFILING_ENABLED', False)
+    app.config.setdefault('PROFILE_DIR', PROFILE_DIR)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', PROFILE_SAMPLE_RATE)
+    app.config.setdefault('PROFILE_SAMPLE_MODE', 'cpu')
+    app.config.setdefault('PROFILE_MAX_CAPTURES', PROFILE_MAX_CAPTURES)
+
+    store = ProfileStore(os.path.abspath(app.config['PROFILE_DIR']), app.config['PROFILE_MAX_CAPTURES'])
+    app.extensions['profiling'] = store
+    # tracemalloc is process-wide, so only one request traces memory at a time
+    memory_lock = threading.Lock()
+
+    def list_profiles():
+        require_admin_token()
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'enabled': app.config['PROFILING_ENABLED'], 'captures': store.recent(limit)})
+
+    def get_profile_file(filename):
+        require_admin_token()
+        if not _CAPTURE_NAME.match(filename):
+            abort(404)
+        return send_from_directory(store.directory, filename, as_attachment=True)
+
+    app.add_url_rule('/admin/profiles', 'profiling.list_profiles', list_profiles)
+    app.add_url_rule('/admin/profiles/<filename>', 'profiling.get_profile_file', get_profile_file)
+
+    if not app.config['PROFILING_ENABLED']:
+        return
+
+    @app.before_request
+    def start_profiling():
+        mode = _requested_mode(app)
+        if mode is None or request.endpoint in ('profiling.list_profiles', 'profiling.get_profile_file'):
+            return
+        profile = None
+        traced = False
+        if mode in ('memory', 'all') and memory_lock.acquire(blocking=False):
+            traced = True
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        if mode in ('cpu', 'all'):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None  # another profiler is already active on this thread
+        g._profiling = (mode, profile, traced, time.perf_counter())
+
+    @app.teardown_request
+    def finish_profiling(exception=None):
+        state = g.pop('_profiling', None)
+        if state is None:
+            return
+        mode, profile, traced, started = state
+        if profile is not None:
+            profile.disable()
+        snapshot = peak = None
+        if traced:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            memory_lock.release()
+        store.save({
+            'endpoint': request.endpoint or 'unmatched',
+            'method': request.method,
+            'path': request.path,
+            'mode': mode,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            'peak_bytes': peak,
+            'timestamp': time.time(),
+        }, profile, snapshot)
@@ -0,0 +1,277 @@
+"""
+Query statistics module for Library Management System
+Opt-in (SQL_INSTRUMENTATION) timing and fingerprinting of every SQL statement
+issued through get_db_connection(): keeps per-request counts, logs slow
+queries (optionally with their query plan) and warns about N+1 patterns.
+
+While it is off, pooled connections execute statements directly and no
+request hooks are installed.
+"""
+
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from flask import g, has_app_context, request
+
+SLOW_QUERY_THRESHOLD = 0.1  # seconds
+N_PLUS_ONE_THRESHOLD = 10   # executions of one fingerprint in a request that trigger a warning
+MAX_FINGERPRINTS = 500      # distinct fingerprints tracked process-wide
+
+logger = logging.getLogger('library.sql')
+slow_query_logger = logging.getLogger('library.sql.slow')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_settings = {
+    'enabled': False,
+    'slow_threshold': SLOW_QUERY_THRESHOLD,
+    'explain_slow': False,
+    'n_plus_one_threshold': N_PLUS_ONE_THRESHOLD,
+}
+_totals: Dict[str, Dict] = {}
+_totals_lock = threading.Lock()
+_local = threading.local()
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a statement so executions that differ only in literals group together.
+
+    >>> fingerprint("SELECT * FROM books\\n   WHERE id = 3")
+    'SELECT * FROM books WHERE id = ?'
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?, ...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip().rstrip(';')
+
+
+class RequestQueryStats:
+    """Statements issued during one request (or one track_queries() block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints: Dict[str, Dict] = {}
+
+    def add(self, fp: str, duration: float):
+        self.count += 1
+        self.total_time += duration
+        entry = self.fingerprints.get(fp)
+        if entry is None:
+            entry = self.fingerprints[fp] = {'count': 0, 'total_time': 0.0}
+        entry['count'] += 1
+        entry['total_time'] += duration
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Dict]:
+        """Fingerprints executed at least `threshold` times - the signature of an N+1 loop."""
+        threshold = threshold or _settings['n_plus_one_threshold']
+        return [
+            {'fingerprint': fp, **entry}
+            for fp, entry in self.fingerprints.items() if entry['count'] >= threshold
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            'queries': self.count,
+            'query_time_ms': round(self.total_time * 1000, 3),
+            'fingerprints': {fp: dict(entry) for fp, entry in self.fingerprints.items()},
+        }
+
+
+def configure_query_stats(enabled: bool = True, slow_threshold: float = SLOW_QUERY_THRESHOLD,
+                          explain_slow: bool = False, n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+                          slow_log_path: Optional[str] = None):
+    """
+    Set instrumentation options.
+
+    Args:
+        enabled: Record statements at all (disabled, execute() is a plain pass-through)
+        slow_threshold: Statements taking at least this many seconds are logged
+        explain_slow: Add EXPLAIN QUERY PLAN output to slow-query log entries
+        n_plus_one_threshold: Repeats of one fingerprint per request that log a warning
+        slow_log_path: Also append slow-query entries to this file
+    """
+    _settings.update({
+        'enabled': enabled,
+        'slow_threshold': slow_threshold,
+        'explain_slow': explain_slow,
+        'n_plus_one_threshold': n_plus_one_threshold,
+    })
+    for handler in list(slow_query_logger.handlers):
+        if getattr(handler, '_query_stats', False):
+            slow_query_logger.removeHandler(handler)
+            handler.close()
+    if slow_log_path:
+        handler = logging.FileHandler(slow_log_path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        handler._query_stats = True
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.INFO)
+
+
+def instrumentation_enabled() -> bool:
+    return _settings['enabled']
+
+
+def _current_stats() -> Optional[RequestQueryStats]:
+    tracked = getattr(_local, 'stats', None)
+    if tracked is not None:
+        return tracked
+    if has_app_context():
+        return g.get('_query_stats')
+    return None
+
+
+def _explain(conn, sql: str, parameters) -> Optional[str]:
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except Exception as e:
+        return f"(plan unavailable: {e})"
+    return '; '.join(str(row[-1]) for row in rows)
+
+
+def record_query(conn, sql: str, parameters, duration: float):
+    """Account for one executed statement; called by the instrumented connection."""
+    fp = fingerprint(sql)
+    with _totals_lock:
+        entry = _totals.get(fp)
+        if entry is None and len(_totals) < MAX_FINGERPRINTS:
+            entry = _totals[fp] = {'count': 0, 'total_time': 0.0, 'max_time': 0.0, 'slow': 0}
+        if entry is not None:
+            entry['count'] += 1
+            entry['total_time'] += duration
+            entry['max_time'] = max(entry['max_time'], duration)
+            if duration >= _settings['slow_threshold']:
+                entry['slow'] += 1
+
+    stats = _current_stats()
+    if stats is not None:
+        stats.add(fp, duration)
+
+    if duration >= _settings['slow_threshold']:
+        message = f"slow query {duration * 1000:.1f} ms: {fp}"
+        if _settings['explain_slow']:
+            plan = _explain(conn, sql, parameters)
+            if plan:
+                message += f" | plan: {plan}"
+        slow_query_logger.warning(message)
+
+
+def warn_on_repeated_queries(stats: RequestQueryStats, context: str):
+    """Log a warning for every fingerprint repeated often enough to look like an N+1 loop."""
+    for entry in stats.repeated():
+        logger.warning("possible N+1 in %s: %d executions (%.1f ms) of %s",
+                       context, entry['count'], entry['total_time'] * 1000, entry['fingerprint'])
+
+
+@contextmanager
+def track_queries(context: str = 'block') -> Iterator[RequestQueryStats]:
+    """
+    Collect statements issued by this thread inside the block, e.g. in a script or test.
+
+    Example:
+        with track_queries() as stats:
+            get_patron_status_report('123456')
+        print(stats.count)
+    """
+    previous = getattr(_local, 'stats', None)
+    stats = _local.stats = RequestQueryStats()
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+        warn_on_repeated_queries(stats, context)
+
+
+def get_request_query_stats() -> Optional[RequestQueryStats]:
+    """Statements recorded so far for the current request, if instrumented."""
+    return _current_stats()
+
+
+def get_query_stats(limit: int = 20) -> Dict:
+    """Process-wide totals, with the fingerprints that took the most time first."""
+    with _totals_lock:
+        entries = [{'fingerprint': fp, **entry} for fp, entry in _totals.items()]
+    entries.sort(key=lambda entry: entry['total_time'], reverse=True)
+    for entry in entries:
+        entry['total_time'] = round(entry['total_time'], 6)
+        entry['max_time'] = round(entry['max_time'], 6)
+    return {
+        'statements': sum(entry['count'] for entry in entries),
+        'fingerprints': len(entries),
+        'top': entries[:limit],
+    }
+
+
+def reset_query_stats():
+    with _totals_lock:
+        _totals.clear()
+
+
+def init_app(app):
+    """
+    Track statements per request (only if SQL_INSTRUMENTATION) and configure
+    logging from app config: SLOW_QUERY_THRESHOLD, SLOW_QUERY_EXPLAIN,
+    SLOW_QUERY_LOG, N_PLUS_ONE_THRESHOLD and SQL_DEBUG_HEADERS.
+    """
+    app.config.setdefault('SQL_INSTRUMENTATION', False)
+    app.config.setdefault('SLOW_QUERY_THRESHOLD', SLOW_QUERY_THRESHOLD)
+    app.config.setdefault('SLOW_QUERY_EXPLAIN', False)
+    app.config.setdefault('SLOW_QUERY_LOG', None)
+    app.config.setdefault('N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+    app.config.setdefault('SQL_DEBUG_HEADERS', False)
+    configure_query_stats(
+        enabled=app.config['SQL_INSTRUMENTATION'],
+        slow_threshold=app.config['SLOW_QUERY_THRESHOLD'],
+        explain_slow=app.config['SLOW_QUERY_EXPLAIN'],
+        n_plus_one_threshold=app.config['N_PLUS_ONE_THRESHOLD'],
+        slow_log_path=app.config['SLOW_QUERY_LOG'],
+    )
+
+    if 'metrics' in app.extensions:
+        registry = app.extensions['metrics']
+        registry.add_collector(
+            'library_db_statements_total', 'counter', 'SQL statements executed.',
+            lambda: {(): get_query_stats(limit=0)['statements']},
+        )
+        registry.add_collector(
+            'library_db_statement_seconds_total', 'counter', 'Time spent executing SQL statements.',
+            lambda: {(): round(sum(entry['total_time'] for entry in _totals_snapshot()), 6)},
+        )
+
+    if not app.config['SQL_INSTRUMENTATION']:
+        return
+
+    @app.before_request
+    def start_query_stats():
+        if _settings['enabled']:
+            g._query_stats = RequestQueryStats()
+
+    @app.after_request
+    def add_query_headers(response):
+        stats = g.get('_query_stats')
+        if stats is not None and app.config['SQL_DEBUG_HEADERS']:
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = f"{stats.total_time * 1000:.3f}"
+        return response
+
+    @app.teardown_request
+    def finish_query_stats(exception=None):
+        stats = g.pop('_query_stats', None)
+        if stats is not None:
+            warn_on_repeated_queries(stats, f"{request.method} {request.path}")
+
+
+def _totals_snapshot() -> List[Dict]:
+    with _totals_lock:
+        return [dict(entry) for entry in _totals.values()]
@@ -0,0 +1,76 @@
+"""
+Record types for Library Management System
+Slotted, fixed-field records built directly from cursor rows by a row factory,
+instead of an sqlite3.Row plus a dict copy per row. Records keep dict-style
+access (book['title'], .get(), .keys(), dict(book)) for existing callers and
+attribute access for templates; jsonify() serializes them as dataclasses.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+
+class Record:
+    """Mapping-style access to the fields of a slotted dataclass."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def copy(self):
+        """A shallow copy (records handed out from a cache must not be shared)."""
+        return type(self)(*[getattr(self, name) for name in self.__slots__])
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """
+        sqlite3 row factory building the record from a row positionally; the
+        query must select exactly the record's fields, in order.
+        """
+        return cls(*row)
+
+
+@dataclass(slots=True)
+class Book(Record):
+    """A books row (SELECT * FROM books)."""
+    id: int
+    title: str
+    author: str
+    isbn: str
+    total_copies: int
+    available_copies: int
+
+
+@dataclass(slots=True)
+class Loan(Record):
+    """An open loan as shown to a patron: the book plus its decoded dates."""
+    book_id: int
+    title: str
+    author: str
+    borrow_date: datetime
+    due_date: datetime
+    is_overdue: bool
+
+
+def fetch_records(cursor, record_type):
+    """Fetch every row of an executed cursor as `record_type` instances."""
+    cursor.row_factory = record_type.row_factory
+    return cursor.fetchall()
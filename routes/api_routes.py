@@ -2,8 +2,23 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+import io
+from flask import Blueprint, Response, jsonify, request
+from database import (
+    get_book_by_id, get_books_page, get_pool_stats, get_transaction_stats, get_book_cache_stats, CATALOG_PAGE_SIZE,
+    EXPORT_BATCH_SIZE
+)
+from http_cache import conditional_on_catalog
+from query_stats import get_query_stats
+from routes.search_routes import search_options
+from services.library_service import (
+    calculate_late_fee_for_book, search_catalog_page, get_search_cache_stats
+)
+from services.late_fee_engine import calculate_late_fees_batch
+from services.bulk_import import import_books, detect_format, IMPORT_FORMATS
+from services.export import export_books, export_loans, EXPORT_FORMATS, EXPORT_CONTENT_TYPES
+from services.suggest import suggest, get_suggest_index, SUGGEST_LIMIT
+from services.payment_queue import get_payment_queue
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -16,11 +31,122 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/books/import', methods=['POST'])
+def import_books_api():
+    """
+    Bulk import books from an uploaded CSV or JSONL file (form field `file`)
+    or from the raw request body. `format` overrides the format detected
+    from the file name.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        raw_stream, filename = upload.stream, upload.filename
+    else:
+        raw_stream, filename = request.stream, ''
+    
+    fmt = request.args.get('format') or detect_format(filename)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({'error': f'Unsupported import format: {fmt}'}), 400
+    
+    stream = io.TextIOWrapper(raw_stream, encoding='utf-8', newline='')
+    report = import_books(stream, fmt)
+    return jsonify(report), 200
+
+def _export_response(name: str, export, *args):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    batch_size = max(1, min(request.args.get('batch_size', EXPORT_BATCH_SIZE, type=int), 10 * EXPORT_BATCH_SIZE))
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return Response(export(fmt, *args, batch_size=batch_size), mimetype=EXPORT_CONTENT_TYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={name}.{extension}'})
+
+@api_bp.route('/export/books')
+def export_books_api():
+    """
+    Stream the whole catalog as NDJSON (default) or CSV (`format=csv`).
+    The response starts immediately and is written in fetchmany() batches.
+    """
+    return _export_response('books', export_books)
+
+@api_bp.route('/export/loans')
+def export_loans_api():
+    """Stream every borrow record as NDJSON (default) or CSV (`format=csv`)."""
+    return _export_response('loans', export_loans, None)
+
+@api_bp.route('/export/patrons/<patron_id>/loans')
+def export_patron_loans_api(patron_id):
+    """Stream one patron's full borrowing history, oldest first."""
+    if not patron_id.isdigit() or len(patron_id) != 6:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+    return _export_response(f'patron-{patron_id}-loans', export_loans, patron_id)
+
+@api_bp.route('/late_fees')
+def list_late_fees():
+    """
+    Late fees for every overdue loan, computed in one batch.
+    Repeat `patron_id` to restrict the result to specific patrons.
+    """
+    patron_ids = request.args.getlist('patron_id') or None
+    loans = calculate_late_fees_batch(patron_ids)
+    
+    return jsonify({
+        'loans': loans,
+        'count': len(loans),
+        'total_late_fees': round(sum(loan['fee_amount'] for loan in loans), 2)
+    })
+
+@api_bp.route('/payments', methods=['POST'])
+def submit_payment():
+    """
+    Queue a late fee payment and return immediately with a job ID.
+    Expects `patron_id` and `book_id` as JSON or form fields. Malformed IDs and
+    unknown books are rejected before anything is queued; a full queue
+    answers 503 with Retry-After.
+    """
+    data = request.get_json(silent=True) or request.form
+    patron_id = str(data.get('patron_id', '')).strip()
+    if not patron_id.isdigit() or len(patron_id) != 6:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+    
+    try:
+        book_id = int(data.get('book_id', ''))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid book ID.'}), 400
+    if not get_book_by_id(book_id):
+        return jsonify({'error': 'Book not found.'}), 404
+    
+    job_id = get_payment_queue().submit(patron_id, book_id)
+    if job_id is None:
+        return jsonify({'error': 'Too many pending payments. Try again shortly.'}), 503, {'Retry-After': '1'}
+    return jsonify({'job_id': job_id, 'status': 'pending'}), 202
+
+@api_bp.route('/payments/<job_id>')
+def get_payment(job_id):
+    """
+    Poll a queued payment. `wait` (seconds) blocks until the job finishes or the time runs out.
+    """
+    wait = request.args.get('wait', 0, type=float)
+    queue = get_payment_queue()
+    job = queue.wait(job_id, min(wait, 30.0)) if wait > 0 else queue.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Payment job not found'}), 404
+    return jsonify(job)
+
 @api_bp.route('/search')
+@conditional_on_catalog
 def search_books_api():
     """
     Search for books via API endpoint.
     Alternative API interface for R5: Book Search Functionality
+    
+    Results are ordered by `sort` (relevance, title or availability) and
+    optionally restricted to books on the shelf (`available_only=1`). One page
+    comes back at a time: `limit` defaults to SEARCH_PAGE_SIZE, `offset` stops
+    at SEARCH_COUNT_CAP (follow next_offset), `count` is the page size and
+    `total` stops counting at SEARCH_COUNT_CAP, e.g. "1000+". Clients that
+    need the whole catalog should stream /api/export/books instead.
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
@@ -28,12 +154,68 @@ def search_books_api():
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
     
-    # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    try:
+        page = search_catalog_page(search_term, search_type, **search_options(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
-        'results': books,
-        'count': len(books)
+        'results': page['books'],
+        'count': len(page['books']),
+        'total': page['total'],
+        'limit': page['limit'],
+        'offset': page['offset'],
+        'next_offset': page['next_offset']
+    })
+
+@api_bp.route('/suggest')
+def suggest_api():
+    """
+    Typeahead suggestions for a partial title or author (`q`), answered from
+    the in-memory prefix index. An empty query returns no suggestions.
+    """
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', SUGGEST_LIMIT, type=int)
+    
+    return jsonify({
+        'query': query,
+        'suggestions': suggest(query, limit)
+    })
+
+@api_bp.route('/books')
+def list_books_api():
+    """
+    List the catalog one page at a time, ordered by title.
+    Pass the returned next_cursor as `after` to fetch the following page.
+    """
+    after = request.args.get('after') or None
+    limit = request.args.get('limit', CATALOG_PAGE_SIZE, type=int)
+    
+    try:
+        books, next_cursor = get_books_page(after, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'books': books,
+        'count': len(books),
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/stats')
+def get_stats():
+    """
+    Runtime counters for monitoring: connection pool, transactions, book and
+    search caches, the suggestion index and the SQL statements that took the
+    most time.
+    """
+    return jsonify({
+        'pool': get_pool_stats(),
+        'transactions': get_transaction_stats(),
+        'book_cache': get_book_cache_stats(),
+        'search_cache': get_search_cache_stats(),
+        'suggest_index': get_suggest_index().stats(),
+        'queries': get_query_stats()
     })
@@ -3,7 +3,8 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
+from database import get_books_page, clamp_catalog_page_size, CATALOG_PAGE_SIZE
+from http_cache import conditional_on_catalog
 from services.library_service import add_book_to_catalog
 
 catalog_bp = Blueprint('catalog', __name__)
@@ -14,14 +15,30 @@ def index():
     return redirect(url_for('catalog.catalog'))
 
 @catalog_bp.route('/catalog')
+@conditional_on_catalog
 def catalog():
     """
-    Display all books in the catalog.
+    Display the catalog one page at a time.
     Implements R2: Book Catalog Display
+    
+    Query parameters:
+        after: cursor returned by the previous page
+        limit: books per page, clamped to 1..CATALOG_MAX_PAGE_SIZE
     """
+    after = request.args.get('after') or None
+    # The pager links carry the page size actually used, not the one asked for
+    limit = clamp_catalog_page_size(request.args.get('limit', CATALOG_PAGE_SIZE, type=int))
+    
+    try:
+        books, next_cursor = get_books_page(after, limit)
+    except ValueError:
+        return "Invalid cursor", 400
+    except Exception:
+        return "Error", 500
+    
     try:
-        books = get_all_books()
-        return render_template('catalog.html', books=books)
+        return render_template('catalog.html', books=books, next_cursor=next_cursor,
+                               is_first_page=after is None, limit=limit)
     except Exception:
         return "Error", 500
 
@@ -2,12 +2,24 @@
 Search Routes - Book search functionality
 """
 
+from typing import Dict
 from flask import Blueprint, render_template, request, flash
-from services.library_service import search_books_in_catalog
+from http_cache import conditional_on_catalog
+from services.library_service import search_catalog_page, SEARCH_PAGE_SIZE, SEARCH_SORTS
 
 search_bp = Blueprint('search', __name__)
 
+def search_options(args) -> Dict:
+    """Paging, sort and filter options for search_catalog_page() from query-string arguments."""
+    return {
+        'limit': args.get('limit', SEARCH_PAGE_SIZE, type=int),
+        'offset': args.get('offset', 0, type=int),
+        'sort': args.get('sort', 'relevance'),
+        'available_only': args.get('available_only', '').lower() in ('1', 'true', 'yes', 'on'),
+    }
+
 @search_bp.route('/search')
+@conditional_on_catalog
 def search_books():
     """
     Search for books in the catalog.
@@ -15,14 +27,20 @@ def search_books():
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    options = search_options(request.args)
+    if options['sort'] not in SEARCH_SORTS:
+        options['sort'] = 'relevance'
     
     if not search_term:
-        return render_template('search.html', books=[], search_term='', search_type=search_type)
+        return render_template('search.html', books=[], search_term='', search_type=search_type,
+                               page=None, options=options, sorts=SEARCH_SORTS)
     
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    page = search_catalog_page(search_term, search_type, **options)
+    books = page['books']
     
     if not books:
         flash('Search functionality is not yet implemented.', 'error')
     
-    return render_template('search.html', books=books, search_term=search_term, search_type=search_type)
+    return render_template('search.html', books=books, search_term=search_term, search_type=search_type,
+                           page=page, options=options, sorts=SEARCH_SORTS)
@@ -0,0 +1,177 @@
+"""
+Bulk Import Module - Streaming catalog import from CSV or JSONL
+Validates each row with the R1 rules and inserts in chunked transactions.
+
+Usage:
+    python -m services.bulk_import books.csv [--format csv|jsonl] [--batch-size N]
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from database import init_database, insert_books_bulk
+from services.library_service import validate_book_fields
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000  # per-line details kept in the report; totals are always exact
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+
+def iter_csv_rows(stream: TextIO) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line_number, row) from a CSV file with a title,author,isbn,total_copies header."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_jsonl_rows(stream: TextIO) -> Iterator[Tuple[int, Dict]]:
+    """Yield (line_number, row) from a JSON Lines file; unparsable lines yield the error instead."""
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield line_number, ValueError("Invalid JSON: expected an object.")
+            continue
+        yield line_number, row
+
+
+def parse_book_row(row: Dict) -> Tuple[Optional[Tuple[str, str, str, int]], Optional[str]]:
+    """
+    Turn a raw import row into a (title, author, isbn, total_copies) tuple.
+
+    Returns:
+        tuple: (book, None) if the row is valid, otherwise (None, error message)
+    """
+    title = str(row.get('title') or '')
+    author = str(row.get('author') or '')
+    isbn = str(row.get('isbn') or '').strip()
+    # Only whole numbers: int() would also turn 2.7 into 2 and true into 1
+    raw_copies = row.get('total_copies')
+    if isinstance(raw_copies, str) and raw_copies.strip().isdecimal():
+        total_copies = int(raw_copies.strip())
+    elif isinstance(raw_copies, int) and not isinstance(raw_copies, bool):
+        total_copies = raw_copies
+    else:
+        return None, "Total copies must be a positive integer."
+
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return None, error
+    return (title.strip(), author.strip(), isbn, total_copies), None
+
+
+def import_books(stream: TextIO, fmt: str = 'csv', batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """
+    Import books from a CSV or JSONL stream, reading it incrementally.
+
+    Args:
+        stream: Text stream to read from
+        fmt: 'csv' or 'jsonl'
+        batch_size: Rows per insert transaction
+
+    Returns:
+        dict: Report with counts of inserted, duplicate and invalid rows, the
+        per-line problems (up to MAX_REPORTED_ERRORS) and throughput
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    rows = iter_csv_rows(stream) if fmt == 'csv' else iter_jsonl_rows(stream)
+
+    report = {'rows': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+    seen_isbns = set()
+    batch: List[Tuple[str, str, str, int]] = []
+    batch_lines: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    def record_error(line_number: int, isbn: str, message: str):
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'line': line_number, 'isbn': isbn, 'error': message})
+
+    def flush():
+        skipped = insert_books_bulk(batch)
+        report['inserted'] += len(batch) - len(skipped)
+        report['duplicates'] += len(skipped)
+        for isbn in skipped:
+            record_error(batch_lines[isbn], isbn, "A book with this ISBN already exists.")
+        batch.clear()
+        batch_lines.clear()
+
+    for line_number, row in rows:
+        report['rows'] += 1
+        if isinstance(row, Exception):
+            report['invalid'] += 1
+            record_error(line_number, '', str(row))
+            continue
+
+        book, error = parse_book_row(row)
+        if error:
+            report['invalid'] += 1
+            record_error(line_number, str(row.get('isbn') or ''), error)
+            continue
+
+        isbn = book[2]
+        if isbn in seen_isbns:
+            report['duplicates'] += 1
+            record_error(line_number, isbn, "Duplicate ISBN within the import file.")
+            continue
+        seen_isbns.add(isbn)
+
+        batch.append(book)
+        batch_lines[isbn] = line_number
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    report['errors'].sort(key=lambda error: error['line'])
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['rows_per_second'] = round(report['rows'] / elapsed, 1) if elapsed > 0 else 0.0
+    return report
+
+
+def detect_format(filename: str, default: str = 'csv') -> str:
+    """Guess the import format from a file name."""
+    lowered = (filename or '').lower()
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if lowered.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import books into the library catalog.")
+    parser.add_argument('path', help="CSV or JSONL file ('-' for stdin)")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    init_database()
+
+    fmt = args.format or detect_format(args.path)
+    if args.path == '-':
+        report = import_books(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), fmt, args.batch_size)
+    else:
+        with open(args.path, newline='', encoding='utf-8') as stream:
+            report = import_books(stream, fmt, args.batch_size)
+
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['error']} {error['isbn']}".rstrip(), file=sys.stderr)
+    print(f"rows: {report['rows']}  inserted: {report['inserted']}  duplicates: {report['duplicates']}  "
+          f"invalid: {report['invalid']}  ({report['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Export Module - Streaming export of the catalog and borrowing history
+Rows are read in fetchmany() batches and written out as CSV or NDJSON chunks
+as they arrive, so memory use is constant and the first bytes go out before
+the query has finished. A catalog export can be fed back to bulk_import.
+
+Usage:
+    python -m services.export books [--format ndjson|csv] [--output FILE]
+    python -m services.export loans [--patron 123456] [--format ndjson|csv] [--output FILE]
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, Optional, Sequence
+
+from database import (
+    BOOK_EXPORT_COLUMNS, EXPORT_BATCH_SIZE, LOAN_EXPORT_COLUMNS, init_database, iter_books, iter_loans
+)
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _text(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_csv(columns: Sequence[str], rows: Iterable[Sequence], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield a CSV header chunk, then one chunk per `batch_size` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        pending += 1
+        if pending == batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def iter_ndjson(columns: Sequence[str], rows: Iterable[Sequence], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Yield one JSON object per row, `batch_size` lines per chunk."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, map(_text, row))), separators=(',', ':')))
+        if len(lines) == batch_size:
+            lines.append('')
+            yield '\n'.join(lines)
+            lines = []
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines)
+
+
+def _serialize(fmt: str, columns: Sequence[str], rows: Iterable[Sequence], batch_size: int) -> Iterator[str]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    writer = iter_csv if fmt == 'csv' else iter_ndjson
+    return writer(columns, rows, batch_size)
+
+
+def export_books(fmt: str = 'ndjson', batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Stream the whole catalog.
+
+    Args:
+        fmt: 'ndjson' or 'csv'
+        batch_size: Rows fetched and written per chunk
+
+    Returns:
+        iterator: Text chunks (raises ValueError up front for an unknown format)
+    """
+    return _serialize(fmt, BOOK_EXPORT_COLUMNS, iter_books(batch_size), batch_size)
+
+
+def export_loans(fmt: str = 'ndjson', patron_id: Optional[str] = None,
+                 batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Stream every borrow record, or one patron's borrowing history.
+
+    Args:
+        fmt: 'ndjson' or 'csv'
+        patron_id: 6-digit library card ID (None for all loans)
+        batch_size: Rows fetched and written per chunk
+
+    Returns:
+        iterator: Text chunks (raises ValueError up front for an unknown format)
+    """
+    return _serialize(fmt, LOAN_EXPORT_COLUMNS, iter_loans(patron_id, batch_size), batch_size)
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Export the catalog or borrowing history.")
+    parser.add_argument('what', choices=('books', 'loans'))
+    parser.add_argument('--patron', help="Only this patron's borrowing history (loans only)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson')
+    parser.add_argument('--output', help="File to write (defaults to stdout)")
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    init_database()
+
+    if args.what == 'books':
+        chunks = export_books(args.format, args.batch_size)
+    else:
+        chunks = export_loans(args.format, args.patron, args.batch_size)
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as out:
+            out.writelines(chunks)
+    else:
+        sys.stdout.writelines(chunks)
+
+
+if __name__ == '__main__':
+    main()
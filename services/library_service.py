@@ -4,15 +4,23 @@ Contains all the core business logic for the Library Management System
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+import re
+import database
+from cache import LRUCache, SingleFlight
 from database import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
     insert_book, insert_borrow_record, update_book_availability,
-    update_borrow_record_return_date, get_all_books, get_patron_borrowed_books, get_db_connection
+    update_borrow_record_return_date, get_all_books, get_patron_borrowed_books, get_db_connection,
+    borrow_book_transaction, return_book_transaction, fts_enabled, build_fts_query, trigram_enabled,
+    decode_loan, from_db_timestamp, to_db_patron_id, get_catalog_version
 )
+from records import Book, fetch_records
 from services.payment_service import PaymentGateway
+from tracing import span, traced
 from math import ceil
 
+@traced('service.add_book_to_catalog')
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
     Add a new book to the catalog.
@@ -28,23 +36,9 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
         tuple: (success: bool, message: str)
     """
     # Input validation
-    if not title or not title.strip():
-        return False, "Title is required."
-    
-    if len(title.strip()) > 200:
-        return False, "Title must be less than 200 characters."
-    
-    if not author or not author.strip():
-        return False, "Author is required."
-    
-    if len(author.strip()) > 100:
-        return False, "Author must be less than 100 characters."
-    
-    if len(isbn) != 13:
-        return False, "ISBN must be exactly 13 digits."
-    
-    if not isinstance(total_copies, int) or total_copies <= 0:
-        return False, "Total copies must be a positive integer."
+    error = validate_book_fields(title, author, isbn, total_copies)
+    if error:
+        return False, error
     
     # Check for duplicate ISBN
     existing = get_book_by_isbn(isbn)
@@ -58,6 +52,35 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     else:
         return False, "Database error occurred while adding the book."
 
+def validate_book_fields(title: str, author: str, isbn: str, total_copies: int) -> Optional[str]:
+    """
+    Validate the fields of a new book against the R1 rules.
+    Shared by add_book_to_catalog and the bulk import pipeline.
+    
+    Returns:
+        The validation error message, or None if the fields are valid
+    """
+    if not title or not title.strip():
+        return "Title is required."
+    
+    if len(title.strip()) > 200:
+        return "Title must be less than 200 characters."
+    
+    if not author or not author.strip():
+        return "Author is required."
+    
+    if len(author.strip()) > 100:
+        return "Author must be less than 100 characters."
+    
+    if len(isbn) != 13:
+        return "ISBN must be exactly 13 digits."
+    
+    if not isinstance(total_copies, int) or total_copies <= 0:
+        return "Total copies must be a positive integer."
+    
+    return None
+
+@traced('service.borrow_book_by_patron')
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -74,35 +97,27 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits."
     
-    # Check if book exists and is available
-    book = get_book_by_id(book_id)
-    if not book:
+    # Create borrow record
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=14)
+    
+    # Availability check, limit check, insert and decrement run as one transaction
+    status, book = borrow_book_transaction(patron_id, book_id, borrow_date, due_date, max_borrowed=5)
+    if status == 'not_found':
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    if status == 'unavailable':
         return False, "This book is currently not available."
     
-    # Check patron's current borrowed books count
-    current_borrowed = get_patron_borrow_count(patron_id)
-    
-    if current_borrowed >= 5:
+    if status == 'limit_reached':
         return False, "You have reached the maximum borrowing limit of 5 books."
     
-    # Create borrow record
-    borrow_date = datetime.now()
-    due_date = borrow_date + timedelta(days=14)
-    
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    if status != 'borrowed':
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
+@traced('service.return_book_by_patron')
 def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Process book return by a patron.
@@ -113,27 +128,21 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
 - Updates available copies and records return date
 - Calculates and displays any late fees owed
     """
-    books = get_patron_borrowed_books(patron_id)
-    if books == []:
+    # Lookup of the open loan, return date and availability update run as one transaction
+    return_date = datetime.now()
+    status, loan = return_book_transaction(patron_id, book_id, return_date)
+    if status == 'no_loans':
         return False, "Patron not found or no books borrowed"
-    book = []
-    for book_borrowed in books:
-        if book_borrowed['book_id'] == book_id:
-            book = book_borrowed
-            break
-    if not book:
+    if status == 'not_borrowed':
         return False, "Book not borrowed"
-    fees = calculate_late_fee_for_book(patron_id, book_id)
-
-    book_avail_updated = update_book_availability(book_id, 1)
-    if not book_avail_updated:
-        return False, "Book availability not updated"
-    book_return = update_borrow_record_return_date(patron_id, book_id, datetime.now())
-    if not book_return:
-        return False, "Return date not updated"
+    if status != 'returned':
+        return False, "Database error occurred while processing the return."
     
-    return True, "Successfully returned. Late fees: " + f"{fees['fee_amount']}"
+    fee_amount, days_overdue = compute_late_fee(loan['due_date'], return_date)
+    
+    return True, "Successfully returned. Late fees: " + f"{fee_amount}"
 
+@traced('service.calculate_late_fee_for_book')
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     # Calculate late fees for a specific book.
     
@@ -157,12 +166,31 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
             'days_overdue': 0,
             'status': 'Patron not found or book not found'
         }
-    due_date = book['due_date']
+    fee_amount, days_overdue = compute_late_fee(book['due_date'])
+    
+    return { 
+        'fee_amount': fee_amount,
+        'days_overdue': days_overdue,
+        'status': 'Success'
+    }
 
+def compute_late_fee(due_date, now: Optional[datetime] = None) -> Tuple[float, int]:
+    """
+    Compute the late fee for a loan from its due date.
+    $0.50/day for the first 7 days overdue, $1.00/day after that, capped at $15.00.
+    
+    Args:
+        due_date: Due date of the loan (datetime or date)
+        now: Point in time to compute the fee at (defaults to the current time)
+        
+    Returns:
+        tuple: (fee_amount: float, days_overdue: int)
+    """
     if isinstance(due_date, datetime) is False:
         due_date = datetime.combine(due_date, datetime.min.time())
 
-    now = datetime.now()
+    if now is None:
+        now = datetime.now()
     delta_seconds = (now - due_date).total_seconds()
     days_overdue = max(ceil(delta_seconds / (24 * 3600)), 0)
 
@@ -173,46 +201,400 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     else:
         fee_amount = min(15.00, 7*0.50 + (days_overdue - 7)*1.00)
     
-    return { 
-        'fee_amount': round(fee_amount,2),
-        'days_overdue': days_overdue,
-        'status': 'Success'
-    }
+    return round(fee_amount, 2), days_overdue
+
+
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_COUNT_CAP = 1000  # totals above this are reported as '1000+'
+SEARCH_SORTS = ('relevance', 'title', 'availability')
 
+# SQL orderings for the non-relevance sorts (relevance: see _search_query)
+_SEARCH_ORDERS = {
+    'title': 'b.title, b.id',
+    'availability': 'b.available_copies DESC, b.title, b.id',
+}
+_SEARCH_SORT_KEYS = {
+    'title': lambda book: (book.title, book.id),
+    'availability': lambda book: (-book.available_copies, book.title, book.id),
+}
 
-def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
+def _search_sources(search_term: str, search_type: str, available_only: bool) -> Tuple[str, Optional[str], Tuple]:
+    """
+    FROM/WHERE clauses (over books as b) for the substring matches and the
+    books_fts matches of a title or author search, and their parameters:
+    ?1 is the LIKE pattern and ?2 the MATCH expression.
+    
+    Every book containing the term is matched, including inside a word ('cat'
+    in 'Concatenation'): the books_trigram index answers the LIKE for terms of
+    three or more characters, shorter ones (or databases without it) scan
+    books. The books_fts index adds its word-prefix matches, whose words need
+    not be adjacent ('gatsby great'); its clause is None when the index is
+    missing or the term has no words. CROSS JOIN keeps the index as the outer
+    loop: otherwise the planner may walk a books index in sort order and run
+    the MATCH or LIKE once per book.
+    """
+    if len(search_term) >= 3 and trigram_enabled():
+        like = f'books_trigram CROSS JOIN books b ON b.id = books_trigram.rowid WHERE books_trigram.{search_type} LIKE ?1'
+    else:
+        like = f'books b WHERE LOWER(b.{search_type}) LIKE ?1'
+    match = build_fts_query(search_term, search_type) if fts_enabled() else None
+    fts = 'books_fts CROSS JOIN books b ON b.id = books_fts.rowid WHERE books_fts MATCH ?2' if match else None
+    if available_only:
+        like += ' AND b.available_copies > 0'
+        fts = fts and fts + ' AND b.available_copies > 0'
+    pattern = f"%{search_term.lower()}%"
+    return like, fts, (pattern,) if fts is None else (pattern, match)
+
+def _search_query(search_term: str, search_type: str, limit: Optional[int], offset: int, sort: str,
+                  available_only: bool) -> Tuple[str, Tuple]:
+    """
+    SQL and parameters for one page of a title or author search.
+    
+    Index and substring matches are each cut to their first offset + limit
+    rows in the requested order (and filtered by availability) before being
+    merged, so only those rows are joined and sorted again. Relevance puts the
+    BM25-ranked index matches first, then substring-only matches in id order.
+    """
+    like, fts, params = _search_sources(search_term, search_type, available_only)
+    limit = -1 if limit is None else limit
+    if fts is None:
+        order = _SEARCH_ORDERS.get(sort)
+        order = f' ORDER BY {order}' if order else ''
+        return f'SELECT b.* FROM {like}{order} LIMIT ?2 OFFSET ?3', params + (limit, offset)
+    if sort in _SEARCH_ORDERS:
+        order = _SEARCH_ORDERS[sort]
+        matches = (f'SELECT * FROM (SELECT b.id FROM {fts} ORDER BY {order} LIMIT ?3) UNION '
+                   f'SELECT * FROM (SELECT b.id FROM {like} ORDER BY {order} LIMIT ?3)')
+    else:
+        order = 'm.score IS NULL, m.score, b.id'
+        matches = (f'SELECT * FROM (SELECT b.id, bm25(books_fts) AS score FROM {fts} ORDER BY score, b.id LIMIT ?3) '
+                   f'UNION ALL SELECT * FROM (SELECT b.id, NULL FROM {like} AND b.id NOT IN '
+                   '(SELECT rowid FROM books_fts WHERE books_fts MATCH ?2) ORDER BY b.id LIMIT ?3)')
+    depth = -1 if limit < 0 else offset + limit
+    return (f'SELECT b.* FROM ({matches}) m JOIN books b ON b.id = m.id ORDER BY {order} LIMIT ?4 OFFSET ?5',
+            params + (depth, limit, offset))
+
+def _page_in_memory(books: List[Book], limit: Optional[int], offset: int, sort: str,
+                    available_only: bool) -> List[Book]:
+    # For the isbn and fuzzy searches, whose results are already bounded
+    if available_only:
+        books = [book for book in books if book.available_copies > 0]
+    if sort in _SEARCH_SORT_KEYS:
+        books = sorted(books, key=_SEARCH_SORT_KEYS[sort])
+    return books[offset:None if limit is None else offset + limit]
+
+def _bounded_search(search_term: str, search_type: str, bound: int) -> List[Book]:
+    if search_type == 'fuzzy':
+        return search_books_fuzzy(search_term, limit=max(FUZZY_LIMIT, bound))
+    if search_type == 'isbn':
+        book = get_book_by_isbn(search_term)
+        return [book] if book else []
+    return []
+
+@traced('service.search_books_in_catalog')
+def search_books_in_catalog(search_term: str, search_type: str, limit: Optional[int] = None,
+                            offset: int = 0, sort: str = 'relevance',
+                            available_only: bool = False) -> List[Book]:
     """
     Search for books in the catalog.
     The system shall provide search functionality with the following parameters:
 - `q`: search term
-- `type`: search type (title, author, isbn)
+- `type`: search type (title, author, isbn, fuzzy)
 - Support partial matching for title/author (case-insensitive)
 - Support exact matching for ISBN
 - Return results in same format as catalog display
     
-    TODO: Implement R6 as per requirements
+    Title/author searches return every book containing the term, plus the
+    books_fts matches of all its words as prefixes, BM25-ranked first (see
+    _search_sources). Fuzzy searches are handled by search_books_fuzzy().
+    
+    Args:
+        search_term: Text to search for
+        search_type: 'title', 'author', 'isbn' or 'fuzzy'
+        limit: Maximum number of books returned (None for all)
+        offset: Number of matching books to skip
+        sort: One of SEARCH_SORTS
+        available_only: Only return books with a copy on the shelf
+        
+    Returns:
+        list: The requested slice of matching books
     """
-    if search_type == 'title':
+    if search_type in ('title', 'author'):
+        sql, params = _search_query(search_term, search_type, limit, offset, sort, available_only)
         conn = get_db_connection()
-        input = "SELECT * FROM books WHERE LOWER(title) LIKE ?"
-        books = conn.execute(input, (f"%{search_term.lower()}%",)).fetchall()
+        books = fetch_records(conn.execute(sql, params), Book)
         conn.close()
-        if books:
-            return [dict(book) for book in books]
-    if search_type == 'isbn':
-        book = get_book_by_isbn(search_term)
-        if book:
-            return [dict(book)]
-    if search_type == 'author':
+        return books
+    bound = SEARCH_COUNT_CAP if limit is None else offset + limit
+    return _page_in_memory(_bounded_search(search_term, search_type, bound), limit, offset, sort, available_only)
+
+@traced('service.count_search_results')
+def count_search_results(search_term: str, search_type: str, available_only: bool = False,
+                         cap: int = SEARCH_COUNT_CAP) -> int:
+    """
+    Count the books a search matches, stopping once the count passes `cap`.
+    
+    Returns:
+        int: The number of matches, or cap + 1 if there are more than `cap`
+    """
+    if search_type in ('title', 'author'):
+        like, fts, params = _search_sources(search_term, search_type, available_only)
+        matches = f'SELECT b.id FROM {like}' if fts is None else f'SELECT b.id FROM {fts} UNION SELECT b.id FROM {like}'
         conn = get_db_connection()
-        input = "SELECT * FROM books WHERE LOWER(author) LIKE ?"
-        books = conn.execute(input, (f"%{search_term.lower()}%",)).fetchall()
+        count = conn.execute(
+            f'SELECT COUNT(*) FROM ({matches} LIMIT ?{len(params) + 1})', params + (cap + 1,)
+        ).fetchone()[0]
         conn.close()
-        if books:
-            return [dict(book) for book in books]
-    return []
+        return count
+    books = _bounded_search(search_term, search_type, cap + 1)
+    return min(len(_page_in_memory(books, None, 0, 'relevance', available_only)), cap + 1)
+
+FUZZY_THRESHOLD = 0.5
+FUZZY_LIMIT = 20
+FUZZY_CANDIDATE_LIMIT = 200  # rows fetched from the index before exact scoring
+FUZZY_POSTINGS_BUDGET = 5000  # index entries ranked per query, rarest trigrams first
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Case-folded trigrams of each word, padded as in pg_trgm so that word
+    starts and ends count: 'Gatsby' -> {'  g', ' ga', 'gat', ..., 'by '}.
+    """
+    grams = set()
+    for word in re.findall(r'\w+', text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def trigram_similarity(query_grams: Set[str], text: str) -> Tuple[float, float]:
+    """
+    Similarity of a text to a query's trigrams as (share of the query's
+    trigrams found in the text, Jaccard similarity). The first makes a typo
+    in a long title as findable as in a short one; the second breaks ties
+    in favour of closer lengths.
+    """
+    grams = trigrams(text)
+    shared = len(query_grams & grams)
+    return shared / len(query_grams), shared / len(query_grams | grams)
+
+def _word_halves(word: str) -> List[str]:
+    # One typo can only break one half, so a misspelt word still contains the other
+    if len(word) < 6:
+        return [word]
+    return [word[:len(word) // 2], word[len(word) // 2:]]
+
+def _all_trigrams_query(text: str) -> str:
+    return ' AND '.join(f'"{text[i:i + 3]}"' for i in range(len(text) - 2))
+
+@traced('service.search_books_fuzzy')
+def search_books_fuzzy(search_term: str, threshold: float = FUZZY_THRESHOLD,
+                       limit: int = FUZZY_LIMIT) -> List[Book]:
+    """
+    Typo-tolerant search over title and author using the books_trigram index.
+    
+    Candidates are found through the index without touching the rest of the
+    catalog, in three steps that stop once FUZZY_CANDIDATE_LIMIT books are
+    found:
+    
+    1. Books containing, for every word of the term, all the trigrams of one
+       of its halves (one typo per word leaves a half intact).
+    2. Books sharing any of the term's rarest trigrams, as many as fit
+       FUZZY_POSTINGS_BUDGET index entries, in BM25 order.
+    3. Books containing all the trigrams of any half of any word.
+    
+    Only step 2 is ranked, and it is bounded by the budget; the others stop
+    at the limit. The candidates are scored on all of the term's trigrams
+    against title and author, and those scoring at least `threshold` are
+    returned best first.
+    
+    Args:
+        search_term: Words to match approximately, e.g. 'Fitzgerld'
+        threshold: Minimum share of the term's trigrams a match must contain
+        limit: Maximum number of books returned
+        
+    Returns:
+        list: Matching books, most similar first
+    """
+    query_grams = trigrams(search_term)
+    # Trigrams inside words are what the index holds; shorter words have none
+    words = [word for word in re.findall(r'\w+', search_term.lower()) if len(word) >= 3]
+    if not words:
+        return []
+    inner = sorted({word[i:i + 3] for word in words for i in range(len(word) - 2)})
+    
+    conn = get_db_connection()
+    if trigram_enabled():
+        placeholders = ', '.join('?' * len(inner))
+        counts = dict(conn.execute(
+            f'SELECT term, doc FROM books_trigram_vocab WHERE term IN ({placeholders})', inner
+        ).fetchall())
+        rare, budget = [], 0
+        for gram in sorted((gram for gram in inner if counts.get(gram)), key=counts.get):
+            if budget + counts[gram] > FUZZY_POSTINGS_BUDGET:
+                break
+            rare.append(gram)
+            budget += counts[gram]
+        # Every word by either half first, then books sharing the rarest
+        # trigrams, then any half of any word, until there are enough
+        halves = [[half for half in _word_halves(word) if len(half) >= 3] or [word] for word in words]
+        queries = [(' AND '.join('(' + ' OR '.join(f'({_all_trigrams_query(half)})' for half in word) + ')'
+                                 for word in halves), '')]
+        if rare:
+            queries.append((' OR '.join(f'"{gram}"' for gram in rare), 'ORDER BY bm25(books_trigram)'))
+        queries.append((' OR '.join(f'({_all_trigrams_query(half)})' for word in halves for half in word), ''))
+        candidates = {}
+        for match, order in queries if counts else []:
+            for book in fetch_records(conn.execute(f'''
+                SELECT b.* FROM books_trigram
+                JOIN books b ON b.id = books_trigram.rowid
+                WHERE books_trigram MATCH ?
+                {order}
+                LIMIT ?
+            ''', (match, FUZZY_CANDIDATE_LIMIT)), Book):
+                candidates.setdefault(book.id, book)
+            if len(candidates) >= FUZZY_CANDIDATE_LIMIT:
+                break
+        candidates = list(candidates.values())
+    else:
+        # No trigram tokenizer: scan for books containing any of the trigrams
+        clauses = ' OR '.join(['LOWER(title) LIKE ? OR LOWER(author) LIKE ?'] * len(inner))
+        candidates = fetch_records(conn.execute(
+            f'SELECT * FROM books WHERE {clauses} LIMIT ?',
+            [f'%{gram}%' for gram in inner for _ in range(2)] + [FUZZY_CANDIDATE_LIMIT]
+        ), Book)
+    conn.close()
+    
+    scored = []
+    for book in candidates:
+        score = max(trigram_similarity(query_grams, book.title), trigram_similarity(query_grams, book.author))
+        if score[0] >= threshold:
+            scored.append((score, book))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [book for _, book in scored[:limit]]
+
+SEARCH_CACHE_SIZE = 1000
+
+# Search results and counts keyed by (type, normalized term, ...) and tagged
+# with (database, catalog version). Any write to books moves the catalog
+# version on, so the cache is emptied as soon as a newer version is seen.
+# Only pages of at most SEARCH_MAX_PAGE_SIZE + 1 books are cached, which
+# bounds the cache at SEARCH_CACHE_SIZE such pages.
+_search_cache = LRUCache(SEARCH_CACHE_SIZE)
+_search_flight = SingleFlight()
+
+def configure_search_cache(size: int = SEARCH_CACHE_SIZE):
+    """Replace the search result cache with an empty one of the given size."""
+    global _search_cache, _search_flight
+    _search_cache = LRUCache(size)
+    _search_flight = SingleFlight()
+
+def get_search_cache_stats() -> Dict:
+    """Hit/miss counters of the search cache plus searches executed and coalesced."""
+    stats = _search_cache.stats()
+    stats.update(_search_flight.stats())
+    return stats
+
+def check_search_sort(sort: str):
+    """Raise ValueError unless sort is one of SEARCH_SORTS."""
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"Unsupported sort: {sort}. Use one of: {', '.join(SEARCH_SORTS)}.")
+
+def normalize_search(search_term: str, search_type: str) -> str:
+    """Collapse whitespace, and case for the case-insensitive title/author searches."""
+    term = ' '.join(search_term.split())
+    return term if search_type == 'isbn' else term.lower()
+
+def _cached_search(key: Tuple, load, cacheable: bool = True):
+    version, _ = get_catalog_version()
+    cache = _search_cache
+    cache.ensure_version((database.DATABASE, version))
+    key = (database.DATABASE, version) + key
+    if not cacheable:
+        return _search_flight.do(key, load)
+
+    value = cache.get(key)
+    if value is None:
+        def run():
+            found = load()
+            cache.set(key, found)
+            return found
+        value = _search_flight.do(key, run)
+    return value
+
+@traced('service.search_books_cached')
+def search_books_cached(search_term: str, search_type: str, limit: Optional[int] = SEARCH_PAGE_SIZE,
+                        offset: int = 0, sort: str = 'relevance',
+                        available_only: bool = False) -> List[Book]:
+    """
+    search_books_in_catalog() through the result cache. Identical searches
+    arriving while one is running wait for its result instead of querying.
+    Results larger than a page (limit None or above SEARCH_MAX_PAGE_SIZE + 1)
+    are searched directly and never cached.
+    
+    Raises:
+        ValueError: If sort is not one of SEARCH_SORTS
+    """
+    check_search_sort(sort)
+    term = normalize_search(search_term, search_type)
+    books = _cached_search(
+        (search_type, term, limit, offset, sort, available_only),
+        lambda: search_books_in_catalog(term, search_type, limit=limit, offset=offset, sort=sort,
+                                        available_only=available_only),
+        cacheable=limit is not None and limit <= SEARCH_MAX_PAGE_SIZE + 1)
+    # Callers get their own records; the cached ones stay untouched
+    return [book.copy() for book in books]
+
+@traced('service.search_catalog_page')
+def search_catalog_page(search_term: str, search_type: str, limit: int = SEARCH_PAGE_SIZE,
+                        offset: int = 0, sort: str = 'relevance', available_only: bool = False) -> Dict:
+    """
+    One page of search results with a capped total, both through the cache.
+    The page and the count each stop after about `limit` and SEARCH_COUNT_CAP
+    matches, so a term matching most of the catalog costs no more than a
+    narrow one. Paging ends at offset SEARCH_COUNT_CAP.
+    
+    Args:
+        search_term: Text to search for
+        search_type: 'title', 'author', 'isbn' or 'fuzzy'
+        limit: Page size, clamped to 1..SEARCH_MAX_PAGE_SIZE
+        offset: Matches to skip, clamped to 0..SEARCH_COUNT_CAP
+        sort: One of SEARCH_SORTS
+        available_only: Only include books with a copy on the shelf
+        
+    Returns:
+        dict: books, total (an int, or e.g. '1000+' past SEARCH_COUNT_CAP),
+        limit, offset and next_offset (None on the last page)
+    
+    Raises:
+        ValueError: If sort is not one of SEARCH_SORTS
+    """
+    check_search_sort(sort)
+    limit = max(1, min(int(limit), SEARCH_MAX_PAGE_SIZE))
+    offset = max(0, min(int(offset), SEARCH_COUNT_CAP))
+
+    # One extra row tells whether there is a next page
+    books = search_books_cached(search_term, search_type, limit + 1, offset, sort, available_only)
+    has_more = len(books) > limit
+    books = books[:limit]
+    if offset == 0 and not has_more:
+        total = len(books)
+    else:
+        term = normalize_search(search_term, search_type)
+        total = _cached_search(
+            ('count', search_type, term, available_only),
+            lambda: count_search_results(term, search_type, available_only))
+    next_offset = offset + limit if has_more and offset + limit <= SEARCH_COUNT_CAP else None
+    return {
+        'books': books,
+        'total': total if total <= SEARCH_COUNT_CAP else f'{SEARCH_COUNT_CAP}+',
+        'limit': limit,
+        'offset': offset,
+        'next_offset': next_offset,
+    }
 
-def get_patron_status_report(patron_id: str) -> Dict:
+@traced('service.get_patron_status_report')
+def get_patron_status_report(patron_id: str, history_limit: Optional[int] = None,
+                             history_offset: int = 0) -> Dict:
     """
     Get status report for a patron.
     The system shall display patron status for a particular patron that includes the following: 
@@ -222,60 +604,95 @@ def get_patron_status_report(patron_id: str) -> Dict:
 - Number of books currently borrowed
 - Borrowing history
     
-    TODO: Implement R7 as per requirements
+    Current loans, the requested page of history, the history size and the
+    patron's open_loans counter come back from a single query. The patron-level
+    values are scalar subqueries on a one-row CTE, so a page past the end still
+    reports them. Overdue counts and late fees depend on the clock, so they are
+    computed from the open loans at read time rather than taken from the
+    patrons.overdue_loans/fee_balance snapshot.
+    
+    Args:
+        patron_id: 6-digit library card ID
+        history_limit: Maximum number of history records to return (None for all)
+        history_offset: Number of history records to skip, oldest first
     """
-
-    current_books = get_patron_borrowed_books(patron_id)
-    total_books_out = get_patron_borrow_count(patron_id)
+    history_end = history_offset + history_limit if history_limit is not None else None
+    db_patron_id = to_db_patron_id(patron_id)
     conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author 
-        FROM borrow_records br 
-        JOIN books b ON br.book_id = b.id 
-        WHERE br.patron_id = ?
-        ORDER BY br.borrow_date
-    ''', (patron_id,)).fetchall()
+    rows = conn.execute('''
+        WITH patron AS (
+            SELECT (SELECT COUNT(*) FROM borrow_records br JOIN books b ON br.book_id = b.id
+                    WHERE br.patron_id = ?) AS history_total,
+                   (SELECT open_loans FROM patrons WHERE patron_id = ?) AS open_loans
+        )
+        SELECT loans.*, patron.history_total, patron.open_loans
+        FROM patron LEFT JOIN (
+            SELECT * FROM (
+                SELECT br.*, b.title, b.author,
+                       ROW_NUMBER() OVER (ORDER BY br.borrow_date, br.id) AS history_position
+                FROM borrow_records br 
+                JOIN books b ON br.book_id = b.id 
+                WHERE br.patron_id = ?
+            )
+            WHERE return_date IS NULL
+               OR (history_position > ? AND (? IS NULL OR history_position <= ?))
+        ) loans
+        ORDER BY loans.history_position
+    ''', (db_patron_id, db_patron_id, db_patron_id, history_offset, history_end, history_end)).fetchall()
     conn.close()
 
-    if (current_books == [] and records == []):
+    history_total = rows[0]['history_total'] if rows else 0
+    if not history_total:
         return {
         'borrowed_books': [],
         'total_late_fees': 0.00,
         'total_books_borrowed': 0,
+        'overdue_loans': 0,
         'borrowing_history': [],
+        'history_total': 0,
         'status': "Patron not found"
         }
-    if (current_books == []):
-        return {
-        'borrowed_books': [],
-        'total_late_fees': 0.00,
-        'total_books_borrowed': 0,
-        'borrowing_history': records,
-        'status': "Success"
-        }
 
+    # An empty page still yields the CTE row, with NULL loan columns
+    records = [row for row in rows if row['id'] is not None]
+    now = datetime.now()
     total_fees = 0.00
     borrowed_books = []
-    for book in current_books:
-        borrowed_books.append({
-            'book_id': book['book_id'],
-            'title': book['title'],
-            'author': book['author'],
-            'due_date': datetime.fromisoformat(str(book['due_date'])),
-        })
-        result = calculate_late_fee_for_book(patron_id, book['book_id'])
-        late_fee = result['fee_amount']
-        total_fees = total_fees + late_fee
+    history = []
+    for record in records:
+        position = record['history_position']
+        if record['return_date'] is None:
+            due_date = from_db_timestamp(record['due_date'])
+            fee_amount, days_overdue = compute_late_fee(due_date, now)
+            borrowed_books.append({
+                'book_id': record['book_id'],
+                'title': record['title'],
+                'author': record['author'],
+                'borrow_date': from_db_timestamp(record['borrow_date']),
+                'due_date': due_date,
+                'is_overdue': now > due_date,
+                'fee_amount': fee_amount,
+            })
+            total_fees = total_fees + fee_amount
+        if position > history_offset and (history_end is None or position <= history_end):
+            entry = decode_loan(record)
+            entry.pop('history_position')
+            entry.pop('history_total')
+            entry.pop('open_loans')
+            history.append(entry)
 
     return {
-        'borrowed_books': current_books,
-        'total_late_fees': total_fees,
-        'total_books_borrowed': total_books_out,
-        'borrowing_history': records,
+        'borrowed_books': borrowed_books,
+        'total_late_fees': round(total_fees, 2),
+        'total_books_borrowed': rows[0]['open_loans'] or 0,
+        'overdue_loans': sum(1 for book in borrowed_books if book['is_overdue']),
+        'borrowing_history': history,
+        'history_total': history_total,
         'status': "Success"
     }
 
 
+@traced('service.pay_late_fees')
 def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
@@ -325,11 +742,12 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
     # Process payment through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN THEIR TESTS!
     try:
-        success, transaction_id, message = payment_gateway.process_payment(
-            patron_id=patron_id,
-            amount=fee_amount,
-            description=f"Late fees for '{book['title']}'"
-        )
+        with span('gateway.process_payment', amount=fee_amount):
+            success, transaction_id, message = payment_gateway.process_payment(
+                patron_id=patron_id,
+                amount=fee_amount,
+                description=f"Late fees for '{book['title']}'"
+            )
         
         if success:
             return True, f"Payment successful! {message}", transaction_id
@@ -341,6 +759,7 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         return False, f"Payment processing error: {str(e)}", None
 
 
+@traced('service.refund_late_fee_payment')
 def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
     """
     Refund a late fee payment (e.g., if book was returned on time but fees were charged in error).
@@ -372,7 +791,8 @@ def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway:
     # Process refund through external gateway
     # THIS IS WHAT YOU SHOULD MOCK IN YOUR TESTS!
     try:
-        success, message = payment_gateway.refund_payment(transaction_id, amount)
+        with span('gateway.refund_payment', amount=amount):
+            success, message = payment_gateway.refund_payment(transaction_id, amount)
         
         if success:
             return True, message
@@ -0,0 +1,176 @@
+"""
+Payment Queue Module - Asynchronous late fee payments
+Accepts fee payments, returns a job ID immediately and runs the (slow)
+gateway calls on a bounded worker pool so request threads never block on them.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from services.payment_service import PaymentGateway
+from services import library_service
+from tracing import current_span, span
+
+PAYMENT_WORKERS = 4        # concurrent gateway calls
+PAYMENT_JOB_HISTORY = 10000  # finished jobs kept for polling before the oldest are dropped
+PAYMENT_MAX_PENDING = 1000   # queued or running jobs; further submissions are refused
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class PaymentQueue:
+    """
+    Job queue for late fee payments backed by a thread pool.
+
+    Each job runs pay_late_fees() with the queue's gateway; at most
+    `max_workers` gateway calls are in flight at once and at most
+    `max_pending` jobs are queued or running, so neither the executor's
+    queue nor the job table grows without bound while the gateway is slow.
+    """
+
+    def __init__(self, max_workers: int = PAYMENT_WORKERS, gateway: Optional[PaymentGateway] = None,
+                 max_jobs: int = PAYMENT_JOB_HISTORY, max_pending: int = PAYMENT_MAX_PENDING):
+        self.max_workers = max_workers
+        self.gateway = gateway or PaymentGateway()
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='payment')
+        self._jobs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._done: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, patron_id: str, book_id: int) -> Optional[str]:
+        """
+        Queue a late fee payment.
+
+        Returns:
+            str: Job ID to poll with get() or wait(), or None if `max_pending`
+            jobs are already waiting (the caller should retry later)
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'patron_id': patron_id,
+            'book_id': book_id,
+            'status': PENDING,
+            'success': None,
+            'message': None,
+            'transaction_id': None,
+            'submitted_at': time.time(),
+            'finished_at': None,
+        }
+        parent = current_span()
+        # Workers run outside the request, so each job is its own trace linked back to the request
+        linked_trace_id = parent.trace.trace_id if parent is not None else None
+        with self._lock:
+            if self._pending >= self.max_pending:
+                return None
+            self._pending += 1
+            self._jobs[job_id] = job
+            self._done[job_id] = threading.Event()
+            self._trim()
+        self._executor.submit(self._run, job_id, linked_trace_id)
+        return job_id
+
+    def _run(self, job_id: str, linked_trace_id: Optional[str] = None):
+        self._update(job_id, status=RUNNING)
+        job = self.get(job_id)
+        with span('payment_queue.job', root=True, job_id=job_id, linked_trace_id=linked_trace_id):
+            try:
+                success, message, transaction_id = library_service.pay_late_fees(
+                    job['patron_id'], job['book_id'], self.gateway
+                )
+            except Exception as e:
+                success, message, transaction_id = False, f"Payment processing error: {str(e)}", None
+        self._update(job_id, status=SUCCEEDED if success else FAILED, success=success,
+                     message=message, transaction_id=transaction_id, finished_at=time.time())
+        with self._lock:
+            self._pending -= 1
+            done = self._done.get(job_id)
+        if done is not None:
+            done.set()
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _trim(self):
+        # Drop the oldest finished jobs once the history is full
+        excess = len(self._jobs) - self.max_jobs
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id]['status'] in (SUCCEEDED, FAILED):
+                del self._jobs[job_id]
+                del self._done[job_id]
+                excess -= 1
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Get a snapshot of a job, or None if the ID is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Block until the job finishes (or the timeout passes) and return its snapshot."""
+        with self._lock:
+            done = self._done.get(job_id)
+        if done is None:
+            return None
+        done.wait(timeout)
+        return self.get(job_id)
+
+    def stats(self) -> Dict:
+        """Count of jobs by status."""
+        with self._lock:
+            counts = {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+        counts['max_workers'] = self.max_workers
+        counts['max_pending'] = self.max_pending
+        return counts
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and optionally wait for queued payments to finish."""
+        self._executor.shutdown(wait=wait)
+
+
+_queue: Optional[PaymentQueue] = None
+_queue_lock = threading.Lock()
+_queue_factory: Callable[[], PaymentQueue] = PaymentQueue
+
+
+def get_payment_queue() -> PaymentQueue:
+    """Get the process-wide payment queue, creating it on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = _queue_factory()
+        return _queue
+
+
+def configure_payment_queue(max_workers: int = PAYMENT_WORKERS, gateway: Optional[PaymentGateway] = None,
+                            max_pending: int = PAYMENT_MAX_PENDING):
+    """Replace the process-wide queue, e.g. with a different concurrency limit or a fake gateway."""
+    global _queue, _queue_factory
+    with _queue_lock:
+        if _queue is not None:
+            _queue.shutdown(wait=False)
+        _queue = None
+        _queue_factory = lambda: PaymentQueue(max_workers=max_workers, gateway=gateway, max_pending=max_pending)
+
+
+def init_app(app):
+    """Configure the payment queue from PAYMENT_WORKERS and PAYMENT_MAX_PENDING in app config."""
+    app.config.setdefault('PAYMENT_WORKERS', PAYMENT_WORKERS)
+    app.config.setdefault('PAYMENT_MAX_PENDING', PAYMENT_MAX_PENDING)
+    configure_payment_queue(app.config['PAYMENT_WORKERS'], max_pending=app.config['PAYMENT_MAX_PENDING'])
@@ -7,6 +7,8 @@ since we cannot make actual payment API calls during testing.
 """
 
 from typing import Dict, Tuple
+import random
+import threading
 import time
 
 
@@ -130,4 +132,47 @@ class PaymentGateway:
             "status": "completed",
             "amount": 10.50,
             "timestamp": time.time()
-        }
\ No newline at end of file
+        }
+
+class FakePaymentGateway(PaymentGateway):
+    """
+    Local stand-in for the payment gateway with configurable latency and failures.
+    Used by tests and load experiments to reproduce a slow or flaky gateway
+    without network access.
+    """
+    
+    def __init__(self, latency: float = 0.5, failure_rate: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        """
+        Args:
+            latency: Seconds each gateway call blocks for
+            failure_rate: Fraction of payments that are declined
+            error_rate: Fraction of payments that raise a network error
+            seed: Random seed for reproducible failure patterns
+        """
+        super().__init__(api_key="fake_key")
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.calls = 0
+    
+    def process_payment(self, patron_id: str, amount: float, description: str = "") -> Tuple[bool, str, str]:
+        """Process a payment after `latency` seconds, failing at the configured rates."""
+        with self._lock:
+            self.calls += 1
+            self._counter += 1
+            counter = self._counter
+            roll = self._random.random()
+        time.sleep(self.latency)
+        
+        if roll < self.error_rate:
+            raise ConnectionError("Payment gateway unreachable")
+        if roll < self.error_rate + self.failure_rate:
+            return False, "", "Payment declined by issuer"
+        if amount <= 0:
+            return False, "", "Invalid amount: must be greater than 0"
+        
+        transaction_id = f"txn_{patron_id}_{counter}"
+        return True, transaction_id, f"Payment of ${amount:.2f} processed successfully"
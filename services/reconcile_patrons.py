@@ -0,0 +1,30 @@
+"""
+Patron Counter Reconciliation - Rebuild the materialized patrons counters
+Recomputes open/overdue loan counts and outstanding fees for every patron
+from borrow_records in one set-based statement. Run it periodically (fees
+accrue with time) or after loading loans with triggers disabled.
+
+Usage:
+    python -m services.reconcile_patrons [--as-of 2025-01-01T12:00:00]
+"""
+
+import argparse
+from datetime import datetime
+from typing import Iterable, Optional
+
+from database import init_database, reconcile_patron_counters
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Rebuild the patrons counters from borrow_records.")
+    parser.add_argument('--as-of', type=datetime.fromisoformat, default=None,
+                        help="Point in time for overdue counts and fees (ISO-8601, defaults to now)")
+    args = parser.parse_args(argv)
+
+    init_database()
+    result = reconcile_patron_counters(args.as_of)
+    print(f"patrons: {result['patrons']}  drifted: {result['drifted']}")
+
+
+if __name__ == '__main__':
+    main()
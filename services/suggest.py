@@ -0,0 +1,207 @@
+"""
+Suggest Module - Typeahead suggestions from an in-memory prefix index
+Title and author words are kept in a sorted vocabulary searched with bisect,
+each with a compact array of the ids of the suggestions containing it, so a
+keystroke is answered without touching the database. The index is built once
+from the catalog and extended as books are committed.
+
+Usage:
+    suggest('great gat')  ->  [{'text': 'The Great Gatsby', 'type': 'title'}, ...]
+"""
+
+import heapq
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import database
+from database import add_book_listener, get_db_connection
+
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 25
+SUGGEST_SCAN_LIMIT = 250  # candidates examined per query before ranking
+
+TITLE, AUTHOR = 0, 1
+_KIND_NAMES = ('title', 'author')
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words of a title, author or query."""
+    return _WORD.findall(text.lower())
+
+
+def _contains(posting: array, suggestion_id: int) -> bool:
+    position = bisect_left(posting, suggestion_id)
+    return position < len(posting) and posting[position] == suggestion_id
+
+
+class PrefixIndex:
+    """
+    Word-prefix index over suggestion texts.
+
+    Every title is a suggestion; authors are deduplicated by their normalized
+    words. Suggestion texts are packed as UTF-8 into one buffer with a 4-byte
+    offset each, so memory is the text itself plus one byte of kind, one
+    string per distinct word and four bytes per (word, suggestion) pair.
+    """
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._offsets = array('I', (0,))
+        self._kinds = bytearray()
+        self._authors: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._postings: List[array] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def _append(self, text: str, kind: int) -> Optional[int]:
+        if kind == AUTHOR:
+            key = ' '.join(tokenize(text))
+            if not key or key in self._authors:
+                return None
+            self._authors[key] = len(self._kinds)
+        self._blob += text.encode('utf-8')
+        self._offsets.append(len(self._blob))
+        self._kinds.append(kind)
+        return len(self._kinds) - 1
+
+    @classmethod
+    def build(cls, books: Iterable[Tuple[str, str]]) -> 'PrefixIndex':
+        """Build an index from (title, author) pairs, sorting the vocabulary once."""
+        index = cls()
+        postings: Dict[str, array] = {}
+        for title, author in books:
+            for text, kind in ((title, TITLE), (author, AUTHOR)):
+                suggestion_id = index._append(text, kind)
+                if suggestion_id is None:
+                    continue
+                for token in set(tokenize(text)):
+                    posting = postings.get(token)
+                    if posting is None:
+                        posting = postings[token] = array('I')
+                    posting.append(suggestion_id)
+        index._tokens = sorted(postings)
+        index._postings = [postings[token] for token in index._tokens]
+        return index
+
+    def add_books(self, books: Iterable[Tuple[str, str]]):
+        """Add (title, author) pairs to a live index."""
+        with self._lock:
+            for title, author in books:
+                for text, kind in ((title, TITLE), (author, AUTHOR)):
+                    suggestion_id = self._append(text, kind)
+                    if suggestion_id is None:
+                        continue
+                    for token in set(tokenize(text)):
+                        position = bisect_left(self._tokens, token)
+                        if position < len(self._tokens) and self._tokens[position] == token:
+                            self._postings[position].append(suggestion_id)
+                        else:
+                            self._tokens.insert(position, token)
+                            self._postings.insert(position, array('I', (suggestion_id,)))
+
+    def _prefix_ids(self, prefix: str) -> Iterator[int]:
+        position = bisect_left(self._tokens, prefix)
+        while position < len(self._tokens) and self._tokens[position].startswith(prefix):
+            yield from self._postings[position]
+            position += 1
+
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> List[Dict]:
+        """
+        Suggestions containing every completed word of the query and a word
+        starting with the last one, which is still being typed.
+
+        Candidates are drawn from the rarest completed word when it has at
+        most SUGGEST_SCAN_LIMIT suggestions, otherwise from the last word's
+        prefix range, and at most SUGGEST_SCAN_LIMIT are examined. Completed
+        words are checked by bisecting their (id-ordered) postings. Texts
+        starting with the query rank first, then shorter texts.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        prefix = None if query[-1:].isspace() else words.pop()
+        phrase = query.strip().lower()
+
+        found = {}
+        with self._lock:
+            required = []
+            for word in set(words):
+                position = bisect_left(self._tokens, word)
+                if position == len(self._tokens) or self._tokens[position] != word:
+                    return []
+                required.append(self._postings[position])
+            required.sort(key=len)
+
+            check_prefix = False
+            if prefix is None or (required and len(required[0]) <= SUGGEST_SCAN_LIMIT):
+                candidates = iter(required.pop(0))
+                check_prefix = prefix is not None
+            else:
+                candidates = self._prefix_ids(prefix)
+
+            blob, offsets, kinds = self._blob, self._offsets, self._kinds
+            for suggestion_id in islice(candidates, SUGGEST_SCAN_LIMIT):
+                if required and not all(_contains(posting, suggestion_id) for posting in required):
+                    continue
+                text = blob[offsets[suggestion_id]:offsets[suggestion_id + 1]].decode('utf-8')
+                if check_prefix and not any(word.startswith(prefix) for word in tokenize(text)):
+                    continue
+                found[text, kinds[suggestion_id]] = None
+
+        ranked = heapq.nsmallest(limit, found, key=lambda item: (
+            not item[0].lower().startswith(phrase), len(item[0]), item[1], item[0]))
+        return [{'text': text, 'type': _KIND_NAMES[kind]} for text, kind in ranked]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'suggestions': len(self._kinds),
+                'authors': len(self._authors),
+                'tokens': len(self._tokens),
+                'postings': sum(len(posting) for posting in self._postings),
+            }
+
+
+# One index per database path, built on first use and kept current by the
+# book listener for books added through this process
+_indexes: Dict[str, PrefixIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _on_books_added(books: List[Tuple[str, str]]):
+    index = _indexes.get(database.DATABASE)
+    if index is not None:
+        index.add_books(books)
+
+
+def build_suggest_index() -> PrefixIndex:
+    """(Re)build the index for the current database from the books table."""
+    conn = get_db_connection()
+    cursor = conn.execute('SELECT title, author FROM books ORDER BY id')
+    cursor.row_factory = None
+    index = PrefixIndex.build(cursor)
+    conn.close()
+    with _indexes_lock:
+        _indexes[database.DATABASE] = index
+    add_book_listener(_on_books_added)
+    return index
+
+
+def get_suggest_index() -> PrefixIndex:
+    """The index for the current database, built if this process has none yet."""
+    index = _indexes.get(database.DATABASE)
+    return index if index is not None else build_suggest_index()
+
+
+def suggest(query: str, limit: int = SUGGEST_LIMIT) -> List[Dict]:
+    """Typeahead suggestions (title or author texts) for a partial query."""
+    limit = max(1, min(int(limit), SUGGEST_MAX_LIMIT))
+    return get_suggest_index().suggest(query, limit)
@@ -0,0 +1,29 @@
+# Shared fixtures - a fresh database file per test, empty or seeded with the sample catalog
+
+import pytest
+import database
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Point the database module at a new file; the pool is reset afterwards."""
+    path = str(tmp_path / "library.db")
+    monkeypatch.setattr(database, "DATABASE", path)
+    yield path
+    database.configure_pool()
+
+
+@pytest.fixture
+def temp_db(db_path):
+    """A migrated, empty database with a cold book cache."""
+    database.init_database()
+    database.configure_book_cache()
+    return db_path
+
+
+@pytest.fixture
+def sample_db(temp_db):
+    """A migrated database holding the sample catalog."""
+    database.add_sample_data()
+    database.configure_book_cache()
+    return temp_db
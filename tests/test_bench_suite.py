@@ -0,0 +1,99 @@
+# Benchmark suite - every service function and route is measured, SQL statements are counted, regressions are flagged
+
+import os
+import sqlite3
+import pytest
+import database
+from benchmarks import bench_suite
+from benchmarks.bench_suite import QueryCounter, compare_results, measure, run_dataset
+from benchmarks.generate_dataset import generate_dataset
+
+
+@pytest.fixture
+def tiny_dataset(tmp_path):
+    path = str(tmp_path / "tiny.db")
+    generate_dataset(path, books=60, patrons=20, loans=300)
+    return path
+
+
+def test_run_dataset_covers_services_and_routes(tiny_dataset):
+    """Each benchmark reports throughput, latency percentiles and queries per call."""
+    results = run_dataset(tiny_dataset, iterations=10)
+    for name in ("service.borrow_book_by_patron", "service.return_book_by_patron",
+                 "service.calculate_late_fee_for_book", "service.search_books_in_catalog[title]",
+                 "service.get_patron_status_report", "route.GET /catalog", "route.POST /borrow"):
+        assert results[name]["calls"] == 10
+        assert results[name]["ops_per_sec"] > 0
+        assert results[name]["p50_ms"] <= results[name]["p99_ms"]
+    # Borrowing is one transaction: BEGIN, book lookup, limit check, insert, decrement, COMMIT
+    assert results["service.borrow_book_by_patron"]["queries_per_call"] == 6
+    assert results["service.get_patron_status_report"]["queries_per_call"] == 1
+
+
+def test_run_dataset_leaves_source_and_settings_untouched(tiny_dataset):
+    """Benchmarks write to a copy and restore the configured database afterwards."""
+    previous = database.DATABASE
+    with open(tiny_dataset, "rb") as f:
+        before = f.read()
+    run_dataset(tiny_dataset, iterations=5)
+    with open(tiny_dataset, "rb") as f:
+        assert f.read() == before
+    assert database.DATABASE == previous
+
+
+def test_query_counter_ignores_trigger_and_fts_internals(tiny_dataset):
+    """Only statements issued by the caller are counted."""
+    import sqlite3
+    counter = QueryCounter()
+    conn = sqlite3.connect(tiny_dataset)
+    counter(conn)
+    counter.reset()
+    conn.execute("UPDATE books SET title = title || '' WHERE id = 1")
+    conn.execute("SELECT rowid FROM books_fts WHERE books_fts MATCH 'the'").fetchall()
+    conn.close()
+    assert counter.count == 3  # BEGIN, UPDATE, SELECT
+
+
+def test_compare_results_flags_regressions():
+    """Slower throughput, higher p99 and extra queries are reported; noise is not."""
+    def suite(ops, p99, queries):
+        return {"results": {"small": {"bench": {"ops_per_sec": ops, "p99_ms": p99, "queries_per_call": queries}}}}
+
+    baseline = suite(1000, 2.0, 1)
+    assert compare_results(baseline, suite(950, 2.1, 1)) == []
+    assert compare_results(baseline, suite(1000, 0.02, 1)) == []
+    metrics = {r["metric"] for r in compare_results(baseline, suite(500, 5.0, 3))}
+    assert metrics == {"ops_per_sec", "p99_ms", "queries_per_call"}
+    assert compare_results(baseline, {"results": {"large": {"bench": {}}}}) == []
+
+
+def test_run_dataset_migrates_outdated_datasets(tiny_dataset):
+    """A dataset generated before the patrons table existed is upgraded, so borrows really succeed."""
+    conn = sqlite3.connect(tiny_dataset)
+    conn.executescript("""
+        DROP TRIGGER borrow_records_patrons_ai;
+        DROP TRIGGER borrow_records_patrons_au;
+        DROP TRIGGER borrow_records_patrons_ad;
+        DROP TABLE patrons;
+        PRAGMA user_version = 3;
+    """)
+    conn.close()
+    results = run_dataset(tiny_dataset, iterations=5)
+    assert results["service.borrow_book_by_patron"]["queries_per_call"] == 6
+
+
+def test_measure_fails_on_service_errors():
+    """A call that reports failure is not timed as if it had succeeded."""
+    assert measure(lambda x: (True, "ok"), [(1,)], QueryCounter())["calls"] == 1
+    with pytest.raises(RuntimeError, match="Database error"):
+        measure(lambda x: (False, "Database error"), [(1,)], QueryCounter())
+
+
+def test_cached_dataset_is_keyed_by_schema_version(tmp_path, monkeypatch):
+    """A new migration makes the suite generate a new dataset rather than reuse a stale one."""
+    monkeypatch.setattr(bench_suite, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(bench_suite, "generate_dataset", lambda path, **kwargs: open(path, "w").close())
+    path = bench_suite.ensure_dataset("small", seed=1)
+    assert os.path.basename(path) == f"small-1-v{len(database.SCHEMA_MIGRATIONS)}.db"
+    monkeypatch.setattr(database, "SCHEMA_MIGRATIONS", database.SCHEMA_MIGRATIONS + [(99, "new", [])])
+    assert bench_suite.ensure_dataset("small", seed=1) != path
@@ -0,0 +1,88 @@
+# Book lookup cache - LRU eviction, TTL expiry, write invalidation, stale loads, borrow safety
+
+import time
+from datetime import datetime, timedelta
+import pytest
+import database
+from cache import LRUCache
+
+
+# --- LRUCache ---
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_load_interrupted_by_invalidation_is_not_stored():
+    cache = LRUCache(maxsize=2)
+
+    def loader():
+        cache.invalidate("a")  # a write lands while the value is being loaded
+        return "stale"
+
+    assert cache.get_or_load("a", loader) == "stale"
+    assert cache.get("a") is None
+
+
+# --- database lookups ---
+
+@pytest.fixture
+def books_db(temp_db):
+    database.insert_book("Cached", "Author", "9780000000001", 1, 1)
+    database.invalidate_book_cache()
+
+
+def test_repeated_lookups_hit_cache(books_db):
+    before = database.get_book_cache_stats()["hits"]
+    database.get_book_by_id(1)
+    database.get_book_by_id(1)
+    database.get_book_by_isbn("9780000000001")
+    database.get_book_by_isbn("9780000000001")
+
+    assert database.get_book_cache_stats()["hits"] - before == 3
+
+
+def test_returned_book_is_a_copy(books_db):
+    database.get_book_by_id(1)["title"] = "Mutated"
+    assert database.get_book_by_id(1)["title"] == "Cached"
+
+
+def test_availability_update_invalidates(books_db):
+    database.get_book_by_id(1)
+    database.update_book_availability(1, -1)
+
+    assert database.get_book_by_id(1)["available_copies"] == 0
+    assert database.get_book_by_isbn("9780000000001")["available_copies"] == 0
+
+
+def test_missing_isbn_not_cached(books_db):
+    assert database.get_book_by_isbn("9780000000002") is None
+    database.insert_book("New", "Author", "9780000000002", 1, 1)
+    assert database.get_book_by_isbn("9780000000002")["title"] == "New"
+
+
+def test_stale_cache_cannot_oversell_last_copy(books_db):
+    database.get_book_by_id(1)  # cached with 1 copy available
+    now = datetime.now()
+
+    assert database.borrow_book_transaction("111111", 1, now, now + timedelta(days=14))[0] == "borrowed"
+    # Simulate another process having left a stale entry behind
+    database._book_cache.set(database._book_cache_key(1), {**database._load_book_by_id(1), "available_copies": 1})
+    assert database.borrow_book_transaction("222222", 1, now, now + timedelta(days=14))[0] == "unavailable"
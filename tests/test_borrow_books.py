@@ -37,16 +37,12 @@ def test_borrow_book_book_not_available():
 
 def test_borrow_book_valid_input(mocker):
     """Test borrowing a book with valid input."""
-    mocker.patch("services.library_service.get_db_connection", autospec=True)
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=2)
-    mocker.patch("services.library_service.get_book_by_id", return_value={
-        "book_id": 12, "title": "Test Book", "author": "Test Author", "available_copies": 5
-    })
-    mock_insert = mocker.patch("services.library_service.insert_borrow_record", return_value=True)
-    mock_update = mocker.patch("services.library_service.update_book_availability", return_value=True)
+    mock_txn = mocker.patch("services.library_service.borrow_book_transaction", return_value=(
+        "borrowed", {"id": 12, "title": "Test Book", "author": "Test Author", "available_copies": 5}
+    ))
 
     success, message = borrow_book_by_patron("123456", 12)
     
     assert success == True
     assert "successfully borrowed" in message.lower()
-
+    mock_txn.assert_called_once()
@@ -0,0 +1,91 @@
+# Bulk import - CSV and JSONL, R1 validation per line, duplicates in file and in catalog, batching, API upload
+
+import io
+import pytest
+from flask import Flask
+import database
+from routes.api_routes import api_bp
+from services.bulk_import import import_books, parse_book_row
+
+
+CSV_FEED = """title,author,isbn,total_copies
+Book One,Author A,9780000000001,2
+Book Two,Author B,9780000000002,1
+,Author C,9780000000003,1
+Book Four,Author D,123,1
+Book Five,Author E,9780000000005,zero
+Book One Again,Author A,9780000000001,1
+"""
+
+
+def test_csv_import_reports_each_problem(temp_db):
+    report = import_books(io.StringIO(CSV_FEED), "csv")
+
+    assert report["rows"] == 6
+    assert report["inserted"] == 2
+    assert report["invalid"] == 3
+    assert report["duplicates"] == 1
+    assert [(e["line"], e["error"]) for e in report["errors"]] == [
+        (4, "Title is required."),
+        (5, "ISBN must be exactly 13 digits."),
+        (6, "Total copies must be a positive integer."),
+        (7, "Duplicate ISBN within the import file."),
+    ]
+    assert database.get_book_by_isbn("9780000000002")["available_copies"] == 1
+
+
+def test_jsonl_import_with_existing_isbn(temp_db):
+    database.insert_book("Existing", "Author", "9780000000009", 1, 1)
+    feed = "\n".join([
+        '{"title": "New", "author": "A", "isbn": "9780000000008", "total_copies": 3}',
+        '{"title": "Clash", "author": "B", "isbn": "9780000000009", "total_copies": 1}',
+        'not json',
+    ])
+
+    report = import_books(io.StringIO(feed), "jsonl")
+
+    assert (report["inserted"], report["duplicates"], report["invalid"]) == (1, 1, 1)
+    assert report["errors"][0] == {"line": 2, "isbn": "9780000000009", "error": "A book with this ISBN already exists."}
+    assert database.get_book_by_isbn("9780000000009")["title"] == "Existing"
+
+
+@pytest.mark.parametrize("copies", [2.7, 3.0, True, False, "2.5", "1e3", "", None, "²"])
+def test_total_copies_must_be_a_whole_number(copies):
+    """Floats, booleans and non-digit strings are rejected instead of truncated or coerced."""
+    row = {"title": "T", "author": "A", "isbn": "9780000000001", "total_copies": copies}
+    assert parse_book_row(row) == (None, "Total copies must be a positive integer.")
+
+
+@pytest.mark.parametrize("copies", [3, "3", " 3 "])
+def test_total_copies_accepts_ints_and_digit_strings(copies):
+    """JSON integers and CSV digit strings both parse."""
+    row = {"title": "T", "author": "A", "isbn": "9780000000001", "total_copies": copies}
+    assert parse_book_row(row) == (("T", "A", "9780000000001", 3), None)
+
+
+def test_import_in_small_batches(temp_db):
+    rows = "".join(f"Book {i},Author,{9781000000000 + i},1\n" for i in range(25))
+    report = import_books(io.StringIO("title,author,isbn,total_copies\n" + rows), "csv", batch_size=4)
+
+    assert report["inserted"] == 25
+    assert len(database.get_all_books()) == 25
+    assert report["rows_per_second"] > 0
+
+
+def test_unknown_format_rejected(temp_db):
+    with pytest.raises(ValueError):
+        import_books(io.StringIO(""), "xml")
+
+
+def test_import_api_upload(temp_db):
+    app = Flask(__name__)
+    app.register_blueprint(api_bp)
+    client = app.test_client()
+
+    response = client.post("/api/books/import", data={
+        "file": (io.BytesIO(CSV_FEED.encode("utf-8")), "feed.csv")
+    }, content_type="multipart/form-data")
+
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 2
+    assert client.post("/api/books/import?format=xml", data=b"").status_code == 400
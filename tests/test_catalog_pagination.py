@@ -0,0 +1,88 @@
+# Keyset pagination - walking every page, duplicate titles, page size clamping, bad cursors, /api/books, /catalog links
+
+import os
+import pytest
+from flask import Flask
+import database
+from routes import register_blueprints
+from routes.api_routes import api_bp
+
+
+@pytest.fixture
+def catalog(temp_db):
+    for i in range(23):
+        # Several books share a title so the id tie-breaker is exercised
+        database.insert_book(f"Title {i % 7:02d}", "Author", f"{9780000000000 + i}", 1, 1)
+
+
+def test_pages_cover_catalog_in_order(catalog):
+    seen = []
+    cursor = None
+    while True:
+        books, cursor = database.get_books_page(cursor, limit=5)
+        seen.extend(books)
+        if cursor is None:
+            break
+
+    assert len(seen) == 23
+    assert len({book["id"] for book in seen}) == 23
+    assert [(b["title"], b["id"]) for b in seen] == sorted((b["title"], b["id"]) for b in seen)
+
+
+def test_last_page_has_no_cursor(catalog):
+    books, cursor = database.get_books_page(limit=23)
+    assert len(books) == 23
+    assert cursor is None
+
+
+def test_limit_is_clamped(catalog):
+    books, _ = database.get_books_page(limit=0)
+    assert len(books) == 1
+
+
+def test_invalid_cursor_raises(catalog):
+    with pytest.raises(ValueError):
+        database.get_books_page("not-a-cursor")
+
+
+def test_cursor_round_trip():
+    assert database.decode_cursor(database.encode_cursor("Title ü", 42)) == ("Title ü", 42)
+
+
+def test_keyset_query_uses_index(catalog):
+    conn = database.get_db_connection()
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM books WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT 5", ("a", 1)))
+    conn.close()
+    assert "idx_books_title_id" in plan
+
+
+def test_books_api_returns_cursor(catalog):
+    app = Flask(__name__)
+    app.register_blueprint(api_bp)
+    client = app.test_client()
+
+    first = client.get("/api/books?limit=10").get_json()
+    second = client.get(f"/api/books?limit=10&after={first['next_cursor']}").get_json()
+
+    assert first["count"] == 10
+    assert second["count"] == 10
+    assert not {b["id"] for b in first["books"]} & {b["id"] for b in second["books"]}
+    assert client.get("/api/books?after=bad").status_code == 400
+
+
+def test_catalog_links_carry_the_clamped_limit(catalog):
+    """The pager links on /catalog use the page size that was applied, not the raw query value."""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    database.init_app(app)
+    register_blueprints(app)
+    client = app.test_client()
+
+    page = client.get("/catalog?limit=0").get_data(as_text=True)
+    assert "limit=1" in page
+    assert "limit=0" not in page
+    _, cursor = database.get_books_page(limit=1)
+    page = client.get(f"/catalog?limit=5000&after={cursor}").get_data(as_text=True)
+    assert f"limit={database.CATALOG_MAX_PAGE_SIZE}" in page
+    assert "limit=5000" not in page
@@ -0,0 +1,77 @@
+# Connection pool - reuse of released connections, size limit and timeout, rollback on release, request-scoped reuse
+
+import threading
+import pytest
+from flask import Flask
+import database
+
+
+@pytest.fixture
+def small_pool(temp_db):
+    """A fresh database behind a two-connection pool."""
+    database.configure_pool(size=2, timeout=0.1)
+
+
+def test_released_connection_is_reused(small_pool):
+    conn = database.get_db_connection()
+    conn.close()
+    conn = database.get_db_connection()
+    conn.close()
+
+    stats = database.get_pool_stats()
+    assert stats["hits"] >= 1
+    assert stats["open"] <= 2
+    assert stats["in_use"] == 0
+
+
+def test_pool_exhausted_times_out(small_pool):
+    first = database.get_db_connection()
+    second = database.get_db_connection()
+
+    with pytest.raises(database.PoolTimeout):
+        database.get_db_connection()
+
+    assert database.get_pool_stats()["timeouts"] == 1
+    first.close()
+    second.close()
+
+
+def test_waiting_caller_gets_released_connection(small_pool):
+    database.configure_pool(size=1, timeout=2)
+    held = database.get_db_connection()
+    acquired = []
+
+    def worker():
+        conn = database.get_db_connection()
+        acquired.append(conn.execute("SELECT 1").fetchone()[0])
+        conn.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    held.close()
+    thread.join(timeout=5)
+
+    assert acquired == [1]
+    assert database.get_pool_stats()["in_use"] == 0
+
+
+def test_uncommitted_work_is_rolled_back_on_release(small_pool):
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('T', 'A', '1111111111111', 1, 1)")
+    conn.close()
+
+    assert database.get_book_by_isbn("1111111111111") is None
+
+
+def test_request_scoped_connection_reused_within_app_context(small_pool):
+    app = Flask(__name__)
+    database.init_app(app)
+
+    with app.app_context():
+        first = database.get_db_connection()
+        first.close()
+        second = database.get_db_connection()
+        assert first is second
+        assert database.get_pool_stats()["in_use"] == 1
+
+    assert database.get_pool_stats()["in_use"] == 0
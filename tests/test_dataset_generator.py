@@ -0,0 +1,80 @@
+# Dataset generator - seeded determinism, borrowing invariants, schema parity, size profile
+
+import json
+import sqlite3
+import pytest
+import database
+from benchmarks.generate_dataset import DEFAULT_AS_OF, generate_dataset
+
+
+def generate(tmp_path, name, seed=327):
+    path = str(tmp_path / name)
+    profile = generate_dataset(path, books=300, patrons=40, loans=2000, seed=seed)
+    return path, profile
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    books = conn.execute("SELECT * FROM books ORDER BY id").fetchall()
+    loans = conn.execute("SELECT * FROM borrow_records ORDER BY id").fetchall()
+    conn.close()
+    return books, loans
+
+
+def test_same_seed_produces_same_data(tmp_path):
+    """Two runs with the same seed are row-for-row identical; another seed differs."""
+    first, _ = generate(tmp_path, "a.db")
+    second, _ = generate(tmp_path, "b.db")
+    other, _ = generate(tmp_path, "c.db", seed=1)
+    assert dump(first) == dump(second)
+    assert dump(first) != dump(other)
+
+
+def test_borrowing_invariants_hold(tmp_path):
+    """No patron has more than 5 open loans, available copies match open loans and no return is after as_of."""
+    path, profile = generate(tmp_path, "lib.db")
+    conn = sqlite3.connect(path)
+    assert conn.execute("""
+        SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM borrow_records WHERE return_date IS NULL GROUP BY patron_id)
+    """).fetchone()[0] <= 5
+    assert conn.execute("""
+        SELECT COUNT(*) FROM books b
+        WHERE available_copies != total_copies - (
+            SELECT COUNT(*) FROM borrow_records r WHERE r.book_id = b.id AND r.return_date IS NULL)
+    """).fetchone()[0] == 0
+    open_loans = conn.execute("SELECT COUNT(*) FROM borrow_records WHERE return_date IS NULL").fetchone()[0]
+    assert conn.execute("""
+        SELECT COUNT(*) FROM borrow_records WHERE return_date < borrow_date OR return_date > ?
+    """, (database.to_db_timestamp(DEFAULT_AS_OF),)).fetchone()[0] == 0
+    conn.close()
+    assert open_loans == profile["loan_states"]["open"] + profile["loan_states"]["overdue"]
+
+
+def test_schema_matches_application(tmp_path):
+    """Indexes, FTS triggers and the schema version survive the bulk load."""
+    path, _ = generate(tmp_path, "lib.db")
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+    assert {"idx_borrow_records_patron_return", "idx_books_title_id", "books_fts_ai"} <= names
+    assert conn.execute("PRAGMA user_version").fetchone()[0] >= 3
+    title_word = conn.execute("SELECT title FROM books WHERE id = 1").fetchone()[0].split()[0]
+    assert conn.execute("SELECT COUNT(*) FROM books_fts WHERE books_fts MATCH ?", (title_word,)).fetchone()[0] > 0
+    conn.close()
+
+
+def test_profile_written_next_to_database(tmp_path):
+    """The JSON size profile records the shape, seed and file size."""
+    path, profile = generate(tmp_path, "lib.db")
+    with open(f"{path}.profile.json") as f:
+        saved = json.load(f)
+    assert saved["books"] == 300 and saved["loans"] == 2000
+    assert saved["seed"] == 327
+    assert saved["file_bytes"] > 0
+    assert saved == json.loads(json.dumps(profile))
+
+
+def test_refuses_to_overwrite(tmp_path):
+    """An existing output file is never clobbered."""
+    path, _ = generate(tmp_path, "lib.db")
+    with pytest.raises(FileExistsError):
+        generate_dataset(path, books=1, patrons=1, loans=0)
@@ -0,0 +1,75 @@
+# search_books_in_catalog with the FTS5 index - prefix and multi-word matches, ranking, substring matches, trigger sync
+
+import pytest
+import database
+from services.library_service import count_search_results, search_books_in_catalog
+
+
+@pytest.fixture
+def catalog(temp_db):
+    database.insert_book("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 1, 1)
+    database.insert_book("Great Expectations", "Charles Dickens", "9780141439563", 1, 1)
+    database.insert_book("The Greatest Showman", "Various", "9781111111111", 1, 1)
+    database.insert_book("Moby Dick", "Herman Melville", "9780142437247", 1, 1)
+
+
+def titles(books):
+    return [book["title"] for book in books]
+
+
+def test_fts_index_created(catalog):
+    assert database.fts_enabled()
+
+
+def test_word_prefix_match(catalog):
+    result = search_books_in_catalog("gats", "title")
+    assert titles(result) == ["The Great Gatsby"]
+
+
+def test_all_words_must_match(catalog):
+    result = search_books_in_catalog("great expect", "title")
+    assert titles(result) == ["Great Expectations"]
+
+
+def test_prefix_matches_longer_words(catalog):
+    result = search_books_in_catalog("great", "title")
+    assert set(titles(result)) == {"The Great Gatsby", "Great Expectations", "The Greatest Showman"}
+
+
+def test_author_search_is_case_insensitive(catalog):
+    result = search_books_in_catalog("MELVILLE", "author")
+    assert titles(result) == ["Moby Dick"]
+
+
+def test_substring_falls_back_to_like(catalog):
+    result = search_books_in_catalog("atsb", "title")
+    assert titles(result) == ["The Great Gatsby"]
+
+
+def test_mid_word_matches_are_kept_with_whole_word_ones(catalog):
+    database.insert_book("The Cat", "Anon", "9783333333333", 1, 1)
+    database.insert_book("Concatenation Theory", "Anon", "9784444444444", 1, 1)
+    assert titles(search_books_in_catalog("cat", "title")) == ["The Cat", "Concatenation Theory"]
+    assert count_search_results("cat", "title") == 2
+    assert titles(search_books_in_catalog("ca", "title", sort="title")) == ["Concatenation Theory", "The Cat"]
+
+
+def test_words_need_not_be_adjacent(catalog):
+    assert titles(search_books_in_catalog("gatsby great", "title")) == ["The Great Gatsby"]
+    assert titles(search_books_in_catalog("f scott", "author")) == ["The Great Gatsby"]
+
+
+def test_new_and_renamed_books_are_indexed(catalog):
+    database.insert_book("Gatsby Revisited", "Someone", "9782222222222", 1, 1)
+    assert "Gatsby Revisited" in titles(search_books_in_catalog("gatsby", "title"))
+
+    conn = database.get_db_connection()
+    conn.execute("UPDATE books SET title = 'Renamed' WHERE isbn = '9782222222222'")
+    conn.commit()
+    conn.close()
+    assert "Renamed" not in titles(search_books_in_catalog("gatsby", "title"))
+    assert titles(search_books_in_catalog("renamed", "title")) == ["Renamed"]
+
+
+def test_no_match(catalog):
+    assert search_books_in_catalog("zzzz", "title") == []
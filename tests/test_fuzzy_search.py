@@ -0,0 +1,86 @@
+# Fuzzy search - trigram index, typo tolerance, similarity ranking, threshold and limit, common-trigram path, routes
+
+import os
+import pytest
+from flask import Flask
+import database
+from routes import register_blueprints
+from services import library_service
+from services.library_service import search_books_fuzzy, search_books_in_catalog, trigrams
+
+
+@pytest.fixture
+def catalog(sample_db):
+    database.insert_book("Tender Is the Night", "F. Scott Fitzgerald", "9780684801544", 1, 1)
+    database.insert_book("The Great Gatsby Companion", "Various", "9781111111111", 1, 1)
+    database.configure_book_cache()
+
+
+def titles(books):
+    return [book.title for book in books]
+
+
+def test_trigram_index_created(catalog):
+    """The v7 migration creates the books_trigram index and its vocabulary view."""
+    assert database.trigram_enabled()
+    conn = database.get_db_connection()
+    assert conn.execute("SELECT doc FROM books_trigram_vocab WHERE term = 'fit'").fetchone()[0] == 2
+    conn.close()
+
+
+def test_misspelt_terms_are_found(catalog):
+    """Terms with a dropped, swapped or wrong letter still find the book."""
+    assert search_books_in_catalog("Fitzgerld", "author") == []
+    assert set(titles(search_books_in_catalog("Fitzgerld", "fuzzy"))) == {"The Great Gatsby", "Tender Is the Night"}
+    assert titles(search_books_fuzzy("Mockingbrid"))[0] == "To Kill a Mockingbird"
+    assert titles(search_books_fuzzy("orwel"))[0] == "1984"
+
+
+def test_closest_match_ranks_first(catalog):
+    """A title matching more of the term, at closer length, is ranked higher."""
+    assert titles(search_books_fuzzy("great gatsbi")) == ["The Great Gatsby", "The Great Gatsby Companion"]
+
+
+def test_threshold_and_limit(catalog):
+    """Matches below the threshold are dropped and at most `limit` books are returned."""
+    assert search_books_fuzzy("gatsby fitzgerald tender night", threshold=0.9) == []
+    assert len(search_books_fuzzy("Fitzgerld", limit=1)) == 1
+    assert search_books_fuzzy("xq") == []
+
+
+def test_common_trigrams_use_word_halves(catalog, monkeypatch):
+    """With no trigram rare enough for the ranked lookup, word halves still find the book."""
+    monkeypatch.setattr(library_service, "FUZZY_POSTINGS_BUDGET", 0)
+    assert titles(search_books_fuzzy("Mockingbrid")) == ["To Kill a Mockingbird"]
+
+
+def test_new_books_are_indexed(catalog):
+    """Triggers keep the trigram index in step with inserts."""
+    database.insert_book("Wuthering Heights", "Emily Bronte", "9780141439556", 1, 1)
+    assert titles(search_books_fuzzy("Wutherin Hieghts")) == ["Wuthering Heights"]
+
+
+def test_without_trigram_index_falls_back_to_scan(catalog, monkeypatch):
+    """SQLite builds without the trigram tokenizer still get fuzzy matches."""
+    monkeypatch.setattr(library_service, "trigram_enabled", lambda: False)
+    assert titles(search_books_fuzzy("Mockingbrid")) == ["To Kill a Mockingbird"]
+
+
+def test_padded_trigrams():
+    """Word starts and ends are part of the trigram set."""
+    assert trigrams("Ab Cd") == {"  a", " ab", "ab ", "  c", " cd", "cd "}
+
+
+def test_fuzzy_type_on_routes(catalog):
+    """type=fuzzy works on /api/search and /search, which offers it as an option."""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    database.init_app(app)
+    register_blueprints(app)
+    client = app.test_client()
+
+    data = client.get("/api/search?q=Gatsbi&type=fuzzy").get_json()
+    assert [book["title"] for book in data["results"]] == ["The Great Gatsby", "The Great Gatsby Companion"]
+    page = client.get("/search?q=Fitzgerld&type=fuzzy").get_data(as_text=True)
+    assert "Tender Is the Night" in page
+    assert '<option value="fuzzy" selected>' in page
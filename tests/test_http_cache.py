@@ -0,0 +1,85 @@
+# Conditional requests - catalog version counter, strong ETags, 304 without database work, Last-Modified, flashes bypass
+
+import os
+import pytest
+from flask import Flask
+import database
+import http_cache
+from routes import register_blueprints
+from services.library_service import borrow_book_by_patron
+
+
+@pytest.fixture
+def client(sample_db):
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    database.init_app(app)
+    http_cache.init_app(app)
+    register_blueprints(app)
+    return app.test_client()
+
+
+def test_writes_to_books_bump_the_version(client):
+    """insert_book, availability updates and borrow transactions all move the version on."""
+    version, _ = database.get_catalog_version()
+    database.insert_book("New", "Author", "9780000000001", 1, 1)
+    database.update_book_availability(1, -1)
+    assert borrow_book_by_patron("222222", 2)[0]
+    assert database.get_catalog_version()[0] == version + 3
+
+
+@pytest.mark.parametrize("url", ["/catalog", "/search?q=gatsby&type=title", "/api/search?q=gatsby&type=title"])
+def test_matching_etag_gets_304_without_running_the_view(client, monkeypatch, url):
+    """A client presenting the current ETag gets an empty 304 and the view never runs."""
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    fail = lambda *args: pytest.fail("database queried")
+    monkeypatch.setattr("routes.catalog_routes.get_books_page", fail)
+    monkeypatch.setattr("routes.search_routes.search_catalog_page", fail)
+    monkeypatch.setattr("routes.api_routes.search_catalog_page", fail)
+    response = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == first.headers["ETag"]
+
+
+def test_catalog_change_invalidates_etag(client):
+    """After a write to books the old ETag no longer matches."""
+    etag = client.get("/catalog").headers["ETag"]
+    database.insert_book("New", "Author", "9780000000001", 1, 1)
+
+    response = client.get("/catalog", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert b"New" in response.data
+
+
+def test_etag_depends_on_url(client):
+    """Different pages or queries at the same version have different ETags."""
+    etags = {client.get(url).headers["ETag"] for url in ("/catalog", "/catalog?limit=1", "/api/search?q=1984")}
+    assert len(etags) == 3
+
+
+def test_last_modified_fallback(client):
+    """Without If-None-Match, If-Modified-Since at or after the last write gets a 304."""
+    conn = database.get_db_connection()
+    conn.execute("UPDATE catalog_version SET updated_at = updated_at - 60")
+    conn.commit()
+    conn.close()
+
+    first = client.get("/catalog")
+    response = client.get("/catalog", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+
+def test_pending_flash_is_always_rendered(client):
+    """A flash message queued by a redirect is shown rather than answered with 304."""
+    etag = client.get("/catalog").headers["ETag"]
+    with client.session_transaction() as session:
+        session["_flashes"] = [("error", "Patron has reached the maximum borrowing limit.")]
+
+    response = client.get("/catalog", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"maximum borrowing limit" in response.data
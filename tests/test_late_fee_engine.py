@@ -0,0 +1,57 @@
+# Batch late fee engine - parity with the scalar fee, overdue-only loading, patron filter, per-patron totals
+
+import random
+from datetime import datetime, timedelta
+import pytest
+import database
+from services.library_service import compute_late_fee
+from services.late_fee_engine import compute_late_fees, calculate_late_fees_batch, calculate_late_fee_totals
+
+
+def test_matches_scalar_fee():
+    rng = random.Random(7)
+    now = datetime.now()
+    due_dates = [now + timedelta(seconds=rng.randint(-45 * 86400, 10 * 86400)) for _ in range(5000)]
+    # Exact tier boundaries
+    due_dates += [now - timedelta(days=d) for d in (0, 1, 7, 8, 18, 19, 100)]
+
+    fees, days = compute_late_fees(due_dates, now)
+
+    expected = [compute_late_fee(due, now) for due in due_dates]
+    assert list(zip(fees.tolist(), days.tolist())) == expected
+
+
+def test_accepts_iso_strings():
+    now = datetime(2025, 1, 20, 12, 0)
+    fees, days = compute_late_fees(["2025-01-10T12:00:00", "2025-01-25T00:00:00"], now)
+    assert fees.tolist() == [6.5, 0.0]
+    assert days.tolist() == [10, 0]
+
+
+@pytest.fixture
+def loans_db(temp_db):
+    database.insert_book("Book", "Author", "9780000000001", 10, 10)
+    now = datetime(2025, 3, 1, 12, 0)
+    database.insert_borrow_record("111111", 1, now - timedelta(days=24), now - timedelta(days=10))
+    database.insert_borrow_record("111111", 1, now - timedelta(days=16), now - timedelta(days=2))
+    database.insert_borrow_record("222222", 1, now - timedelta(days=44), now - timedelta(days=30))
+    database.insert_borrow_record("333333", 1, now - timedelta(days=1), now + timedelta(days=13))
+    return now
+
+
+def test_batch_only_returns_overdue_loans(loans_db):
+    results = calculate_late_fees_batch(now=loans_db)
+
+    assert sorted((r["patron_id"], r["fee_amount"]) for r in results) == [
+        ("111111", 1.0), ("111111", 6.5), ("222222", 15.0)
+    ]
+
+
+def test_batch_patron_filter(loans_db):
+    results = calculate_late_fees_batch(["222222", "333333"], now=loans_db)
+    assert [(r["patron_id"], r["days_overdue"]) for r in results] == [("222222", 30)]
+
+
+def test_totals_per_patron(loans_db):
+    assert calculate_late_fee_totals(now=loans_db) == {"111111": 7.5, "222222": 15.0}
+    assert calculate_late_fee_totals(["333333"], now=loans_db) == {}
@@ -39,7 +39,7 @@ def test_catalog_display_with_books(monkeypatch, client):
         captured["kwargs"] = kwargs
         return "OK"
 
-    monkeypatch.setattr(catalog_module, "get_all_books", lambda: fake_books)
+    monkeypatch.setattr(catalog_module, "get_books_page", lambda after, limit: (fake_books, None))
     monkeypatch.setattr(catalog_module, "render_template", fake_render)
 
     response = client.get("/catalog")
@@ -58,7 +58,7 @@ def test_catalog_display_empty_list(monkeypatch, client):
         captured["kwargs"] = kwargs
         return "OK"
 
-    monkeypatch.setattr(catalog_module, "get_all_books", lambda: [])
+    monkeypatch.setattr(catalog_module, "get_books_page", lambda after, limit: ([], None))
     monkeypatch.setattr(catalog_module, "render_template", fake_render)
 
     response = client.get("/catalog")
@@ -80,7 +80,7 @@ def test_catalog_book_with_zero_available(monkeypatch, client):
         captured["kwargs"] = kwargs
         return "OK"
 
-    monkeypatch.setattr(catalog_module, "get_all_books", lambda: fake_books)
+    monkeypatch.setattr(catalog_module, "get_books_page", lambda after, limit: (fake_books, None))
     monkeypatch.setattr(catalog_module, "render_template", fake_render)
 
     response = client.get("/catalog")
@@ -88,11 +88,45 @@ def test_catalog_book_with_zero_available(monkeypatch, client):
     assert captured["kwargs"]["books"] == fake_books
 
 
+def test_catalog_passes_cursor_and_limit(monkeypatch, client):
+    """⚙️ Cursor and page size are forwarded and the next cursor reaches the template."""
+    calls = []
+    captured = {}
+
+    def fake_page(after, limit):
+        calls.append((after, limit))
+        return [{"id": 3, "title": "Book C"}], "next123"
+
+    def fake_render(template, **kwargs):
+        captured.update(kwargs)
+        return "OK"
+
+    monkeypatch.setattr(catalog_module, "get_books_page", fake_page)
+    monkeypatch.setattr(catalog_module, "render_template", fake_render)
+
+    response = client.get("/catalog?after=abc&limit=10")
+    assert response.status_code == 200
+    assert calls == [("abc", 10)]
+    assert captured["next_cursor"] == "next123"
+    assert captured["is_first_page"] is False
+
+
 # --- ERROR CASES ---
 
+def test_catalog_invalid_cursor(monkeypatch, client):
+    """❌ Malformed cursor returns 400."""
+    def bad_cursor(after, limit):
+        raise ValueError("Invalid cursor.")
+
+    monkeypatch.setattr(catalog_module, "get_books_page", bad_cursor)
+
+    response = client.get("/catalog?after=garbage")
+    assert response.status_code == 400
+
+
 def test_catalog_db_failure(monkeypatch, client):
     """❌ Database failure should return 500."""
-    monkeypatch.setattr(catalog_module, "get_all_books", lambda: (_ for _ in ()).throw(Exception("DB fail")))
+    monkeypatch.setattr(catalog_module, "get_books_page", lambda after, limit: (_ for _ in ()).throw(Exception("DB fail")))
     monkeypatch.setattr(catalog_module, "render_template", lambda template, **kwargs: "OK")
 
     response = client.get("/catalog")
@@ -102,7 +136,7 @@ def test_catalog_db_failure(monkeypatch, client):
 
 def test_catalog_template_render_failure(monkeypatch, client):
     """❌ Template rendering failure should return 500."""
-    monkeypatch.setattr(catalog_module, "get_all_books", lambda: [{"id": 1, "title": "Book X"}])
+    monkeypatch.setattr(catalog_module, "get_books_page", lambda after, limit: ([{"id": 1, "title": "Book X"}], None))
     monkeypatch.setattr(catalog_module, "render_template", lambda *a, **kw: (_ for _ in ()).throw(Exception("Render fail")))
 
     response = client.get("/catalog")
@@ -1,17 +1,15 @@
 import pytest
 from datetime import datetime, timedelta
-from services.library_service import borrow_book_by_patron, get_book_by_id, get_patron_borrow_count
-from database import get_db_connection, get_patron_borrowed_books, update_book_availability, insert_borrow_record
+import database
+from services.library_service import borrow_book_by_patron
 
 
 # --- NORMAL CASES ---
 
 def test_borrow_book_success(monkeypatch):
     """✅ Normal case: Patron successfully borrows an available book."""
-    monkeypatch.setattr("services.library_service.get_book_by_id", lambda book_id: {"title": "Clean Code", "available_copies": 3})
-    monkeypatch.setattr("services.library_service.get_patron_borrow_count", lambda patron_id: 2)
-    monkeypatch.setattr("database.insert_borrow_record", lambda *args: True)
-    monkeypatch.setattr("database.update_book_availability", lambda *args: True)
+    monkeypatch.setattr("services.library_service.borrow_book_transaction",
+                        lambda *args, **kwargs: ("borrowed", {"title": "Clean Code", "available_copies": 3}))
 
     success, message = borrow_book_by_patron("123456", 1)
     assert success is True
@@ -19,28 +17,59 @@ def test_borrow_book_success(monkeypatch):
     assert "Due date" in message
 
 
+def test_borrow_book_due_date_is_14_days(monkeypatch):
+    """✅ Normal case: Borrow record is created with a 14-day loan period."""
+    captured = {}
+
+    def fake_txn(patron_id, book_id, borrow_date, due_date, max_borrowed=5):
+        captured.update(patron_id=patron_id, book_id=book_id, borrow_date=borrow_date,
+                        due_date=due_date, max_borrowed=max_borrowed)
+        return "borrowed", {"title": "Clean Code", "available_copies": 3}
+
+    monkeypatch.setattr("services.library_service.borrow_book_transaction", fake_txn)
+
+    success, message = borrow_book_by_patron("123456", 1)
+    assert success is True
+    assert captured["due_date"] - captured["borrow_date"] == timedelta(days=14)
+    assert captured["max_borrowed"] == 5
+
+
 # --- EDGE CASES ---
 
 def test_borrow_book_patron_at_limit(monkeypatch):
     """⚙️ Edge case: Patron has already borrowed 5 books (max limit)."""
-    monkeypatch.setattr("services.library_service.get_book_by_id", lambda book_id: {"title": "Book A", "available_copies": 2})
-    monkeypatch.setattr("services.library_service.get_patron_borrow_count", lambda patron_id: 5)
+    monkeypatch.setattr("services.library_service.borrow_book_transaction",
+                        lambda *args, **kwargs: ("limit_reached", {"title": "Book A", "available_copies": 2}))
 
     success, message = borrow_book_by_patron("654321", 2)
     assert success is False
     assert "maximum borrowing limit" in message
 
 
-def test_borrow_book_exactly_one_copy_left(monkeypatch):
+def test_borrow_book_exactly_one_copy_left(temp_db):
     """⚙️ Edge case: Book has exactly 1 available copy."""
-    monkeypatch.setattr("services.library_service.get_book_by_id", lambda book_id: {"title": "Book B", "available_copies": 1})
-    monkeypatch.setattr("services.library_service.get_patron_borrow_count", lambda patron_id: 0)
-    monkeypatch.setattr("database.insert_borrow_record", lambda *args: True)
-    monkeypatch.setattr("database.update_book_availability", lambda *args: True)
+    database.insert_book("Book B", "Author B", "9780000000003", 1, 1)
+    book_id = database.get_book_by_isbn("9780000000003")["id"]
 
-    success, message = borrow_book_by_patron("111111", 3)
+    success, message = borrow_book_by_patron("111111", book_id)
     assert success is True
     assert "Successfully borrowed" in message
+    assert database.get_book_by_id(book_id)["available_copies"] == 0
+
+    success, message = borrow_book_by_patron("222222", book_id)
+    assert success is False
+    assert "not available" in message
+    assert database.get_book_by_id(book_id)["available_copies"] == 0
+
+
+def test_borrow_book_not_found(monkeypatch):
+    """⚙️ Edge case: Book does not exist."""
+    monkeypatch.setattr("services.library_service.borrow_book_transaction",
+                        lambda *args, **kwargs: ("not_found", None))
+
+    success, message = borrow_book_by_patron("111111", 3)
+    assert success is False
+    assert "Book not found" in message
 
 
 # --- INVALID CASES ---
@@ -54,7 +83,8 @@ def test_borrow_book_invalid_patron_id(monkeypatch):
 
 def test_borrow_book_not_available(monkeypatch):
     """❌ Invalid case: Book exists but has no available copies."""
-    monkeypatch.setattr("services.library_service.get_book_by_id", lambda book_id: {"title": "Unavailable Book", "available_copies": 0})
+    monkeypatch.setattr("services.library_service.borrow_book_transaction",
+                        lambda *args, **kwargs: ("unavailable", {"title": "Unavailable Book", "available_copies": 0}))
 
     success, message = borrow_book_by_patron("123456", 4)
     assert success is False
@@ -63,11 +93,9 @@ def test_borrow_book_not_available(monkeypatch):
 
 def test_borrow_book_database_failure(monkeypatch):
     """❌ Invalid case: Database error during record creation or update."""
-    monkeypatch.setattr("services.library_service.get_book_by_id", lambda book_id: {"title": "Book X", "available_copies": 2})
-    monkeypatch.setattr("services.library_service.get_patron_borrow_count", lambda patron_id: 1)
-    monkeypatch.setattr("services.library_service.insert_borrow_record", lambda *args: False)  # Fail DB insert
-    monkeypatch.setattr("services.library_service.update_book_availability", lambda *args: True)
+    monkeypatch.setattr("services.library_service.borrow_book_transaction",
+                        lambda *args, **kwargs: ("error", None))
 
     success, message = borrow_book_by_patron("999999", 5)
     assert success is False
-    assert "Database error" in message
\ No newline at end of file
+    assert "Database error" in message
@@ -1,101 +1,94 @@
 import pytest
 from datetime import datetime, timedelta
-from services.library_service import get_patron_status_report 
-from database import get_db_connection, get_all_books, get_patron_borrow_count, get_patron_borrowed_books
+from services.library_service import get_patron_status_report
+
+
+def loan_row(book_id, title, borrowed_days_ago, due_in_days, returned=False, position=1, total=1):
+    """Build a row shaped like the report query's result."""
+    borrow_date = datetime.now() - timedelta(days=borrowed_days_ago)
+    due_date = datetime.now() + timedelta(days=due_in_days, minutes=1)
+    return {
+        "id": position, "patron_id": "123456", "book_id": book_id,
+        "borrow_date": borrow_date.isoformat(), "due_date": due_date.isoformat(),
+        "return_date": datetime.now().isoformat() if returned else None,
+        "title": title, "author": f"Author {title[-1]}",
+        "history_position": position, "history_total": total,
+    }
+
 
-# --- MOCK FIXTURES ---
 @pytest.fixture
-def mock_functions(monkeypatch):
-    """Patch DB and helper functions for patron status report tests."""
-    # Default: empty patron
-    monkeypatch.setattr("database.get_patron_borrowed_books", lambda pid: [])
-    monkeypatch.setattr("database.get_patron_borrow_count", lambda pid: 0)
-    
-    class MockConn:
-        def execute(self, query, params):
-            return []
-        def close(self): pass
-    
-    monkeypatch.setattr("database.get_db_connection", lambda: MockConn())
-    monkeypatch.setattr("services.library_service.calculate_late_fee_for_book", lambda pid, bid: {"fee_amount": 0})
-    return monkeypatch
+def mock_rows(mocker):
+    """Patch the report's connection so the single query returns the given rows."""
+    def _mock(rows):
+        # Every row carries the patron's open_loans counter, as the query's CTE does
+        open_loans = sum(row["return_date"] is None for row in rows)
+        rows = [dict(row, open_loans=open_loans) for row in rows]
+
+        class MockCursor:
+            def fetchall(self):
+                return rows
+
+        class MockConn:
+            def __init__(self):
+                self.queries = []
+
+            def execute(self, query, params=None):
+                self.queries.append(query)
+                return MockCursor()
+
+            def close(self):
+                pass
+
+        conn = MockConn()
+        mocker.patch("services.library_service.get_db_connection", return_value=conn)
+        return conn
+    return _mock
 
 
 # --- NORMAL CASES ---
 
-def test_patron_with_current_books(mocker):
-    borrowed_books = [
-        {"book_id": 1, "title": "Book A", "author": "Author A", "due_date": datetime.now() - timedelta(days=2)},
-        {"book_id": 2, "title": "Book B", "author": "Author B", "due_date": datetime.now() + timedelta(days=5)},
-    ]
-
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=borrowed_books)
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=2)
-    mocker.patch(
-        "services.library_service.calculate_late_fee_for_book",
-        side_effect=lambda pid, bid: {"fee_amount": 1.0 if bid == 1 else 0.0}
-    )
-
-    class MockCursor:
-        def fetchall(self):
-            return []
-    class MockConn:
-        def execute(self, query, params=None):
-            return MockCursor()
-        def close(self):
-            pass
-    mocker.patch("services.library_service.get_db_connection", return_value=MockConn())
+def test_patron_with_current_books(mock_rows):
+    conn = mock_rows([
+        loan_row(1, "Book A", 16, -2, position=1, total=2),
+        loan_row(2, "Book B", 9, 5, position=2, total=2),
+    ])
 
     report = get_patron_status_report("123456")
     assert report["status"] == "Success"
     assert len(report["borrowed_books"]) == 2
     assert report["total_late_fees"] == 1.0
     assert report["total_books_borrowed"] == 2
+    assert report["borrowed_books"][0]["is_overdue"] is True
+    assert len(conn.queries) == 1
 
 
-# --- EDGE CASES ---
+def test_report_does_not_recompute_fees_per_book(mock_rows, mocker):
+    mock_rows([loan_row(1, "Book A", 16, -2)])
+    fee_mock = mocker.patch("services.library_service.calculate_late_fee_for_book")
+    borrowed_mock = mocker.patch("services.library_service.get_patron_borrowed_books")
 
-def test_patron_no_current_books_but_has_history(mocker):
-    """Edge case: Patron has no current books but has borrowing history."""
-    history_records = [
-        {"book_id": 3, "title": "Book C", "author": "Author C", "borrow_date": "2025-01-01T00:00:00"}
-    ]
+    get_patron_status_report("123456")
+    fee_mock.assert_not_called()
+    borrowed_mock.assert_not_called()
 
-    class MockCursor:
-        def fetchall(self):
-            return history_records
 
-    class MockConn:
-        def execute(self, query, params=None):
-            return MockCursor()
-        def close(self):
-            pass
+# --- EDGE CASES ---
 
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=[])
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
-    mocker.patch("services.library_service.get_db_connection", return_value=MockConn())
+def test_patron_no_current_books_but_has_history(mock_rows):
+    """Edge case: Patron has no current books but has borrowing history."""
+    mock_rows([loan_row(3, "Book C", 30, -16, returned=True)])
 
     report = get_patron_status_report("222222")
     assert report["status"] == "Success"
     assert report["borrowed_books"] == []
-    assert report["borrowing_history"] == history_records
+    assert [r["book_id"] for r in report["borrowing_history"]] == [3]
+    assert "history_position" not in report["borrowing_history"][0]
+    assert report["history_total"] == 1
 
 
-def test_patron_not_found(mocker):
+def test_patron_not_found(mock_rows):
     """Edge case: Patron not found (no borrowed books, no history)."""
-    class MockCursor:
-        def fetchall(self):
-            return []
-
-    class MockConn:
-        def execute(self, query, params=None):
-            return MockCursor()
-        def close(self):
-            pass
-
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=[])
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
-    mocker.patch("services.library_service.get_db_connection", return_value=MockConn())
+    mock_rows([])
 
     report = get_patron_status_report("999999")
     assert report["status"] == "Patron not found"
@@ -105,26 +98,9 @@ def test_patron_not_found(mocker):
     assert report["total_late_fees"] == 0.0
 
 
-def test_patron_all_books_returned_late_fee(mocker):
-    """Edge case: Patron has no current books but late fees calculated from borrowed books."""
-    history_records = [
-        {"book_id": 1, "title": "Book D", "author": "Author D", "borrow_date": "2025-01-01T00:00:00"}
-    ]
-
-    class MockCursor:
-        def fetchall(self):
-            return history_records
-
-    class MockConn:
-        def execute(self, query, params=None):
-            return MockCursor()
-        def close(self):
-            pass
-
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=[])
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
-    mocker.patch("services.library_service.calculate_late_fee_for_book", side_effect=lambda pid, bid: {"fee_amount": 5.0})
-    mocker.patch("services.library_service.get_db_connection", return_value=MockConn())
+def test_patron_all_books_returned_late_fee(mock_rows):
+    """Edge case: Returned books don't count towards late fees owed."""
+    mock_rows([loan_row(1, "Book D", 60, -46, returned=True)])
 
     report = get_patron_status_report("333333")
     assert report["status"] == "Success"
@@ -133,21 +109,22 @@ def test_patron_all_books_returned_late_fee(mocker):
     assert len(report["borrowing_history"]) == 1
 
 
-def test_patron_invalid_id_format(mocker):
-    """Invalid case: Patron ID is incorrectly formatted (non-digit)."""
-    class MockCursor:
-        def fetchall(self):
-            return []
+def test_history_page_keeps_current_loans(mock_rows):
+    """Edge case: A current loan outside the history page is still reported as borrowed."""
+    mock_rows([
+        loan_row(1, "Book A", 20, -6, position=1, total=3),
+        loan_row(3, "Book C", 5, -1, returned=True, position=3, total=3),
+    ])
 
-    class MockConn:
-        def execute(self, query, params=None):
-            return MockCursor()
-        def close(self):
-            pass
+    report = get_patron_status_report("123456", history_limit=1, history_offset=2)
+    assert [b["book_id"] for b in report["borrowed_books"]] == [1]
+    assert [r["book_id"] for r in report["borrowing_history"]] == [3]
+    assert report["history_total"] == 3
 
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=[])
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
-    mocker.patch("services.library_service.get_db_connection", return_value=MockConn())
+
+def test_patron_invalid_id_format(mock_rows):
+    """Invalid case: Patron ID is incorrectly formatted (non-digit)."""
+    mock_rows([])
 
     report = get_patron_status_report("abc123")
     assert report["status"] in ["Success", "Patron not found"]
@@ -159,10 +136,7 @@ def test_patron_db_error(mocker):
         raise Exception("DB error")
 
     mocker.patch("services.library_service.get_db_connection", side_effect=mock_conn_fail)
-    mocker.patch("services.library_service.get_patron_borrowed_books", return_value=[])
-    mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
 
-    import pytest
     with pytest.raises(Exception) as exc:
         get_patron_status_report("123456")
-    assert "DB error" in str(exc.value)
\ No newline at end of file
+    assert "DB error" in str(exc.value)
@@ -0,0 +1,79 @@
+# Request metrics - per-endpoint counters and latency histograms, in-flight gauge, Prometheus /metrics output
+
+import pytest
+from flask import Flask
+import database
+import metrics
+from metrics import Histogram, MetricsRegistry
+from routes import register_blueprints
+
+
+@pytest.fixture
+def client(sample_db):
+    app = Flask(__name__, root_path="..")
+    app.secret_key = "test"
+    database.init_app(app)
+    metrics.init_app(app)
+    register_blueprints(app)
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return app.test_client()
+
+
+def test_histogram_buckets_are_cumulative():
+    """Each bucket counts observations at or below its bound; +Inf counts all."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_requests_are_counted_per_endpoint_and_status(client):
+    """Status counters and latency histograms are keyed by Flask endpoint name."""
+    client.get("/api/books")
+    client.get("/api/books")
+    client.get("/api/search")  # 400: no search term
+    client.get("/no-such-page")
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'library_http_requests_total{endpoint="api.list_books_api",method="GET",status="200"} 2' in body
+    assert 'library_http_requests_total{endpoint="api.search_books_api",method="GET",status="400"} 1' in body
+    assert 'library_http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in body
+    assert 'library_http_request_duration_seconds_count{endpoint="api.list_books_api"} 2' in body
+    assert 'library_http_request_duration_seconds_bucket{endpoint="api.list_books_api",le="+Inf"} 2' in body
+
+
+def test_errors_are_recorded_and_in_flight_returns_to_zero(client):
+    """A view that raises counts as a 500 and doesn't leak an in-flight request."""
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    assert client.get("/boom").status_code == 500
+
+    registry = client.application.extensions["metrics"]
+    snapshot = registry.snapshot()
+    assert snapshot["requests"][("boom", "GET", "500")] == 1
+    assert snapshot["in_flight"]["boom"] == 0
+
+
+def test_metrics_endpoint_is_prometheus_text(client):
+    """The scrape is text/plain with HELP/TYPE lines and database gauges."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert "# TYPE library_http_request_duration_seconds histogram" in body
+    assert "# TYPE library_http_requests_in_flight gauge" in body
+    assert 'library_db_pool_connections{state="open"}' in body
+    assert 'library_db_transactions_total{outcome="commits"}' in body
+
+
+def test_label_values_are_escaped():
+    """Quotes and backslashes in labels can't break the exposition format."""
+    registry = MetricsRegistry()
+    registry.request_started('a"b\\c')
+    registry.request_finished('a"b\\c', "GET", 200, 0.01)
+    assert 'endpoint="a\\"b\\\\c"' in registry.render()
@@ -0,0 +1,144 @@
+# Patron counters - trigger-maintained open loans, counter-based limit check, set-based reconciliation, migration backfill
+
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+import database
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, compute_late_fee, get_patron_status_report
+)
+from services.reconcile_patrons import main as reconcile_main
+
+
+def test_borrow_and_return_maintain_open_loans(sample_db):
+    """Every borrow and return updates the patron's open loan counter in the same transaction."""
+    assert database.get_patron_borrow_count("222222") == 0
+    assert borrow_book_by_patron("222222", 1)[0]
+    assert borrow_book_by_patron("222222", 2)[0]
+    assert database.get_patron_counters("222222")["open_loans"] == 2
+
+    assert return_book_by_patron("222222", 1)[0]
+    assert database.get_patron_borrow_count("222222") == 1
+
+
+def test_limit_check_reads_the_counter(sample_db):
+    """The borrowing limit is enforced from patrons.open_loans, not by counting loans."""
+    conn = database.get_db_connection()
+    conn.execute("INSERT INTO patrons (patron_id, open_loans) VALUES ('333333', 5)")
+    conn.commit()
+    conn.close()
+    success, message = borrow_book_by_patron("333333", 1)
+    assert not success
+    assert "maximum borrowing limit" in message
+
+
+def test_return_refreshes_overdue_and_fees(sample_db):
+    """Returning a book recomputes the patron's overdue count and fee balance."""
+    now = datetime.now()
+    for book_id, days_late in ((1, 3), (2, 10)):
+        database.insert_borrow_record("444444", book_id, now - timedelta(days=14 + days_late, hours=1),
+                                      now - timedelta(days=days_late, hours=1))
+    assert return_book_by_patron("444444", 1)[0]
+
+    counters = database.get_patron_counters("444444")
+    expected_fee, _ = compute_late_fee(now - timedelta(days=10, hours=1), now)
+    assert counters["open_loans"] == 1
+    assert counters["overdue_loans"] == 1
+    assert counters["fee_balance"] == pytest.approx(expected_fee)
+
+
+def test_reconcile_repairs_drift_and_matches_fee_rules(sample_db):
+    """Reconciliation rebuilds every counter with the same fee rules as compute_late_fee."""
+    now = datetime(2025, 3, 1, 12, 0, 0)
+    cases = [("555555", 1, 1), ("555555", 2, 7), ("666666", 1, 8), ("666666", 2, 40)]
+    for patron_id, book_id, days_late in cases:
+        due = now - timedelta(days=days_late, minutes=30)
+        database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+
+    conn = database.get_db_connection()
+    conn.execute("UPDATE patrons SET open_loans = 99 WHERE patron_id = '555555'")
+    conn.commit()
+    conn.close()
+
+    result = database.reconcile_patron_counters(now)
+    assert result["drifted"] == 1
+    for patron_id in ("555555", "666666"):
+        expected = sum(compute_late_fee(now - timedelta(days=d, minutes=30), now)[0]
+                       for p, _, d in cases if p == patron_id)
+        counters = database.get_patron_counters(patron_id)
+        assert counters["open_loans"] == 2
+        assert counters["overdue_loans"] == 2
+        assert counters["fee_balance"] == pytest.approx(expected)
+        assert counters["counters_as_of"] == now
+
+
+def test_fee_matches_compute_late_fee_at_day_boundaries(sample_db):
+    """SQL rounding of days overdue agrees with compute_late_fee one second either side of whole days."""
+    now = datetime(2025, 3, 1, 12, 0, 0)
+    for days in (0, 1, 7, 8, 18, 19):
+        for offset in (-1, 0, 1):
+            due = now - timedelta(days=days, seconds=offset)
+            conn = database.get_db_connection()
+            conn.execute("DELETE FROM borrow_records")
+            conn.commit()
+            conn.close()
+            database.insert_borrow_record("777777", 1, due - timedelta(days=14), due)
+            database.reconcile_patron_counters(now)
+            expected_fee, days_overdue = compute_late_fee(due, now)
+            counters = database.get_patron_counters("777777")
+            assert counters["fee_balance"] == pytest.approx(expected_fee), (days, offset)
+            assert counters["overdue_loans"] == (days_overdue > 0), (days, offset)
+
+
+def test_status_report_matches_counters(sample_db):
+    """The report's loan count is the counter, and its clock-dependent values match refreshed counters."""
+    def check(open_loans, overdue_loans):
+        report = get_patron_status_report("888888")
+        counters = database.get_patron_counters("888888")
+        assert report["total_books_borrowed"] == counters["open_loans"] == open_loans
+        assert report["overdue_loans"] == counters["overdue_loans"] == overdue_loans
+        assert report["total_late_fees"] == pytest.approx(counters["fee_balance"])
+        return report
+
+    assert borrow_book_by_patron("888888", 1)[0]
+    check(open_loans=1, overdue_loans=0)
+
+    # Twenty days pass (minus an hour, to stay clear of a whole-day boundary)
+    shift = int(timedelta(days=20, hours=-1).total_seconds())
+    conn = database.get_db_connection()
+    conn.execute("UPDATE borrow_records SET borrow_date = borrow_date - ?, due_date = due_date - ? "
+                 "WHERE patron_id = 888888", (shift, shift))
+    conn.commit()
+    conn.close()
+    database.reconcile_patron_counters()
+    report = check(open_loans=1, overdue_loans=1)
+    assert report["total_late_fees"] == 3.0
+
+    assert return_book_by_patron("888888", 1)[0]
+    check(open_loans=0, overdue_loans=0)
+
+
+def test_reconcile_command(sample_db, capsys):
+    """The command-line entry point reports patrons written and drift found."""
+    reconcile_main([])
+    assert "drifted: 0" in capsys.readouterr().out
+
+
+def test_migration_backfills_existing_loans(db_path):
+    """Upgrading a database without the patrons table derives counters from its loans."""
+    database.init_database()
+    database.add_sample_data()
+    database.configure_pool()
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        DROP TRIGGER borrow_records_patrons_ai;
+        DROP TRIGGER borrow_records_patrons_au;
+        DROP TRIGGER borrow_records_patrons_ad;
+        DROP TABLE patrons;
+        PRAGMA user_version = 3;
+    """)
+    conn.close()
+
+    database.init_database()
+    assert database.get_patron_counters("123456")["open_loans"] == 1
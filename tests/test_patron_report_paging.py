@@ -0,0 +1,51 @@
+# get_patron_status_report against a real database - counts, fees, history paging
+
+from datetime import datetime, timedelta
+import pytest
+import database
+from services.library_service import get_patron_status_report
+
+
+@pytest.fixture
+def patron_db(temp_db):
+    for i in range(6):
+        database.insert_book(f"Book {i}", "Author", f"{9780000000000 + i}", 2, 2)
+    now = datetime.now()
+    # Five returned loans, then two open ones (one 10 days overdue)
+    for i in range(5):
+        database.insert_borrow_record("123456", i + 1, now - timedelta(days=60 - i), now - timedelta(days=46 - i))
+        database.update_borrow_record_return_date("123456", i + 1, now - timedelta(days=50 - i))
+    database.insert_borrow_record("123456", 6, now - timedelta(days=24), now - timedelta(days=10, hours=-1))
+    database.insert_borrow_record("123456", 1, now - timedelta(days=1), now + timedelta(days=13))
+
+
+def test_full_report(patron_db):
+    report = get_patron_status_report("123456")
+
+    assert report["status"] == "Success"
+    assert report["total_books_borrowed"] == 2
+    assert report["total_late_fees"] == 6.5
+    assert report["history_total"] == 7
+    assert len(report["borrowing_history"]) == 7
+
+
+def test_history_pages(patron_db):
+    first = get_patron_status_report("123456", history_limit=3)
+    second = get_patron_status_report("123456", history_limit=3, history_offset=3)
+
+    assert [r["book_id"] for r in first["borrowing_history"]] == [1, 2, 3]
+    assert [r["book_id"] for r in second["borrowing_history"]] == [4, 5, 6]
+    assert first["total_books_borrowed"] == second["total_books_borrowed"] == 2
+    assert first["total_late_fees"] == 6.5
+
+
+def test_page_past_the_end(patron_db):
+    database.update_borrow_record_return_date("123456", 6, datetime.now())
+    database.update_borrow_record_return_date("123456", 1, datetime.now())
+    report = get_patron_status_report("123456", history_limit=3, history_offset=9)
+
+    assert report["status"] == "Success"
+    assert report["borrowing_history"] == []
+    assert report["history_total"] == 7
+    assert report["total_books_borrowed"] == 0
+    assert get_patron_status_report("654321", history_limit=3)["status"] == "Patron not found"
@@ -0,0 +1,112 @@
+# Payment queue - immediate job ID, concurrent gateway calls, declines and network errors, polling API
+
+import time
+import pytest
+from flask import Flask
+from services.payment_service import FakePaymentGateway
+from services.payment_queue import PaymentQueue, configure_payment_queue, get_payment_queue
+from routes.api_routes import api_bp
+
+
+@pytest.fixture
+def owed_fee(mocker):
+    mocker.patch("services.library_service.calculate_late_fee_for_book", return_value={"fee_amount": 3.50})
+    mocker.patch("services.library_service.get_book_by_id", return_value={"title": "The Great Gatsby"})
+
+
+def test_submit_returns_before_gateway_finishes(owed_fee):
+    queue = PaymentQueue(max_workers=2, gateway=FakePaymentGateway(latency=0.2))
+
+    started = time.perf_counter()
+    job_id = queue.submit("123456", 1)
+    assert time.perf_counter() - started < 0.1
+    assert queue.get(job_id)["status"] in ("pending", "running")
+
+    job = queue.wait(job_id, timeout=5)
+    assert job["status"] == "succeeded"
+    assert job["transaction_id"].startswith("txn_123456")
+    queue.shutdown()
+
+
+def test_gateway_calls_run_concurrently(owed_fee):
+    gateway = FakePaymentGateway(latency=0.2)
+    queue = PaymentQueue(max_workers=4, gateway=gateway)
+
+    started = time.perf_counter()
+    job_ids = [queue.submit("123456", 1) for _ in range(8)]
+    jobs = [queue.wait(job_id, timeout=5) for job_id in job_ids]
+    elapsed = time.perf_counter() - started
+
+    assert all(job["status"] == "succeeded" for job in jobs)
+    assert gateway.calls == 8
+    assert elapsed < 8 * 0.2  # two waves of four, not eight sequential calls
+    queue.shutdown()
+
+
+def test_declines_and_errors_are_reported(owed_fee):
+    queue = PaymentQueue(gateway=FakePaymentGateway(latency=0, failure_rate=1.0))
+    job = queue.wait(queue.submit("123456", 1), timeout=5)
+    assert job["status"] == "failed"
+    assert job["message"] == "Payment failed: Payment declined by issuer"
+
+    queue = PaymentQueue(gateway=FakePaymentGateway(latency=0, error_rate=1.0))
+    job = queue.wait(queue.submit("123456", 1), timeout=5)
+    assert job["status"] == "failed"
+    assert "Payment gateway unreachable" in job["message"]
+
+
+def test_invalid_patron_fails_without_gateway_call(owed_fee):
+    gateway = FakePaymentGateway(latency=0)
+    queue = PaymentQueue(gateway=gateway)
+
+    job = queue.wait(queue.submit("12", 1), timeout=5)
+    assert job["status"] == "failed"
+    assert gateway.calls == 0
+
+
+def test_pending_jobs_are_capped(owed_fee):
+    """Once max_pending jobs are waiting, submit refuses more until one finishes."""
+    queue = PaymentQueue(max_workers=1, max_pending=2, gateway=FakePaymentGateway(latency=0.2))
+    first, second = queue.submit("123456", 1), queue.submit("123456", 1)
+    assert queue.submit("123456", 1) is None
+    assert len(queue._jobs) == 2
+
+    queue.wait(first, timeout=5)
+    assert queue.submit("123456", 1) is not None
+    queue.wait(second, timeout=5)
+    queue.shutdown()
+
+
+def test_payment_api_submit_and_poll(sample_db, owed_fee):
+    configure_payment_queue(max_workers=2, gateway=FakePaymentGateway(latency=0.05))
+    app = Flask(__name__)
+    app.register_blueprint(api_bp)
+    client = app.test_client()
+
+    response = client.post("/api/payments", json={"patron_id": "123456", "book_id": 1})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    job = client.get(f"/api/payments/{job_id}?wait=5").get_json()
+    assert job["status"] == "succeeded"
+    assert client.get("/api/payments/unknown").status_code == 404
+    assert client.post("/api/payments", json={"patron_id": "123456", "book_id": "x"}).status_code == 400
+    configure_payment_queue()
+
+
+def test_payment_api_validates_before_queueing(sample_db, owed_fee):
+    """Bad patron IDs, unknown books and a full queue are answered without queueing a job."""
+    configure_payment_queue(max_workers=1, max_pending=1, gateway=FakePaymentGateway(latency=0.2))
+    app = Flask(__name__)
+    app.register_blueprint(api_bp)
+    client = app.test_client()
+
+    assert client.post("/api/payments", json={"patron_id": "12", "book_id": 1}).status_code == 400
+    assert client.post("/api/payments", json={"patron_id": "123456", "book_id": 999}).status_code == 404
+    assert get_payment_queue().stats()["pending"] == 0
+
+    assert client.post("/api/payments", json={"patron_id": "123456", "book_id": 1}).status_code == 202
+    response = client.post("/api/payments", json={"patron_id": "123456", "book_id": 1})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    configure_payment_queue()
@@ -0,0 +1,106 @@
+# Request profiling - opt-in via config, header or sampling; pstats and allocation dumps; admin listing
+
+import os
+import pstats
+import pytest
+from flask import Flask
+import database
+import profiling
+from routes import register_blueprints
+
+
+@pytest.fixture
+def make_client(sample_db, tmp_path):
+    def make(**config):
+        app = Flask(__name__, root_path="..")
+        app.secret_key = "test"
+        app.config["PROFILE_DIR"] = str(tmp_path / "profiles")
+        app.config["ADMIN_TOKEN"] = "secret"
+        app.config.update(config)
+        database.init_app(app)
+        profiling.init_app(app)
+        register_blueprints(app)
+        client = app.test_client()
+        client.environ_base["HTTP_X_ADMIN_TOKEN"] = "secret"
+        return client
+
+    return make
+
+
+def test_disabled_installs_no_hooks(make_client):
+    """With profiling off, requests aren't wrapped even when they ask to be."""
+    client = make_client()
+    assert client.application.before_request_funcs.get(None, []) == []
+    client.get("/api/books", headers={"X-Profile": "all"})
+    assert client.get("/admin/profiles").get_json() == {"enabled": False, "captures": []}
+
+
+def test_header_triggers_cpu_profile(make_client):
+    """X-Profile: cpu writes a loadable pstats dump for that request."""
+    client = make_client(PROFILING_ENABLED=True)
+    client.get("/api/books")
+    client.get("/api/search?q=gatsby&type=title", headers={"X-Profile": "cpu"})
+
+    captures = client.get("/admin/profiles").get_json()["captures"]
+    assert len(captures) == 1
+    capture = captures[0]
+    assert capture["endpoint"] == "api.search_books_api"
+    assert capture["mode"] == "cpu"
+    pstats_file = next(name for name in capture["files"] if name.endswith(".pstats"))
+    stats = pstats.Stats(os.path.join(client.application.config["PROFILE_DIR"], pstats_file))
+    assert any(func[2] == "search_books_in_catalog" for func in stats.stats)
+
+
+def test_memory_profile_reports_allocations(make_client):
+    """X-Profile: memory records the peak and the top allocation sites."""
+    client = make_client(PROFILING_ENABLED=True)
+    client.get("/api/books", headers={"X-Profile": "memory"})
+
+    capture = client.get("/admin/profiles").get_json()["captures"][0]
+    assert capture["peak_bytes"] > 0
+    assert [name for name in capture["files"] if name.endswith(".alloc.txt")]
+    response = client.get(f"/admin/profiles/{capture['name']}.alloc.txt")
+    assert b"allocation sites" in response.data
+
+
+def test_sampling_rate_profiles_without_header(make_client):
+    """A sample rate of 1 profiles every request."""
+    client = make_client(PROFILING_ENABLED=True, PROFILE_SAMPLE_RATE=1.0)
+    client.get("/api/books")
+    client.get("/catalog")
+    assert len(client.get("/admin/profiles").get_json()["captures"]) == 2
+
+
+def test_old_captures_are_pruned(make_client):
+    """Only the most recent PROFILE_MAX_CAPTURES captures are kept on disk."""
+    client = make_client(PROFILING_ENABLED=True, PROFILE_MAX_CAPTURES=2)
+    for _ in range(4):
+        client.get("/api/books", headers={"X-Profile": "cpu"})
+    assert len(client.get("/admin/profiles").get_json()["captures"]) == 2
+    assert len([f for f in os.listdir(client.application.config["PROFILE_DIR"]) if f.endswith(".json")]) == 2
+
+
+def test_admin_token_is_enforced(make_client):
+    """The listing and downloads require the configured admin token."""
+    client = make_client(PROFILING_ENABLED=True)
+    client.environ_base.pop("HTTP_X_ADMIN_TOKEN")
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles/missing.pstats").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_admin_endpoints_are_closed_without_a_token(make_client):
+    """With no admin token configured nobody can list or download captures."""
+    client = make_client(PROFILING_ENABLED=True, ADMIN_TOKEN=None)
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_profile_header_requires_admin_token(make_client):
+    """X-Profile from a caller without the admin token does not start a capture."""
+    client = make_client(PROFILING_ENABLED=True)
+    client.get("/api/books", headers={"X-Profile": "cpu", "X-Admin-Token": "wrong"})
+    client.environ_base.pop("HTTP_X_ADMIN_TOKEN")
+    client.get("/api/books", headers={"X-Profile": "cpu"})
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).get_json()["captures"] == []
@@ -0,0 +1,107 @@
+# SQL instrumentation - opt-in, fingerprints, per-request counts, slow-query log with plans, N+1 warnings
+
+import logging
+import pytest
+from flask import Flask
+import database
+import query_stats
+from query_stats import fingerprint, track_queries
+from routes import register_blueprints
+from services.library_service import get_patron_status_report
+
+
+@pytest.fixture
+def db(sample_db):
+    query_stats.configure_query_stats()
+    query_stats.reset_query_stats()
+    yield
+    query_stats.configure_query_stats(enabled=False)
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__, root_path="..")
+    app.secret_key = "test"
+    app.config.update(SQL_INSTRUMENTATION=True, SQL_DEBUG_HEADERS=True)
+    database.init_app(app)
+    query_stats.init_app(app)
+    register_blueprints(app)
+    return app.test_client()
+
+
+def test_fingerprint_strips_literals_and_whitespace():
+    """Statements differing only in literals share a fingerprint."""
+    assert fingerprint("SELECT * FROM books\n   WHERE id = 3") == "SELECT * FROM books WHERE id = ?"
+    assert fingerprint("SELECT * FROM books WHERE isbn = '978' AND x IN (?, ?, ?)") == \
+        "SELECT * FROM books WHERE isbn = ? AND x IN (?, ...)"
+
+
+def test_patron_report_is_a_single_statement(db):
+    """The status report issues one query however long the history is."""
+    with track_queries() as stats:
+        get_patron_status_report("123456")
+    assert stats.count == 1
+
+
+def test_request_query_count_headers(client):
+    """Each request's statement count and time are reported when debug headers are on."""
+    response = client.get("/api/books")
+    assert response.headers["X-Query-Count"] == "1"
+    assert float(response.headers["X-Query-Time-Ms"]) >= 0
+    assert query_stats.get_query_stats()["statements"] >= 1
+
+
+def test_repeated_statements_warn_as_n_plus_one(db, caplog):
+    """The same fingerprint run many times in one block is logged as a possible N+1."""
+    query_stats.configure_query_stats(n_plus_one_threshold=3)
+    with caplog.at_level(logging.WARNING, logger="library.sql"):
+        with track_queries("loop"):
+            for book_id in (1, 2, 3):
+                conn = database.get_db_connection()
+                conn.execute("SELECT * FROM books WHERE id = ?", (book_id,)).fetchone()
+                conn.close()
+    assert "possible N+1 in loop: 3 executions" in caplog.text
+    assert "SELECT * FROM books WHERE id = ?" in caplog.text
+
+
+def test_slow_queries_are_logged_with_plan(db, tmp_path):
+    """Statements over the threshold go to the slow-query log with EXPLAIN QUERY PLAN output."""
+    log_path = tmp_path / "slow.log"
+    query_stats.configure_query_stats(slow_threshold=0.0, explain_slow=True, slow_log_path=str(log_path))
+    conn = database.get_db_connection()
+    conn.execute("SELECT * FROM books WHERE isbn = ?", ("9780451524935",)).fetchone()
+    conn.close()
+    query_stats.configure_query_stats(enabled=False)
+
+    log = log_path.read_text()
+    assert "slow query" in log
+    assert "SELECT * FROM books WHERE isbn = ?" in log
+    assert "plan: SEARCH books USING INDEX" in log
+
+
+def test_disabled_instrumentation_records_nothing(db):
+    """With instrumentation off, execute() is a pass-through."""
+    query_stats.configure_query_stats(enabled=False)
+    with track_queries() as stats:
+        get_patron_status_report("123456")
+    assert stats.count == 0
+    assert query_stats.get_query_stats()["statements"] == 0
+
+
+def test_instrumentation_is_off_by_default(sample_db, monkeypatch):
+    """Without SQL_INSTRUMENTATION no hooks are installed and statements skip fingerprinting."""
+    app = Flask(__name__, root_path="..")
+    database.init_app(app)
+    query_stats.init_app(app)
+    register_blueprints(app)
+    assert not query_stats.instrumentation_enabled()
+    assert app.before_request_funcs.get(None, []) == []
+
+    def unexpected(*args):
+        raise AssertionError("statement was instrumented")
+
+    monkeypatch.setattr(database, "fingerprint", unexpected)
+    monkeypatch.setattr(database, "record_query", unexpected)
+    response = app.test_client().get("/api/books")
+    assert response.status_code == 200
+    assert "X-Query-Count" not in response.headers
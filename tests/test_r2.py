@@ -2,7 +2,7 @@ import pytest
 from routes import (
     catalog_routes
 )
-from database import get_all_books, get_db_connection
+from database import get_db_connection
 from services.library_service import add_book_to_catalog
 from flask import Blueprint, render_template
 from app import create_app
@@ -17,7 +17,7 @@ app.config.update({
 # valid input
 
 def test_catalog_valid_input(mocker):
-    mocker.patch("database.get_all_books", return_value=[
+    books = [
         {
             "title": "Test Book",
             "author": "Author",
@@ -25,14 +25,18 @@ def test_catalog_valid_input(mocker):
             "total_copies": 3,
             "available_copies": 3
         }
-    ])
+    ]
+    mocker.patch("routes.catalog_routes.get_books_page", return_value=(books, None))
     with app.app_context():
         with app.test_request_context("/catalog"):
             return_test = catalog_routes.catalog()
 
             expected = render_template(
                 "catalog.html",
-                books=get_all_books()
+                books=books,
+                next_cursor=None,
+                is_first_page=True,
+                limit=50
             )
 
     assert return_test == expected
@@ -45,7 +49,7 @@ def test_catalog_new_book(mocker):
     assert add_true
     assert "New Book" in response
 
-    mocker.patch("database.get_all_books", return_value=[
+    mocker.patch("routes.catalog_routes.get_books_page", return_value=([
         {
             "title": "New Book",
             "author": "Author",
@@ -53,7 +57,7 @@ def test_catalog_new_book(mocker):
             "total_copies": 1,
             "available_copies": 1
         }
-    ])
+    ], None))
     with app.app_context():
         with app.test_request_context('/catalog'):
             rendered = catalog_routes.catalog()
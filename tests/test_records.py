@@ -0,0 +1,58 @@
+# Record types - slotted Book/Loan rows from the row factory, dict-style compatibility, JSON and template rendering
+
+import os
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+import database
+from records import Book, Loan
+from routes import register_blueprints
+from services.library_service import search_books_in_catalog
+
+
+@pytest.fixture
+def client(sample_db):
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    database.init_app(app)
+    register_blueprints(app)
+    return app.test_client()
+
+
+def test_helpers_return_slotted_books(sample_db):
+    """Catalog, lookup and search helpers build Book records without a per-row dict."""
+    books, _ = database.get_books_page()
+    found = search_books_in_catalog("gatsby", "title")
+    assert all(type(book) is Book for book in books + found + [database.get_book_by_isbn("9780743273565")])
+    assert not hasattr(books[0], "__dict__")
+
+
+def test_records_keep_dict_style_access(sample_db):
+    """Existing callers can index, .get(), copy into a dict and assign fields."""
+    book = database.get_book_by_isbn("9780743273565")
+    assert book["title"] == book.title == "The Great Gatsby"
+    assert book.get("missing", "default") == "default"
+    assert "isbn" in book and "copy" not in book
+    assert dict(book)["available_copies"] == book.available_copies
+    with pytest.raises(KeyError):
+        book["missing"]
+
+    book["title"] = "Changed"
+    assert database.get_book_by_id(book.id)["title"] == "The Great Gatsby"
+
+
+def test_borrowed_books_are_loans(sample_db):
+    """Open loans come back as Loan records with decoded datetimes."""
+    now = datetime.now().replace(microsecond=0)
+    database.insert_borrow_record("222222", 1, now - timedelta(days=20), now - timedelta(days=6))
+
+    loan = database.get_patron_borrowed_books("222222")[0]
+    assert type(loan) is Loan
+    assert (loan.book_id, loan.due_date, loan["is_overdue"]) == (1, now - timedelta(days=6), True)
+
+
+def test_api_and_templates_render_records(client):
+    """jsonify serializes records as objects and templates read their attributes."""
+    books = client.get("/api/books").get_json()["books"]
+    assert set(books[0]) == {"id", "title", "author", "isbn", "total_copies", "available_copies"}
+    assert b"The Great Gatsby" in client.get("/catalog").data
@@ -1,6 +1,7 @@
 # return_book_by_patron - valid inputs, book does not exist, book not checked out by patron, patron does not exist
 
 import pytest
+from datetime import datetime, timedelta
 from services.library_service import (
     return_book_by_patron
 )
@@ -8,26 +9,15 @@ from services.library_service import (
 
 def test_borrow_book_valid_input(mocker):
     """Test returning a book with valid input."""
-    mocker.patch(
-        "services.library_service.get_patron_borrowed_books",
-        return_value=[{"book_id": "3", "title": "Test Book", "author": "Author"}]
-    )
-    mocker.patch(
-        "services.library_service.calculate_late_fee_for_book",
-        return_value={"fee_amount": 0.0}
-    )
-    mocker.patch(
-        "services.library_service.update_book_availability",
-        return_value=True
-    )
-    mock_update_record = mocker.patch(
-        "services.library_service.update_borrow_record_return_date",
-        return_value=True
+    mock_txn = mocker.patch(
+        "services.library_service.return_book_transaction",
+        return_value=("returned", {"book_id": 3, "borrow_date": datetime.now(), "due_date": datetime.now() + timedelta(days=1)})
     )
     success, message = return_book_by_patron("123456", "3")
     
     assert success == True
     assert "successfully returned" in message.lower()
+    mock_txn.assert_called_once()
 
 
 def test_borrow_book_book_dne():
@@ -0,0 +1,65 @@
+# Schema migrations - fresh database, in-place upgrade of a legacy file, idempotence, WAL and index usage
+
+import sqlite3
+import pytest
+import database
+
+
+def index_names(path):
+    conn = sqlite3.connect(path)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    return names
+
+
+def test_fresh_database_is_fully_migrated(db_path):
+    database.init_database()
+
+    assert database.get_schema_version() == database.SCHEMA_MIGRATIONS[-1][0]
+    assert {"idx_borrow_records_patron_return", "idx_borrow_records_book_return",
+            "idx_borrow_records_open_due"} <= index_names(db_path)
+
+
+def test_wal_and_connection_pragmas(db_path):
+    database.init_database()
+    conn = database.get_db_connection()
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    conn.close()
+
+
+def test_legacy_database_upgraded_in_place(db_path):
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript("""
+        CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, author TEXT NOT NULL,
+                            isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, available_copies INTEGER NOT NULL);
+        CREATE TABLE borrow_records (id INTEGER PRIMARY KEY AUTOINCREMENT, patron_id TEXT NOT NULL, book_id INTEGER NOT NULL,
+                                     borrow_date TEXT NOT NULL, due_date TEXT NOT NULL, return_date TEXT);
+        INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('Old', 'Author', '1234567890123', 1, 1);
+    """)
+    legacy.close()
+
+    database.init_database()
+
+    assert database.get_schema_version() == database.SCHEMA_MIGRATIONS[-1][0]
+    assert database.get_book_by_isbn("1234567890123")["title"] == "Old"
+
+
+def test_migrations_are_idempotent(db_path):
+    database.init_database()
+    conn = database.get_db_connection()
+
+    assert database.migrate_database(conn) == []
+    conn.close()
+
+
+def test_open_loan_lookup_uses_index(db_path):
+    database.init_database()
+    conn = database.get_db_connection()
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM borrow_records WHERE patron_id = ? AND return_date IS NULL",
+        ("123456",)))
+    conn.close()
+
+    assert "idx_borrow_records_patron_return" in plan
@@ -0,0 +1,123 @@
+# Search result cache - normalized keys, catalog-version invalidation, copies, single-flight coalescing, stats
+
+import threading
+import time
+import pytest
+import database
+from cache import LRUCache, SingleFlight
+from services import library_service
+from services.library_service import get_search_cache_stats, search_books_cached
+
+
+@pytest.fixture
+def db(sample_db):
+    library_service.configure_search_cache()
+
+
+def test_repeated_searches_share_one_execution(db):
+    """Searches that normalize to the same term and type run the query once."""
+    first = search_books_cached("gatsby", "title")
+    again = search_books_cached("  GATSBY ", "title")
+
+    assert [book.title for book in again] == [book.title for book in first] == ["The Great Gatsby"]
+    stats = get_search_cache_stats()
+    assert (stats["executions"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_catalog_write_invalidates_results(db):
+    """A new catalog version is searched afresh and older entries are dropped."""
+    assert search_books_cached("gatsby", "title")[0]["available_copies"] == 3
+    database.update_book_availability(1, -1)
+
+    assert search_books_cached("gatsby", "title")[0]["available_copies"] == 2
+    stats = get_search_cache_stats()
+    assert stats["executions"] == 2
+    assert stats["size"] == 1
+
+
+def test_only_bounded_pages_are_cached(db):
+    """Unlimited or oversized results are searched every time and never stored."""
+    search_books_cached("the", "title", limit=None)
+    search_books_cached("the", "title", limit=library_service.SEARCH_MAX_PAGE_SIZE + 2)
+    search_books_cached("the", "title", limit=None)
+    stats = get_search_cache_stats()
+    assert (stats["executions"], stats["size"]) == (3, 0)
+
+
+def test_version_change_clears_cache_once():
+    """Seeing a new version empties the cache; repeating the same version keeps entries."""
+    cache = LRUCache(10)
+    cache.ensure_version(1)
+    cache.set("key", "value")
+    cache.ensure_version(1)
+    assert cache.get("key") == "value"
+    cache.ensure_version(2)
+    assert cache.get("key") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_results_are_copies(db):
+    """Mutating a returned record leaves the cached result alone."""
+    search_books_cached("gatsby", "title")[0]["title"] = "Changed"
+    assert search_books_cached("gatsby", "title")[0]["title"] == "The Great Gatsby"
+
+
+def test_concurrent_identical_searches_are_coalesced(db, monkeypatch):
+    """Only one of several simultaneous identical searches queries the database."""
+    calls = []
+    release = threading.Event()
+    search = library_service.search_books_in_catalog
+
+    def slow_search(term, search_type, **options):
+        calls.append(term)
+        release.wait(5)
+        return search(term, search_type, **options)
+
+    monkeypatch.setattr(library_service, "search_books_in_catalog", slow_search)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(search_books_cached("Gatsby", "title")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while get_search_cache_stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["gatsby"]
+    assert [len(found) for found in results] == [1] * 5
+    assert get_search_cache_stats()["executions"] == 1
+
+
+def test_single_flight_shares_errors():
+    """Waiters see the leader's exception and the key is free again afterwards."""
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert errors == ["boom", "boom"]
+    assert flight.do("key", lambda: "fresh") == "fresh"
+    assert flight.stats() == {"executions": 2, "coalesced": 1, "in_flight": 0}
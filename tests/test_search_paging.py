@@ -0,0 +1,120 @@
+# Bounded search - limit/offset pages, sort orders, available-only filter and its indexes, capped totals, routes
+
+import os
+import pytest
+from flask import Flask
+import database
+from routes import register_blueprints
+from services import library_service
+from services.library_service import count_search_results, search_books_in_catalog, search_catalog_page
+
+
+@pytest.fixture
+def catalog(temp_db):
+    database.insert_book("Night Train", "Ann Able", "9780000000001", 2, 1)
+    database.insert_book("A Night Garden", "Ben Baker", "9780000000002", 3, 3)
+    database.insert_book("Nightfall", "Cy Cole", "9780000000003", 1, 0)
+    database.insert_book("Long Night", "Di Dunn", "9780000000004", 4, 2)
+    database.insert_book("The Night", "Ed Eyre", "9780000000005", 1, 0)
+    database.configure_book_cache()
+    library_service.configure_search_cache()
+
+
+def titles(books):
+    return [book.title for book in books]
+
+
+def test_pages_partition_the_results(catalog):
+    """Consecutive limit/offset pages are disjoint and together hold every match."""
+    pages = [titles(search_books_in_catalog("night", "title", limit=2, offset=offset, sort="title"))
+             for offset in (0, 2, 4)]
+    assert pages == [["A Night Garden", "Long Night"], ["Night Train", "Nightfall"], ["The Night"]]
+
+
+def test_sort_orders(catalog):
+    """Availability puts the most copies on the shelf first; relevance is BM25 order."""
+    by_availability = search_books_in_catalog("night", "title", sort="availability")
+    assert [book.available_copies for book in by_availability] == [3, 2, 1, 0, 0]
+    assert titles(by_availability)[-2:] == ["Nightfall", "The Night"]
+    assert len(search_books_in_catalog("night", "title")) == 5
+
+
+def test_available_only(catalog):
+    """Books with no copy on the shelf are left out, with the index or without it."""
+    assert titles(search_books_in_catalog("night", "title", sort="title", available_only=True)) == [
+        "A Night Garden", "Long Night", "Night Train"]
+    # 'ght tr' is inside words, so it is answered by a LIKE match rather than the word index
+    assert titles(search_books_in_catalog("ght tr", "title", available_only=True)) == ["Night Train"]
+    assert search_books_in_catalog("ghtfa", "title", available_only=True) == []
+    assert titles(search_books_in_catalog("9780000000003", "isbn")) == ["Nightfall"]
+    assert search_books_in_catalog("9780000000003", "isbn", available_only=True) == []
+
+
+def test_pages_agree_with_the_full_result(catalog):
+    """Limits pushed into the index and substring queries give the same pages as slicing every match."""
+    database.insert_book("Knights of Old", "Fay Ford", "9780000000006", 1, 1)
+    database.insert_book("Midnight Sun", "Gil Gray", "9780000000007", 2, 0)
+    for sort in library_service.SEARCH_SORTS:
+        for available_only in (False, True):
+            full = titles(search_books_in_catalog("night", "title", sort=sort, available_only=available_only))
+            pages = [titles(search_books_in_catalog("night", "title", limit=2, offset=offset, sort=sort,
+                                                    available_only=available_only))
+                     for offset in range(0, 8, 2)]
+            assert sum(pages, []) == full, (sort, available_only)
+    relevance = titles(search_books_in_catalog("night", "title"))
+    assert set(relevance[-2:]) == {"Knights of Old", "Midnight Sun"}
+
+
+def test_available_only_is_served_by_an_index(catalog):
+    """Filtered title order walks the partial index instead of sorting the table."""
+    conn = database.get_db_connection()
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT b.* FROM books b WHERE LOWER(b.title) LIKE ? "
+        "AND b.available_copies > 0 ORDER BY b.title, b.id LIMIT ? OFFSET ?", ("%a%", 20, 0)))
+    conn.close()
+    assert "idx_books_available_title" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_count_stops_at_cap(catalog):
+    """Counting stops one past the cap, and the page reports the total as 'N+'."""
+    assert count_search_results("night", "title", cap=2) == 3
+    assert count_search_results("night", "title", available_only=True) == 3
+
+
+def test_page_totals_and_next_offset(catalog, monkeypatch):
+    """search_catalog_page returns a capped total and where the next page starts."""
+    first = search_catalog_page("night", "title", limit=2, sort="title")
+    assert (first["total"], first["next_offset"]) == (5, 2)
+    last = search_catalog_page("night", "title", limit=2, offset=4, sort="title")
+    assert (titles(last["books"]), last["next_offset"]) == (["The Night"], None)
+
+    monkeypatch.setattr(library_service, "SEARCH_COUNT_CAP", 3)
+    library_service.configure_search_cache()
+    assert search_catalog_page("night", "title", limit=2)["total"] == "3+"
+    with pytest.raises(ValueError):
+        search_catalog_page("night", "title", sort="newest")
+
+
+def test_search_routes_are_paged(catalog):
+    """/api/search always returns one page, SEARCH_PAGE_SIZE by default; /search links to the next page."""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    database.init_app(app)
+    register_blueprints(app)
+    client = app.test_client()
+
+    data = client.get("/api/search?q=night&limit=2&offset=2&sort=title").get_json()
+    assert [book["title"] for book in data["results"]] == ["Night Train", "Nightfall"]
+    assert (data["count"], data["total"], data["next_offset"]) == (2, 5, 4)
+    data = client.get("/api/search?q=night&sort=availability&available_only=1").get_json()
+    assert [book["available_copies"] for book in data["results"]] == [3, 2, 1]
+    data = client.get("/api/search?q=night").get_json()
+    assert (data["count"], data["total"], data["limit"], data["next_offset"]) == (5, 5, library_service.SEARCH_PAGE_SIZE, None)
+    assert client.get("/api/search?q=night&limit=100000").get_json()["limit"] == library_service.SEARCH_MAX_PAGE_SIZE
+    assert client.get("/api/search?q=night&offset=4").get_json()["total"] == 5
+    assert client.get("/api/search?q=night&sort=newest").status_code == 400
+
+    page = client.get("/search?q=night&type=title&sort=title&limit=2").get_data(as_text=True)
+    assert "Showing 1-2 of 5" in page
+    assert "offset=2" in page
@@ -0,0 +1,72 @@
+# Storage encoding - integer epoch timestamps and patron keys, datetime round trip, in-place upgrade of TEXT rows
+
+import sqlite3
+import pytest
+from datetime import datetime, timedelta
+import database
+from services.late_fee_engine import calculate_late_fees_batch
+from services.library_service import get_patron_status_report
+
+
+def test_loans_are_stored_as_integers(sample_db):
+    """borrow_records holds integer patron keys and epoch-second timestamps."""
+    borrowed = datetime(2025, 2, 1, 9, 30, 15)
+    database.insert_borrow_record("012345", 1, borrowed, borrowed + timedelta(days=14))
+
+    conn = database.get_db_connection()
+    row = conn.execute("SELECT typeof(patron_id), typeof(borrow_date), borrow_date FROM borrow_records "
+                       "WHERE book_id = 1").fetchone()
+    conn.close()
+    assert tuple(row) == ("integer", "integer", 1738402215)
+
+
+def test_services_still_receive_datetimes_and_padded_ids(sample_db):
+    """Decoded rows give back the same wall-clock datetimes and 6-digit patron IDs."""
+    now = datetime.now().replace(microsecond=0)
+    database.insert_borrow_record("000042", 1, now - timedelta(days=20), now - timedelta(days=6))
+
+    borrowed = database.get_patron_borrowed_books("000042")[0]
+    assert borrowed["borrow_date"] == now - timedelta(days=20)
+    assert borrowed["is_overdue"]
+
+    report = get_patron_status_report("000042")
+    assert report["borrowing_history"][0]["patron_id"] == "000042"
+    assert report["borrowing_history"][0]["due_date"] == now - timedelta(days=6)
+
+    fee = calculate_late_fees_batch(["000042"], now)[0]
+    assert fee["patron_id"] == "000042"
+    assert fee["due_date"] == (now - timedelta(days=6)).isoformat()
+
+
+def test_non_numeric_patron_id_matches_nothing(sample_db):
+    """IDs that can't be encoded as a patron key simply find no loans."""
+    assert database.get_patron_borrowed_books("abc") == []
+    assert database.get_patron_borrow_count("") == 0
+
+
+def test_text_rows_are_converted_in_place(db_path):
+    """Upgrading a v4 database rewrites ISO text dates and text patron IDs as integers."""
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript("""
+        CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, author TEXT NOT NULL,
+                            isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL, available_copies INTEGER NOT NULL);
+        CREATE TABLE borrow_records (id INTEGER PRIMARY KEY AUTOINCREMENT, patron_id TEXT NOT NULL, book_id INTEGER NOT NULL,
+                                     borrow_date TEXT NOT NULL, due_date TEXT NOT NULL, return_date TEXT);
+        INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES ('Old', 'Author', '1234567890123', 2, 1);
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+        VALUES ('007007', 1, '2025-01-01T10:00:00', '2025-01-15T10:00:00', NULL),
+               ('007007', 1, '2024-12-01T10:00:00.250000', '2024-12-15T10:00:00', '2024-12-10T08:00:00');
+    """)
+    legacy.close()
+
+    database.init_database()
+
+    assert database.get_schema_version() == database.SCHEMA_MIGRATIONS[-1][0]
+    loans = database.get_patron_borrowed_books("007007")
+    assert [(loan["borrow_date"], loan["due_date"]) for loan in loans] == [
+        (datetime(2025, 1, 1, 10, 0), datetime(2025, 1, 15, 10, 0))
+    ]
+    assert database.get_patron_counters("007007")["open_loans"] == 1
+    conn = database.get_db_connection()
+    assert conn.execute("SELECT COUNT(*) FROM borrow_records WHERE typeof(return_date) = 'text'").fetchone()[0] == 0
+    conn.close()
@@ -0,0 +1,79 @@
+# Typeahead suggestions - prefix matching, author dedupe, completed words, ranking, incremental inserts, endpoint
+
+import io
+import os
+import pytest
+from flask import Flask
+import database
+from routes import register_blueprints
+from services.bulk_import import import_books
+from services.suggest import PrefixIndex, build_suggest_index, suggest
+
+
+@pytest.fixture
+def db(sample_db):
+    build_suggest_index()
+
+
+def texts(results):
+    return [(result["text"], result["type"]) for result in results]
+
+
+def test_prefix_of_any_word_matches_titles_and_authors(db):
+    """A partial word matches titles and authors containing a word that starts with it."""
+    assert texts(suggest("gat")) == [("The Great Gatsby", "title")]
+    assert texts(suggest("orw")) == [("George Orwell", "author")]
+    assert texts(suggest("MOCK")) == [("To Kill a Mockingbird", "title")]
+    assert suggest("zzz") == []
+    assert suggest("  ") == []
+
+
+def test_completed_words_must_all_match():
+    """Every word before the last must appear whole; the last is a prefix."""
+    index = PrefixIndex.build([("The Great Gatsby", "F. Scott Fitzgerald"),
+                               ("Great Expectations", "Charles Dickens"),
+                               ("The Grapes of Wrath", "John Steinbeck")])
+    assert texts(index.suggest("the gr")) == [("The Great Gatsby", "title"), ("The Grapes of Wrath", "title")]
+    assert texts(index.suggest("great ")) == [("Great Expectations", "title"), ("The Great Gatsby", "title")]
+    assert index.suggest("gre gatsby") == []
+
+
+def test_texts_starting_with_the_query_rank_first():
+    """Suggestions beginning with the query come before shorter mid-text matches."""
+    index = PrefixIndex.build([("A Tale of Two Cities", "Charles Dickens"), ("Tale", "Anon"),
+                               ("Tales from Earthsea", "Ursula K. Le Guin")])
+    assert [result["text"] for result in index.suggest("tale")] == [
+        "Tale", "Tales from Earthsea", "A Tale of Two Cities"]
+    assert len(index.suggest("tale", limit=1)) == 1
+
+
+def test_authors_are_suggested_once():
+    """An author with many books appears as one suggestion, whatever the spelling of spaces and case."""
+    index = PrefixIndex.build([("Emma", "Jane Austen"), ("Persuasion", "jane  austen"), ("Sanditon", "Jane Austen")])
+    assert texts(index.suggest("aus")) == [("Jane Austen", "author")]
+    assert index.stats() == {"suggestions": 4, "authors": 1, "tokens": 5, "postings": 5}
+
+
+def test_inserted_books_are_suggested(db):
+    """Books committed through insert_book or the bulk importer are added to the live index."""
+    assert database.insert_book("Gateway to Nowhere", "Ada Gatwick", "9780000000001", 1, 1)
+    assert not database.insert_book("Duplicate", "Nobody", "9780000000001", 1, 1)
+    import_books(io.StringIO("title,author,isbn,total_copies\nGathering Storm,Winston Churchill,9780000000002,2\n"), "csv")
+
+    assert [result["text"] for result in suggest("gat")] == [
+        "Gathering Storm", "Gateway to Nowhere", "Ada Gatwick", "The Great Gatsby"]
+    assert suggest("duplicate") == []
+
+
+def test_suggest_endpoint(db):
+    """GET /api/suggest returns suggestions for q, an empty list without one, and honours limit."""
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    database.init_app(app)
+    register_blueprints(app)
+    client = app.test_client()
+
+    data = client.get("/api/suggest?q=harp").get_json()
+    assert data == {"query": "harp", "suggestions": [{"text": "Harper Lee", "type": "author"}]}
+    assert client.get("/api/suggest").get_json()["suggestions"] == []
+    assert len(client.get("/api/suggest?q=t&limit=1").get_json()["suggestions"]) == 1
+    assert client.get("/api/stats").get_json()["suggest_index"]["suggestions"] == 6
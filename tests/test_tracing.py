@@ -0,0 +1,134 @@
+# Tracing - nested route/service/db/gateway spans, ring buffer and JSONL export, critical path, no-op when disabled
+
+import json
+import os
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+from flask import Flask
+import database
+import tracing
+from routes import register_blueprints
+from services.library_service import pay_late_fees, search_books_in_catalog
+from services.payment_service import PaymentGateway
+from tracing import critical_path, span
+
+
+@pytest.fixture
+def db(sample_db):
+    yield
+    tracing.configure_tracing(enabled=False)
+
+
+@pytest.fixture
+def client(db, tmp_path):
+    app = Flask(__name__, root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    app.secret_key = "test"
+    app.config.update(TRACING_ENABLED=True, TRACE_JSONL_PATH=str(tmp_path / "traces.jsonl"),
+                      ADMIN_TOKEN="secret")
+    database.init_app(app)
+    tracing.init_app(app)
+    register_blueprints(app)
+    client = app.test_client()
+    client.environ_base["HTTP_X_ADMIN_TOKEN"] = "secret"
+    return client
+
+
+def names_by_parent(trace):
+    spans = {s["span_id"]: s for s in trace["spans"]}
+    return {s["name"]: spans[s["parent_id"]]["name"] if s["parent_id"] else None for s in trace["spans"]}
+
+
+def test_request_trace_nests_route_service_and_db(client):
+    """A /return request yields route -> service -> transaction -> statement spans."""
+    response = client.post("/return", data={"patron_id": "123456", "book_id": "3"})
+    trace_id = response.headers["X-Trace-Id"]
+
+    trace = client.get(f"/admin/traces/{trace_id}").get_json()
+    parents = names_by_parent(trace)
+    assert parents["POST /return"] is None
+    assert parents["service.return_book_by_patron"] == "POST /return"
+    assert parents["db.return_book_transaction"] == "service.return_book_by_patron"
+    assert parents["db.statement"] == "db.return_book_transaction"
+    assert trace["spans"][0]["attributes"]["status"] == 200
+    assert [step["name"] for step in trace["critical_path"]][:2] == ["POST /return", "service.return_book_by_patron"]
+
+
+def test_traces_are_listed_and_written_to_jsonl(client, tmp_path):
+    """Finished traces go to the ring buffer and one JSON line each to the file."""
+    client.get("/api/search?q=gatsby&type=title")
+    client.get("/api/books")
+
+    listed = client.get("/admin/traces").get_json()["traces"]
+    assert [t["name"] for t in listed] == ["GET /api/books", "GET /api/search"]
+    assert "spans" not in listed[0]
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["name"] == "GET /api/search"
+
+
+def test_admin_token_is_enforced(client):
+    """Trace listing and lookup require ADMIN_TOKEN, as /admin/profiles does."""
+    client.environ_base.pop("HTTP_X_ADMIN_TOKEN")
+    client.get("/api/books")
+    assert client.get("/admin/traces").status_code == 403
+    listed = client.get("/admin/traces", headers={"X-Admin-Token": "secret"}).get_json()["traces"]
+    assert client.get(f"/admin/traces/{listed[0]['trace_id']}").status_code == 403
+    assert client.get(f"/admin/traces/{listed[0]['trace_id']}", headers={"X-Admin-Token": "secret"}).status_code == 200
+
+
+def test_traces_are_closed_without_a_configured_token(client):
+    """With no ADMIN_TOKEN configured the trace endpoints deny everyone."""
+    client.application.config["ADMIN_TOKEN"] = None
+    assert client.get("/admin/traces").status_code == 403
+    assert client.get("/admin/traces", headers={"X-Admin-Token": ""}).status_code == 403
+
+
+def test_gateway_call_is_a_span(db):
+    """Payment gateway calls appear as children of the payment service span."""
+    buffer = tracing.configure_tracing()
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_1", "ok")
+    borrowed = datetime.now() - timedelta(days=20)
+    database.insert_borrow_record("654321", 1, borrowed, borrowed + timedelta(days=14))
+    with span("job", root=True):
+        assert pay_late_fees("654321", 1, gateway)[0]
+
+    trace = buffer.get(buffer.recent(1)[0]["trace_id"])
+    parents = names_by_parent(trace)
+    assert parents["service.pay_late_fees"] == "job"
+    assert parents["gateway.process_payment"] == "service.pay_late_fees"
+
+
+def test_errors_are_recorded_on_the_span(db):
+    """An exception marks the span that raised it and still exports the trace."""
+    buffer = tracing.configure_tracing()
+    with pytest.raises(ValueError):
+        with span("outer", root=True):
+            with span("inner"):
+                raise ValueError("bad")
+    trace = buffer.get(buffer.recent(1)[0]["trace_id"])
+    assert [s["error"] for s in trace["spans"]] == ["ValueError: bad", "ValueError: bad"]
+
+
+def test_disabled_or_untraced_calls_record_nothing(db):
+    """Without an active trace, instrumented code runs without creating spans."""
+    buffer = tracing.configure_tracing()
+    search_books_in_catalog("gatsby", "title")
+    assert buffer.recent() == []
+
+    tracing.configure_tracing(enabled=False)
+    with span("root", root=True) as current:
+        assert current is None
+
+
+def test_critical_path_follows_latest_finishing_child():
+    """The critical path picks the child that ended last at each level."""
+    trace = {"spans": [
+        {"span_id": "a", "parent_id": None, "name": "root", "start": 0.0, "duration_ms": 100.0},
+        {"span_id": "b", "parent_id": "a", "name": "fast", "start": 0.0, "duration_ms": 10.0},
+        {"span_id": "c", "parent_id": "a", "name": "slow", "start": 0.01, "duration_ms": 80.0},
+        {"span_id": "d", "parent_id": "c", "name": "query", "start": 0.02, "duration_ms": 60.0},
+    ]}
+    assert [step["name"] for step in critical_path(trace)] == ["root", "slow", "query"]
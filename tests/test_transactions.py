@@ -0,0 +1,101 @@
+# Borrow/return transactions - atomic borrow, last copy under concurrency, limit check, return, retry on lock contention
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytest
+import database
+
+
+@pytest.fixture
+def books_db(temp_db):
+    """A fresh database with one single-copy and one multi-copy book."""
+    database.configure_pool(size=10)
+    database.insert_book("Only Copy", "Author", "1111111111111", 1, 1)
+    database.insert_book("Many Copies", "Author", "2222222222222", 5, 5)
+
+
+def borrow(patron_id, book_id):
+    now = datetime.now()
+    return database.borrow_book_transaction(patron_id, book_id, now, now + timedelta(days=14))
+
+
+def test_borrow_inserts_record_and_decrements(books_db):
+    status, book = borrow("123456", 2)
+
+    assert status == "borrowed"
+    assert book["title"] == "Many Copies"
+    assert database.get_book_by_id(2)["available_copies"] == 4
+    assert database.get_patron_borrow_count("123456") == 1
+
+
+def test_borrow_missing_and_unavailable_book(books_db):
+    assert borrow("123456", 99)[0] == "not_found"
+    assert borrow("123456", 1)[0] == "borrowed"
+    assert borrow("654321", 1)[0] == "unavailable"
+    assert database.get_book_by_id(1)["available_copies"] == 0
+
+
+def test_borrow_limit_reached(books_db):
+    for _ in range(5):
+        assert borrow("123456", 2)[0] == "borrowed"
+
+    database.insert_book("Extra", "Author", "3333333333333", 1, 1)
+    assert borrow("123456", 3)[0] == "limit_reached"
+    assert database.get_book_by_id(3)["available_copies"] == 1
+
+
+def test_concurrent_borrows_of_last_copy(books_db):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker(patron_id):
+        barrier.wait()
+        results.append(borrow(patron_id, 1)[0])
+
+    threads = [threading.Thread(target=worker, args=(f"{100000 + i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count("borrowed") == 1
+    assert results.count("unavailable") == 7
+    assert database.get_book_by_id(1)["available_copies"] == 0
+
+
+def test_return_closes_loan_and_increments(books_db):
+    borrow("123456", 1)
+
+    status, loan = database.return_book_transaction("123456", 1, datetime.now())
+
+    assert status == "returned"
+    assert isinstance(loan["due_date"], datetime)
+    assert database.get_book_by_id(1)["available_copies"] == 1
+    assert database.get_patron_borrow_count("123456") == 0
+
+
+def test_return_not_borrowed(books_db):
+    assert database.return_book_transaction("123456", 1, datetime.now())[0] == "no_loans"
+    borrow("123456", 2)
+    assert database.return_book_transaction("123456", 1, datetime.now())[0] == "not_borrowed"
+
+
+def test_locked_database_is_retried(books_db, monkeypatch):
+    attempts = []
+
+    def work(conn):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return "done"
+
+    monkeypatch.setattr(database, "TRANSACTION_BACKOFF", 0)
+    before = database.get_transaction_stats()
+
+    assert database.run_in_transaction(work) == "done"
+
+    after = database.get_transaction_stats()
+    assert after["retries"] - before["retries"] == 2
+    assert after["contention"] - before["contention"] == 2
+    assert after["commits"] - before["commits"] == 1
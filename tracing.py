@@ -0,0 +1,305 @@
+"""
+Tracing module for Library Management System
+Lightweight nested spans (route -> service -> db statement -> payment gateway)
+with timings and attributes. Finished traces go to an in-memory ring buffer
+and/or a local JSONL file; no external collector is needed.
+
+Usage:
+    with span('service.return_book_by_patron', patron_id=patron_id):
+        ...
+
+    @traced('service.search_books_in_catalog')
+    def search_books_in_catalog(...): ...
+"""
+
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import abort, g, jsonify, request
+
+from admin import require_admin_token
+
+TRACE_BUFFER_SIZE = 200      # finished traces kept in memory
+MAX_SPANS_PER_TRACE = 2000   # spans beyond this are counted but not kept
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; children are spans started while it was current."""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start', 'started', 'ended', 'error')
+
+    def __init__(self, trace: 'Trace', name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()  # wall clock, for display only
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.ended is None else round((self.ended - self.started) * 1000, 3)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    """All spans under one root span."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            if len(self.spans) < MAX_SPANS_PER_TRACE:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def to_dict(self) -> Dict:
+        spans = [span.to_dict() for span in self.spans]
+        root = spans[0] if spans else {}
+        return {
+            'trace_id': self.trace_id,
+            'name': root.get('name'),
+            'start': root.get('start'),
+            'duration_ms': root.get('duration_ms'),
+            'span_count': len(spans),
+            'dropped_spans': self.dropped,
+            'spans': spans,
+        }
+
+
+class RingBufferExporter:
+    """Keeps the most recent finished traces in memory."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self.size = size
+        self._traces: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict):
+        with self._lock:
+            self._traces[trace['trace_id']] = trace
+            while len(self._traces) > self.size:
+                self._traces.popitem(last=False)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict]:
+        """Most recent traces first, without their spans."""
+        with self._lock:
+            traces = list(reversed(self._traces.values()))
+        traces = traces[:limit] if limit else traces
+        return [{key: value for key, value in trace.items() if key != 'spans'} for trace in traces]
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+
+class JsonlExporter:
+    """Appends each finished trace as one JSON line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict):
+        line = json.dumps(trace, default=str)
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+_exporters: List[Any] = []
+_enabled = False
+
+
+def configure_tracing(enabled: bool = True, buffer_size: int = TRACE_BUFFER_SIZE,
+                      jsonl_path: Optional[str] = None) -> Optional[RingBufferExporter]:
+    """
+    Turn tracing on or off and choose where finished traces go.
+
+    Args:
+        enabled: When False, span() is a no-op
+        buffer_size: Traces kept in memory (0 for none)
+        jsonl_path: Also append traces to this JSONL file
+
+    Returns:
+        RingBufferExporter: The in-memory buffer, if one was configured
+    """
+    global _enabled, _exporters
+    exporters = []
+    buffer = None
+    if enabled and buffer_size:
+        buffer = RingBufferExporter(buffer_size)
+        exporters.append(buffer)
+    if enabled and jsonl_path:
+        exporters.append(JsonlExporter(jsonl_path))
+    _exporters = exporters
+    _enabled = enabled
+    return buffer
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _export(trace: Trace):
+    data = trace.to_dict()
+    for exporter in _exporters:
+        exporter.export(data)
+
+
+@contextmanager
+def span(name: str, root: bool = False, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time the enclosed block as a child of the current span.
+
+    Outside a trace the block runs untraced unless `root` is True, in which
+    case a new trace is started and exported when the block finishes.
+    """
+    parent = _current_span.get()
+    if not _enabled or (parent is None and not root):
+        yield None
+        return
+    trace = parent.trace if parent is not None else Trace()
+    current = Span(trace, name, parent.span_id if parent is not None else None, attributes)
+    trace.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.ended = time.perf_counter()
+        _current_span.reset(token)
+        if parent is None:
+            _export(trace)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """Decorator recording each call of a function as a span (only inside a trace)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled or _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def critical_path(trace: Dict) -> List[Dict]:
+    """
+    The chain of spans that determined the trace's duration: from the root,
+    repeatedly follow the child that finished last.
+    """
+    spans = trace.get('spans') or []
+    if not spans:
+        return []
+    children: Dict[Optional[str], List[Dict]] = {}
+    for item in spans:
+        children.setdefault(item['parent_id'], []).append(item)
+    path = []
+    node = spans[0]
+    while node is not None:
+        path.append({'name': node['name'], 'duration_ms': node['duration_ms'], 'span_id': node['span_id']})
+        kids = [kid for kid in children.get(node['span_id'], []) if kid['duration_ms'] is not None]
+        node = max(kids, key=lambda kid: kid['start'] + kid['duration_ms'] / 1000) if kids else None
+    return path
+
+
+def init_app(app):
+    """
+    Trace every request as a root span and serve recent traces on /admin/traces.
+
+    Config: TRACING_ENABLED, TRACE_BUFFER_SIZE and TRACE_JSONL_PATH. The
+    listing requires ADMIN_TOKEN (see admin), like /admin/profiles.
+    """
+    app.config.setdefault('TRACING_ENABLED', False)
+    app.config.setdefault('TRACE_BUFFER_SIZE', TRACE_BUFFER_SIZE)
+    app.config.setdefault('TRACE_JSONL_PATH', None)
+    buffer = configure_tracing(app.config['TRACING_ENABLED'], app.config['TRACE_BUFFER_SIZE'],
+                               app.config['TRACE_JSONL_PATH'])
+    app.extensions['tracing'] = buffer
+
+    def list_traces():
+        require_admin_token()
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({'enabled': tracing_enabled(), 'traces': buffer.recent(limit) if buffer else []})
+
+    def get_trace(trace_id):
+        require_admin_token()
+        trace = buffer.get(trace_id) if buffer else None
+        if trace is None:
+            abort(404)
+        return jsonify(dict(trace, critical_path=critical_path(trace)))
+
+    app.add_url_rule('/admin/traces', 'tracing.list_traces', list_traces)
+    app.add_url_rule('/admin/traces/<trace_id>', 'tracing.get_trace', get_trace)
+
+    if not app.config['TRACING_ENABLED']:
+        return
+
+    @app.before_request
+    def start_request_span():
+        if request.endpoint in ('tracing.list_traces', 'tracing.get_trace'):
+            return
+        context = span(f"{request.method} {request.url_rule.rule if request.url_rule else request.path}",
+                       root=True, endpoint=request.endpoint, path=request.path)
+        current = context.__enter__()
+        g._trace_span = (context, current)
+
+    @app.after_request
+    def record_status(response):
+        state = g.get('_trace_span')
+        if state is not None and state[1] is not None:
+            state[1].set_attribute('status', response.status_code)
+            response.headers['X-Trace-Id'] = state[1].trace.trace_id
+        return response
+
+    @app.teardown_request
+    def finish_request_span(exception=None):
+        state = g.pop('_trace_span', None)
+        if state is None:
+            return
+        context, current = state
+        if exception is not None and current is not None:
+            current.error = f"{type(exception).__name__}: {exception}"
+        context.__exit__(None, None, None)